@@ -109,9 +109,34 @@ def install_missing_modules():
         print(f"{Colors.FAIL}ERROR: {e}{Colors.ENDC}")
         return False
 
+DEPENDENCY_CACHE = 'dependencies.json'
+
+def dependencies_cached():
+    """True if an earlier run with this interpreter found every required module"""
+    import cache
+    cached = cache.load_json(DEPENDENCY_CACHE)
+    if not cached or cached.get('interpreter') != cache.interpreter_key():
+        return False
+    # A module that was uninstalled since invalidates the cache
+    return all(origin and os.path.exists(origin) for origin in cached.get('modules', {}).values())
+
+def remember_dependencies():
+    """Cache a successful dependency check for this interpreter"""
+    import cache
+    import importlib.util
+    modules = {}
+    for module in ('psutil', 'cpuinfo'):
+        spec = importlib.util.find_spec(module)
+        if spec is None or not spec.origin:
+            return
+        modules[module] = spec.origin
+    cache.save_json(DEPENDENCY_CACHE, {'interpreter': cache.interpreter_key(), 'modules': modules})
+
 def validate_dependencies():
     """Validate all dependencies before running"""
     print(f"\n{Colors.HEADER}{Colors.BOLD}=== LPM System Information Tool ==={Colors.ENDC}\n")
+    if dependencies_cached():
+        return True
     
     # Check Python version
     print(f"{Colors.OKBLUE}Checking Python version...{Colors.ENDC}", end=" ", flush=True)
@@ -149,21 +174,18 @@ def validate_dependencies():
     else:
         print(f"\n{Colors.OKGREEN}OK: All dependencies present!{Colors.ENDC}")
     
+    remember_dependencies()
     return True
 
-# Import modules with error handling
+# Import modules with error handling; psutil, cpuinfo, the exporters and the
+# uploader are imported only once a run needs them to keep startup fast
 try:
-    import psutil
-    import cpuinfo
     import shutil
     import time
-    import json
     import argparse
-    import csv
-    import re
-    import xml.etree.ElementTree as ET
-    import urllib.request
-    import urllib.error
+    from report import (iter_info, iter_sections, open_info_file, should_include_section,
+                        SummaryBuilder, END_OF_REPORT)
+    from profiler import StageProfiler
 except ImportError as e:
     print(f"{Colors.FAIL}ERROR: Unable to import required modules!{Colors.ENDC}")
     print(f"   {e}")
@@ -171,14 +193,16 @@ except ImportError as e:
 
 def get_system_info():
     try:
+        import psutil
+        from collector import get_cpu_info
+        cpu = get_cpu_info()
         print(f"\n{Colors.BOLD}=== System Information ==={Colors.ENDC}")
         print(f"System: {platform.system()}")
         print(f"Node Name: {platform.node()}")
         print(f"Release: {platform.release()}")
         print(f"Version: {platform.version()}")
         print(f"Machine: {platform.machine()}")
-        print(f"Processor: {platform.processor() or cpuinfo.get_cpu_info()['brand_raw']}")
-        cpu = cpuinfo.get_cpu_info()
+        print(f"Processor: {platform.processor() or cpu.get('brand_raw', 'Unknown')}")
         print(f"\n{Colors.BOLD}=== CPU Information ==={Colors.ENDC}")
         print(f"CPU Brand: {cpu.get('brand_raw', 'Unknown')}")
         print(f"Architecture: {cpu.get('arch', 'Unknown')}")
@@ -198,7 +222,66 @@ def get_system_info():
     except Exception as e:
         print(f"{Colors.FAIL}Error retrieving system info: {e}{Colors.ENDC}")
 
+# Keys of exporters.EXPORTERS; each has a --<format>-out flag
+EXPORT_FORMATS = ('json', 'csv', 'xml', 'ndjson', 'msgpack', 'columnar')
+# Seconds between service-state checks for alert rules in --daemon mode
+SERVICE_ALERT_INTERVAL = 30.0
+
+class ConsolePrinter:
+    """Print report sections as they stream in, truncating very large ones."""
+
+    # (section substring, lines shown, noun used in the truncation note)
+    LIMITS = (('Installed Programs', 50, 'installed programs'), ('Services', 100, 'services'))
+
+    def __init__(self):
+        self.started = False
+        self.count = 0
+        self.limit = None
+
+    def _end_section(self):
+        if self.limit and self.count > self.limit[0]:
+            shown, noun = self.limit
+            print(f"  {Colors.WARNING}[Showing first {shown} of {self.count} {noun}]{Colors.ENDC}")
+            print(f"  {Colors.OKCYAN}... ({self.count - shown} more) - See exports for full list{Colors.ENDC}")
+
+    def begin_section(self, name):
+        if not self.started:
+            print(f"\n{Colors.BOLD}=== Batch Script Information ==={Colors.ENDC}")
+            self.started = True
+        self._end_section()
+        print(f"\n{Colors.BOLD}{name}:{Colors.ENDC}")
+        self.count = 0
+        self.limit = next(((shown, noun) for key, shown, noun in self.LIMITS if key in name), None)
+
+    def write_line(self, line):
+        self.count += 1
+        if self.limit is None or self.count <= self.limit[0]:
+            print(f"  {line}")
+
+    def finish(self):
+        self._end_section()
+
 if __name__ == "__main__":
+    # `LPM.py history ...` only queries the local metric store
+    if len(sys.argv) > 1 and sys.argv[1] == 'history':
+        from history import main as history_main
+        sys.exit(history_main(sys.argv[2:]))
+
+    # `LPM.py diff A B` compares exported reports and collects nothing
+    if len(sys.argv) > 1 and sys.argv[1] == 'diff':
+        from diff import main as diff_main
+        sys.exit(diff_main(sys.argv[2:]))
+
+    # `LPM.py metrics ...` serves cached OpenMetrics until interrupted
+    if len(sys.argv) > 1 and sys.argv[1] == 'metrics':
+        from openmetrics import main as metrics_main
+        sys.exit(metrics_main(sys.argv[2:]))
+
+    # `LPM.py fleet ...` collects from other hosts and needs nothing local beyond the parser
+    if len(sys.argv) > 1 and sys.argv[1] == 'fleet':
+        from fleet import main as fleet_main
+        sys.exit(fleet_main(sys.argv[2:]))
+
     # Validate all dependencies first
     if not validate_dependencies():
         print(f"\n{Colors.FAIL}Cannot proceed without dependencies.{Colors.ENDC}\n")
@@ -207,18 +290,48 @@ if __name__ == "__main__":
     
     # CLI arguments
     parser = argparse.ArgumentParser()
-    parser.add_argument('--run-collector', dest='run_collector', action='store_true', help='Run the PowerShell collector before parsing')
-    parser.add_argument('--wait', dest='wait_seconds', type=int, default=30, help='Seconds to wait for collector to finish')
+    parser.add_argument('--collector', dest='collector', choices=['native', 'powershell'], default='native', help='Collect natively in-process (default) or via info.ps1/info.txt')
+    parser.add_argument('--section-timeout', dest='section_timeout', type=float, help='Deadline in seconds for each natively collected section')
+    parser.add_argument('--no-inventory-cache', dest='no_inventory_cache', action='store_true', help='Collect every section fresh and leave the inventory cache untouched')
+    parser.add_argument('--refresh-inventory', dest='refresh_inventory', action='store_true', help='Recollect cached inventory sections and update the cache')
+    parser.add_argument('--run-collector', dest='run_collector', action='store_true', help='Run the PowerShell collector before parsing (with --collector powershell)')
+    parser.add_argument('--wait', dest='wait_seconds', type=int, default=30, help='Seconds to wait for the PowerShell collector to finish')
     parser.add_argument('--json-out', dest='json_out', nargs='?', const='info.json', help='Write parsed info + summary to JSON')
     parser.add_argument('--csv-out', dest='csv_out', nargs='?', const='info.csv', help='Write parsed info to CSV')
     parser.add_argument('--xml-out', dest='xml_out', nargs='?', const='info.xml', help='Write parsed info to XML')
+    parser.add_argument('--ndjson-out', dest='ndjson_out', nargs='?', const='info.ndjson', help='Write parsed info to NDJSON, one line per entry')
+    parser.add_argument('--msgpack-out', dest='msgpack_out', nargs='?', const='info.msgpack', help='Write parsed info to MessagePack')
+    parser.add_argument('--columnar-out', dest='columnar_out', nargs='?', const='info.columnar.json', help='Write typed section records as columns (JSON)')
     parser.add_argument('--upload', dest='upload_url', help='POST JSON report to this URL')
     parser.add_argument('--upload-user', dest='upload_user', help='Username for basic auth upload')
     parser.add_argument('--upload-pass', dest='upload_pass', help='Password for basic auth upload')
     parser.add_argument('--upload-bearer', dest='upload_bearer', help='Bearer token for upload')
+    parser.add_argument('--upload-delta', dest='upload_delta', action='store_true', help='Only upload sections changed since the last acknowledged upload')
+    parser.add_argument('--upload-state', dest='upload_state', default='lpm_upload_state.json', help='State file for --upload-delta section hashes')
+    parser.add_argument('--spool-dir', dest='spool_dir', default='lpm_spool', help='Directory for reports that could not be uploaded')
+    parser.add_argument('--no-spool', dest='no_spool', action='store_true', help='Drop reports that fail to upload instead of spooling them')
+    parser.add_argument('--upload-no-gzip', dest='upload_no_gzip', action='store_true', help='Send upload bodies uncompressed')
+    parser.add_argument('--drain-spool', dest='drain_spool', action='store_true', help='Only send spooled reports to --upload, then exit')
     parser.add_argument('--prompt-creds', dest='prompt_creds', action='store_true', help='Prompt for upload credentials interactively')
     parser.add_argument('--sections', dest='sections', help='Comma-separated list of sections to include (e.g., "OS & System,CPU,Network")')
+    parser.add_argument('--daemon', dest='daemon', action='store_true', help='Keep running and sample metrics continuously')
+    parser.add_argument('--live', dest='live', action='store_true', help='Full-screen dashboard of live metrics, redrawn every --interval seconds')
+    parser.add_argument('--interval', dest='interval', type=float, default=1.0, help='Seconds between samples in --daemon and --live modes')
+    parser.add_argument('--windows', dest='windows', default='60,300,900', help='Comma-separated rolling windows in seconds for --daemon stats')
+    parser.add_argument('--profile', dest='profile', action='store_true', help='Print wall time and peak memory for each stage of the run')
+    parser.add_argument('--history-db', dest='history_db', default='lpm_history.db', help='Metric history database (query with: LPM.py history)')
+    parser.add_argument('--no-history', dest='no_history', action='store_true', help='Do not record this run in the metric history')
+    parser.add_argument('--top', dest='top', type=int, default=10, help='Processes listed per resource in Top Processes and --daemon reports (0 to skip)')
+    parser.add_argument('--ping-targets', dest='ping_targets', help='Comma-separated host:port targets probed concurrently by Ping Test (default: 8.8.8.8:53,1.1.1.1:53)')
+    parser.add_argument('--ping-count', dest='ping_count', type=int, default=4, help='Probes sent to each Ping Test target (default: 4)')
+    parser.add_argument('--alert-rules', dest='alert_rules', help='File of alert rules evaluated against every run or --daemon sample')
+    parser.add_argument('--alert-webhook', dest='alert_webhook', help='POST alert events as JSON to this URL')
+    parser.add_argument('--alert-command', dest='alert_command', help='Run this command per alert event (event JSON on stdin)')
+    parser.add_argument('--alert-cooldown', dest='alert_cooldown', default='15m', help='Minimum time between repeat notifications of a firing rule (default: 15m)')
+    parser.add_argument('--alert-rate', dest='alert_rate', type=int, default=30, help='Maximum alert notifications sent per minute')
+    parser.add_argument('--history-size', dest='history_size', type=int, default=3600, help='Number of samples kept in memory in --daemon mode')
     args = parser.parse_args()
+    profiler = StageProfiler(enabled=args.profile)
 
     def prompt_upload_creds():
         """Prompt user for upload authentication credentials."""
@@ -232,12 +345,6 @@ if __name__ == "__main__":
             pwd = getpass.getpass(f"{Colors.BOLD}Password: {Colors.ENDC}")
             return ('basic', (user, pwd))
 
-    def should_include_section(section_name, filter_list):
-        """Check if section should be included based on filter."""
-        if not filter_list:
-            return True
-        return any(f.strip().lower() in section_name.lower() for f in filter_list)
-
     def run_collector_cmd():
         """Invoke info.ps1 via PowerShell (or fallback to info.bat)."""
         ps1 = os.path.join(os.getcwd(), 'info.ps1')
@@ -257,6 +364,169 @@ if __name__ == "__main__":
                 pass
         return False
 
+    def print_rolling_stats(buffer, windows):
+        """Print rolling min/mean/max/p95 of the summary metrics for each window."""
+        print(f"\n{Colors.BOLD}═══ Rolling Stats ({len(buffer)} samples) ═══{Colors.ENDC}")
+        latest = buffer.latest()
+        for window in windows:
+            stats = buffer.stats(window, columns=['cpu_pct', 'mem_used_bytes', 'disk_used_bytes', 'ping_avg_ms'])
+            print(f"  {Colors.BOLD}Last {window}s:{Colors.ENDC}")
+            cpu = stats.get('cpu_pct')
+            if cpu:
+                print(f"    CPU:    mean {cpu['mean']:.1f}%  min {cpu['min']:.1f}%  max {cpu['max']:.1f}%  p95 {cpu['p95']:.1f}%")
+            mem = stats.get('mem_used_bytes')
+            if mem and latest.get('mem_total_bytes'):
+                total = latest['mem_total_bytes']
+                print(f"    Memory: mean {mem['mean'] / total * 100:.1f}%  min {mem['min'] / total * 100:.1f}%  max {mem['max'] / total * 100:.1f}%  p95 {mem['p95'] / total * 100:.1f}%")
+            disk = stats.get('disk_used_bytes')
+            if disk and latest.get('disk_total_bytes'):
+                total = latest['disk_total_bytes']
+                print(f"    Disk:   mean {disk['mean'] / total * 100:.1f}%  max {disk['max'] / total * 100:.1f}%")
+            ping = stats.get('ping_avg_ms')
+            if ping:
+                print(f"    Ping:   mean {ping['mean']:.1f} ms  p50 {ping['p50']:.1f} ms  p95 {ping['p95']:.1f} ms  p99 {ping['p99']:.1f} ms")
+        if process_table is not None:
+            from collector import format_process
+            print(f"  {Colors.BOLD}Top processes:{Colors.ENDC}")
+            for entry in process_table.leaderboard(args.top):
+                print(f"    {format_process(entry)}")
+
+    def print_profile(profiler):
+        """Print wall time and peak RSS per stage collected by --profile."""
+        print(f"\n{Colors.BOLD}═══ Profile ═══{Colors.ENDC}")
+        print(f"  {'Stage':<12}{'Time (ms)':>12}{'Calls':>10}{'Peak RSS (MB)':>16}")
+        for row in profiler.results():
+            rss = f"{row['peak_rss_bytes'] / (1024**2):.1f}" if row['peak_rss_bytes'] else '-'
+            print(f"  {row['stage']:<12}{row['seconds'] * 1000:>12.1f}{row['calls']:>10}{rss:>16}")
+
+    def open_history():
+        """Open the metric history store unless --no-history; None on failure."""
+        if args.no_history:
+            return None
+        try:
+            from history import HistoryStore
+            return HistoryStore(args.history_db)
+        except Exception as e:
+            print(f"{Colors.WARNING}Metric history unavailable: {e}{Colors.ENDC}")
+            return None
+
+    def open_alerts():
+        """Compile --alert-rules and start the notification sinks; (None, None) if off."""
+        if not args.alert_rules:
+            return None, None
+        from alerts import AlertEngine, AlertDispatcher, WebhookSink, CommandSink, load_rules
+        from history import parse_duration
+        try:
+            rules = load_rules(args.alert_rules, parse_duration(args.alert_cooldown))
+        except (OSError, ValueError) as e:
+            print(f"{Colors.FAIL}Alert rules not loaded: {e}{Colors.ENDC}")
+            sys.exit(1)
+        sinks = []
+        if args.alert_webhook:
+            sinks.append(WebhookSink(args.alert_webhook))
+        if args.alert_command:
+            sinks.append(CommandSink(args.alert_command))
+
+        def sink_failed(sink, error):
+            print(f"{Colors.WARNING}Alert delivery via {type(sink).__name__} failed: {error}{Colors.ENDC}")
+
+        dispatcher = AlertDispatcher(sinks, args.alert_rate, on_error=sink_failed) if sinks else None
+        print(f"{Colors.OKBLUE}Loaded {len(rules)} alert rule(s) from {args.alert_rules}{Colors.ENDC}")
+        return AlertEngine(rules), dispatcher
+
+    def report_alerts(events, dispatcher):
+        """Print alert events and hand them to the sinks."""
+        for event in events:
+            color = Colors.FAIL if event['status'] == 'firing' else Colors.OKGREEN
+            print(f"{color}[ALERT {event['status'].upper()}] {event['rule']}: {event['message']}{Colors.ENDC}")
+        if dispatcher is not None and events:
+            dispatcher.dispatch(events)
+
+    def run_upload(sections, summary, drain_only=False):
+        """Upload (or just drain the spool) and report the outcome."""
+        from uploader import auth_headers, upload_report
+        headers = {'X-LPM-Host': platform.node()}
+        headers.update(auth_headers(args.upload_bearer, args.upload_user, args.upload_pass))
+        try:
+            result = upload_report(args.upload_url, sections, summary, headers,
+                                   state_path=args.upload_state if args.upload_delta else None,
+                                   spool_dir=None if args.no_spool else args.spool_dir,
+                                   gzip_body=not args.upload_no_gzip, drain_only=drain_only)
+        except Exception as e:
+            print(f"{Colors.FAIL}Upload error: {e}{Colors.ENDC}")
+            return None
+        status = result['status']
+        if not drain_only:
+            if status is not None and 200 <= status < 300:
+                detail = f" ({result['mode']}: {result['sent']} of {result['total']} sections)" if args.upload_delta else ''
+                print(f"{Colors.OKGREEN}Upload succeeded, HTTP {status}{detail}{Colors.ENDC}")
+            else:
+                reason = f"HTTP {status}" if status is not None else result['error']
+                print(f"{Colors.FAIL}Upload failed: {reason}{Colors.ENDC}")
+                if result['spooled']:
+                    print(f"{Colors.WARNING}Report spooled to {args.spool_dir}; it will be resent on a later run{Colors.ENDC}")
+        if result['drained']:
+            print(f"{Colors.OKGREEN}Sent {result['drained']} spooled report(s){Colors.ENDC}")
+        if result['pending']:
+            print(f"{Colors.WARNING}{result['pending']} report(s) waiting in spool{Colors.ENDC}")
+        return result
+
+    # Live mode: a dashboard that redraws only what changed
+    if args.live:
+        from dashboard import Dashboard, enable_ansi
+        if not sys.stdout.isatty() or not enable_ansi():
+            print(f"{Colors.FAIL}--live needs an interactive terminal{Colors.ENDC}")
+            sys.exit(1)
+        Dashboard(Colors, interval=args.interval, top=args.top).run()
+        sys.exit(0)
+
+    # Daemon mode: stay resident and sample instead of producing a one-shot report
+    if args.daemon:
+        from monitor import run_daemon
+        try:
+            windows = [int(w) for w in args.windows.split(',') if w.strip()]
+        except ValueError:
+            windows = None
+        if not windows or min(windows) <= 0:
+            print(f"{Colors.FAIL}--windows needs one or more positive whole seconds, e.g. 60,300,900{Colors.ENDC}")
+            sys.exit(1)
+        print(f"{Colors.OKBLUE}Sampling every {args.interval:g}s (Ctrl+C to stop)...{Colors.ENDC}")
+        history = open_history()
+        process_table = None
+        if args.top > 0:
+            from processes import ProcessTable
+            process_table = ProcessTable()
+        engine, dispatcher = open_alerts()
+        on_sample = None
+        if history is not None or engine is not None:
+            from alerts import derive_metrics
+            next_services = [0.0]
+
+            def on_sample(columns, timestamp, values):
+                metrics = dict(zip(columns, values))
+                if history is not None:
+                    history.add(timestamp, metrics)
+                if engine is None:
+                    return
+                events = engine.evaluate(derive_metrics(metrics), timestamp)
+                # Service states are polled far less often than metrics are sampled
+                if engine.watches_services and timestamp >= next_services[0]:
+                    from collector import collect_services
+                    from records import parse_records
+                    next_services[0] = timestamp + SERVICE_ALERT_INTERVAL
+                    events += engine.evaluate_services(parse_records('Services', collect_services() or []), timestamp)
+                report_alerts(events, dispatcher)
+        try:
+            run_daemon(interval=args.interval, windows=windows, capacity=args.history_size,
+                       on_report=print_rolling_stats, on_sample=on_sample, process_table=process_table)
+        finally:
+            if history is not None:
+                history.close()
+            if dispatcher is not None:
+                dispatcher.close()
+        print(f"\n{Colors.OKGREEN}✓ Sampling stopped.{Colors.ENDC}\n")
+        sys.exit(0)
+
     # Handle credential prompts
     if args.prompt_creds and args.upload_url:
         auth_type, creds = prompt_upload_creds()
@@ -265,144 +535,139 @@ if __name__ == "__main__":
         else:
             args.upload_user, args.upload_pass = creds
 
+    # Drain-only mode: resend spooled reports without collecting a new one
+    if args.drain_spool:
+        if not args.upload_url:
+            print(f"{Colors.FAIL}--drain-spool requires --upload URL{Colors.ENDC}")
+            sys.exit(1)
+        result = run_upload(None, None, drain_only=True)
+        sys.exit(0 if result is not None and not result['pending'] else 1)
+
     # Parse section filter
     section_filter = [s.strip() for s in args.sections.split(',')] if args.sections else None
 
+    # Native collection runs in-process; info.ps1 + info.txt is only the fallback
+    sections = None
+    if args.collector == 'native':
+        try:
+            from collector import (run_collectors, collect_top_processes, collect_ping, ping_deadline,
+                                   InventoryCache, SECTION_COLLECTORS)
+            ping_targets = [t.strip() for t in args.ping_targets.split(',') if t.strip()] if args.ping_targets else None
+            configured = {
+                'Top Processes': lambda: collect_top_processes(args.top),
+                'Ping Test': lambda: collect_ping(ping_targets, args.ping_count),
+            }
+            collectors = [(name, configured.get(name, func))
+                          for name, func in SECTION_COLLECTORS if name != 'Top Processes' or args.top > 0]
+            if args.section_timeout:
+                timeouts = {name: args.section_timeout for name, _func in collectors}
+            else:
+                timeouts = {'Ping Test': ping_deadline(args.ping_count)}
+            inventory = None if args.no_inventory_cache else InventoryCache(refresh=args.refresh_inventory)
+            with profiler.stage('collect'):
+                sections, collect_status = run_collectors(collectors, timeouts=timeouts, inventory=inventory)
+            cached = [sec for sec, st in collect_status.items() if st['status'] == 'cached']
+            if cached:
+                print(f"{Colors.OKCYAN}Reused cached inventory: {', '.join(cached)}{Colors.ENDC}")
+            for sec, st in collect_status.items():
+                if st['status'] == 'timed_out':
+                    print(f"{Colors.WARNING}Section '{sec}' timed out after {st['elapsed']:.1f}s; showing partial results{Colors.ENDC}")
+        except Exception as e:
+            print(f"{Colors.WARNING}Native collector failed ({e}); falling back to PowerShell collector{Colors.ENDC}")
+            args.run_collector = True
+
     # Optionally run collector
-    if args.run_collector:
+    if not sections and args.run_collector:
         print(f"{Colors.OKBLUE}Running collector...{Colors.ENDC}")
-        ok = run_collector_cmd()
+        with profiler.stage('collect'):
+            ok = run_collector_cmd()
         if not ok:
             print(f"{Colors.WARNING}Collector run failed; will continue to parse any existing info.txt{Colors.ENDC}")
 
-    # Check for info.txt from batch file. Wait up to `wait_seconds` seconds.
-    wait_seconds = args.wait_seconds
-    start_time = time.time()
-    info_raw = None
-    while time.time() - start_time < wait_seconds:
-        if os.path.exists("done.txt"):
-            try:
-                with open("info.txt", "r", encoding='utf-8', errors='ignore') as f:
-                    info_raw = f.read()
-            except FileNotFoundError:
-                info_raw = None
-            break
-        time.sleep(0.5)
+    # Without native sections, stream info.txt from the batch file, following it
+    # while it is still being written. Wait up to `wait_seconds` seconds.
+    info_file = None
+    if sections:
+        events = iter_sections(sections)
     else:
-        print(f"\n{Colors.WARNING}Batch script not completed within {wait_seconds} seconds; continuing.{Colors.ENDC}")
-
-    # Parse the info file into structured sections for nicer display and optional JSON export
-    def parse_info(text):
-        sections = {}
-        if not text:
-            return sections
-        current = 'General'
-        sections[current] = []
-        for raw_line in text.splitlines():
-            line = raw_line.strip()
-            # Remove leftover literal backslash-n markers if present
-            if line.startswith('\\n'):
-                line = line[2:].strip()
-            if line.startswith('===') and line.endswith('==='):
-                title = line.strip('= ').strip()
-                current = title
-                sections[current] = []
-                continue
-            if line == '':
-                continue
-            sections.setdefault(current, []).append(line)
-        return sections
-    if info_raw:
-        sections = parse_info(info_raw)
-        print(f"\n{Colors.BOLD}=== Batch Script Information ==={Colors.ENDC}")
-        # Print sections in order, filter if needed
-        for sec, lines in sections.items():
-            if not should_include_section(sec, section_filter):
-                continue
-            print(f"\n{Colors.BOLD}{sec}:{Colors.ENDC}")
-            # Special handling for large sections: limit installed programs
-            if 'Installed Programs' in sec and len(lines) > 50:
-                print(f"  {Colors.WARNING}[Showing first 50 of {len(lines)} installed programs]{Colors.ENDC}")
-                for ln in lines[:50]:
-                    print(f"  {ln}")
-                print(f"  {Colors.OKCYAN}... ({len(lines) - 50} more) - See exports for full list{Colors.ENDC}")
-            elif 'Services' in sec and len(lines) > 100:
-                print(f"  {Colors.WARNING}[Showing first 100 of {len(lines)} services]{Colors.ENDC}")
-                for ln in lines[:100]:
-                    print(f"  {ln}")
-                print(f"  {Colors.OKCYAN}... ({len(lines) - 100} more) - See exports for full list{Colors.ENDC}")
-            else:
-                for ln in lines:
-                    print(f"  {ln}")
-
-        # Helper: parse sizes like "1.77 TB" into bytes
-        def parse_size_to_bytes(s):
-            if not s:
-                return 0
-            m = re.search(r"([0-9,.]+)\s*(KB|MB|GB|TB|B)", s, re.I)
-            if not m:
-                return 0
-            val = float(m.group(1).replace(',',''))
-            unit = m.group(2).upper()
-            mul = {'B':1, 'KB':1024, 'MB':1024**2, 'GB':1024**3, 'TB':1024**4}
-            return int(val * mul.get(unit,1))
-
-        # Numeric summaries
-        summary = {}
-        # Disk totals from parsed "Disks (Logical)"
-        disk_lines = sections.get('Disks (Logical)', [])
-        total_bytes = 0
-        free_bytes = 0
-        i = 0
-        while i < len(disk_lines):
-            ln = disk_lines[i]
-            # Some entries span two lines (DeviceID line then Size line)
-            if 'Size:' in ln and 'Free:' in ln:
-                msize = re.search(r"Size:\s*([0-9.,]+\s*(?:KB|MB|GB|TB|B))", ln, re.I)
-                mfree = re.search(r"Free:\s*([0-9.,]+\s*(?:KB|MB|GB|TB|B))", ln, re.I)
-                if msize:
-                    total_bytes += parse_size_to_bytes(msize.group(1))
-                if mfree:
-                    free_bytes += parse_size_to_bytes(mfree.group(1))
-            else:
-                # next line might contain size/free
-                if i+1 < len(disk_lines):
-                    ln2 = disk_lines[i+1]
-                    if 'Size:' in ln2 and 'Free:' in ln2:
-                        msize = re.search(r"Size:\s*([0-9.,]+\s*(?:KB|MB|GB|TB|B))", ln2, re.I)
-                        mfree = re.search(r"Free:\s*([0-9.,]+\s*(?:KB|MB|GB|TB|B))", ln2, re.I)
-                        if msize:
-                            total_bytes += parse_size_to_bytes(msize.group(1))
-                        if mfree:
-                            free_bytes += parse_size_to_bytes(mfree.group(1))
-                        i += 1
-            i += 1
-        summary['disk_total_bytes'] = total_bytes
-        summary['disk_free_bytes'] = free_bytes
-        summary['disk_used_bytes'] = max(0, total_bytes - free_bytes)
-
-        # Ping average from "Ping Test" section
-        ping_vals = []
-        for ln in sections.get('Ping Test', []):
-            m = re.search(r"time=([0-9]+)ms", ln)
-            if m:
-                ping_vals.append(int(m.group(1)))
-            m2 = re.search(r"Average:\s*([0-9.,]+)ms", ln, re.I)
-            if m2:
+        wait_seconds = args.wait_seconds
+        start_time = time.monotonic()
+        info_file = open_info_file('info.txt', wait_seconds)
+        remaining = max(0, wait_seconds - (time.monotonic() - start_time))
+        events = iter_info(info_file, follow=True, done=lambda: os.path.exists('done.txt'), timeout=remaining) if info_file else iter(())
+
+    # One pass over the report feeds the console, the summary and every exporter
+    events = profiler.timed_iter('parse', events)
+    printer = profiler.instrument(ConsolePrinter(), 'console', 'begin_section', 'write_line')
+    exporters = []
+    upload_sections = {} if args.upload_url else None
+    summary_builder = profiler.instrument(SummaryBuilder(), 'summarise', 'feed')
+    run_metrics = None
+    if not args.no_history or args.alert_rules:
+        from history import RunMetrics
+        run_metrics = profiler.instrument(RunMetrics(), 'summarise', 'feed')
+    alert_engine, alert_dispatcher = open_alerts()
+    alert_services = None
+    if alert_engine is not None and alert_engine.watches_services:
+        from records import RecordStream
+        alert_services = []
+        alert_service_stream = RecordStream(lambda _sec, record: alert_services.append(record), ('Services',))
+    seen_any = False
+    reached_end = False
+    include = False
+    for sec, line in events:
+        if not seen_any:
+            # Exporters are only imported and opened once there is something to export
+            export_paths = {fmt: getattr(args, f"{fmt}_out") for fmt in EXPORT_FORMATS if getattr(args, f"{fmt}_out")}
+            if export_paths:
+                from exporters import EXPORTERS
+            for fmt, path in export_paths.items():
+                exporter_cls = EXPORTERS[fmt]
                 try:
-                    ping_vals.append(int(float(m2.group(1))))
-                except Exception:
-                    pass
-        summary['ping_avg_ms'] = (sum(ping_vals) / len(ping_vals)) if ping_vals else None
+                    exporters.append(profiler.instrument(exporter_cls(path), 'export', 'begin_section', 'write_line'))
+                except Exception as e:
+                    print(f"{Colors.FAIL}Failed to write {exporter_cls.label}: {e}{Colors.ENDC}")
+            seen_any = True
+        summary_builder.feed(sec, line)
+        if run_metrics is not None:
+            run_metrics.feed(sec, line)
+        if alert_services is not None:
+            alert_service_stream.feed(sec, line)
+        if line is None:
+            reached_end = reached_end or sec == END_OF_REPORT
+            include = should_include_section(sec, section_filter)
+        if not include:
+            continue
+        if line is None:
+            printer.begin_section(sec)
+        else:
+            printer.write_line(line)
+        if upload_sections is not None:
+            if line is None:
+                upload_sections[sec] = []
+            else:
+                upload_sections[sec].append(line)
+        for exporter in list(exporters):
+            try:
+                if line is None:
+                    exporter.begin_section(sec)
+                else:
+                    exporter.write_line(line)
+            except Exception as e:
+                print(f"{Colors.FAIL}Failed to write {exporter.label}: {e}{Colors.ENDC}")
+                exporter.close()
+                exporters.remove(exporter)
+    for stage in ('parse', 'console', 'summarise', 'export'):
+        profiler.mark_peak(stage)
+    if info_file is not None:
+        info_file.close()
+        if seen_any and not reached_end and not os.path.exists('done.txt'):
+            print(f"\n{Colors.WARNING}Batch script not completed within {args.wait_seconds} seconds; continuing.{Colors.ENDC}")
 
-        # Memory via psutil for accurate values
-        try:
-            vm = psutil.virtual_memory()
-            summary['mem_total_bytes'] = vm.total
-            summary['mem_available_bytes'] = vm.available
-            summary['mem_used_bytes'] = vm.total - vm.available
-        except Exception:
-            summary['mem_total_bytes'] = None
+    if seen_any:
+        printer.finish()
+        with profiler.stage('summarise'):
+            summary = summary_builder.result()
 
         # Print numeric summary with improved formatting
         print(f"\n{Colors.BOLD}═══ Summary ═══{Colors.ENDC}")
@@ -421,86 +686,61 @@ if __name__ == "__main__":
         if summary.get('ping_avg_ms') is not None:
             print(f"  {Colors.BOLD}Network:{Colors.ENDC}")
             print(f"    Ping Avg: {summary['ping_avg_ms']:.1f} ms")
+            if summary.get('ping_p50_ms') is not None:
+                print(f"    Ping p50/p95/p99: {summary['ping_p50_ms']:.1f} / {summary['ping_p95_ms']:.1f} / {summary['ping_p99_ms']:.1f} ms")
+            if summary.get('ping_jitter_ms') is not None:
+                print(f"    Jitter: {summary['ping_jitter_ms']:.2f} ms")
+            if summary.get('ping_loss_pct') is not None:
+                print(f"    Loss: {summary['ping_loss_pct']:.1f}%")
 
-        # JSON export (with section filtering if specified)
-        if args.json_out:
+        # Exports were streamed above; write the summary and close them
+        for exporter in exporters:
             try:
-                filtered_secs = {k: v for k, v in sections.items() if should_include_section(k, section_filter)}
-                with open(args.json_out, 'w', encoding='utf-8') as jf:
-                    json.dump({'sections': filtered_secs, 'summary': summary}, jf, indent=2, ensure_ascii=False)
-                print(f"{Colors.OKGREEN}Wrote JSON export to {args.json_out}{Colors.ENDC}")
+                with profiler.stage('export'):
+                    exporter.finish(summary)
+                print(f"{Colors.OKGREEN}Wrote {exporter.label} export to {exporter.path}{Colors.ENDC}")
             except Exception as e:
-                print(f"{Colors.FAIL}Failed to write JSON: {e}{Colors.ENDC}")
+                exporter.close()
+                print(f"{Colors.FAIL}Failed to write {exporter.label}: {e}{Colors.ENDC}")
 
-        # CSV export (section, entry) with filtering
-        if args.csv_out:
-            try:
-                with open(args.csv_out, 'w', newline='', encoding='utf-8') as cf:
-                    writer = csv.writer(cf)
-                    writer.writerow(['section', 'entry'])
-                    for sec, lines in sections.items():
-                        if not should_include_section(sec, section_filter):
-                            continue
-                        for ln in lines:
-                            writer.writerow([sec, ln])
-                print(f"{Colors.OKGREEN}Wrote CSV export to {args.csv_out}{Colors.ENDC}")
-            except Exception as e:
-                print(f"{Colors.FAIL}Failed to write CSV: {e}{Colors.ENDC}")
+        metrics = run_metrics.result(summary) if run_metrics is not None else None
 
-        # XML export (sanitize content to remove null bytes)
-        if args.xml_out:
-            try:
-                def sanitize_xml_text(text):
-                    """Remove null bytes and other invalid XML characters."""
-                    if not text:
-                        return ''
-                    # Remove null bytes and other control characters (except tab, newline, carriage return)
-                    return ''.join(c for c in text if c >= ' ' or c in '\t\n\r')
-                
-                root = ET.Element('report')
-                secs = ET.SubElement(root, 'sections')
-                for sec, lines in sections.items():
-                    if not should_include_section(sec, section_filter):
-                        continue
-                    s = ET.SubElement(secs, 'section', name=sanitize_xml_text(sec))
-                    for ln in lines:
-                        e = ET.SubElement(s, 'entry')
-                        e.text = sanitize_xml_text(ln)
-                summ = ET.SubElement(root, 'summary')
-                for k,v in summary.items():
-                    kv = ET.SubElement(summ, 'metric', name=sanitize_xml_text(str(k)))
-                    kv.text = sanitize_xml_text(str(v))
-                tree = ET.ElementTree(root)
-                tree.write(args.xml_out, encoding='utf-8', xml_declaration=True)
-                print(f"{Colors.OKGREEN}Wrote XML export to {args.xml_out}{Colors.ENDC}")
-            except Exception as e:
-                print(f"{Colors.FAIL}Failed to write XML: {e}{Colors.ENDC}")
+        # Alert rules see this run as one sample; streaks carry over between runs
+        if alert_engine is not None:
+            with profiler.stage('alerts'):
+                alert_engine.load_state()
+                now = time.time()
+                events = alert_engine.evaluate(metrics, now)
+                if alert_services is not None:
+                    alert_service_stream.finish()
+                    events += alert_engine.evaluate_services(alert_services, now)
+                alert_engine.save_state()
+                report_alerts(events, alert_dispatcher)
+                if alert_dispatcher is not None:
+                    alert_dispatcher.close()
+
+        # Keep the numbers for `LPM.py history` trend queries
+        if run_metrics is not None and not args.no_history:
+            with profiler.stage('history'):
+                history = open_history()
+                if history is not None:
+                    try:
+                        history.record(time.time(), metrics)
+                        history.close()
+                    except Exception as e:
+                        print(f"{Colors.WARNING}Could not record metric history: {e}{Colors.ENDC}")
 
         # Upload
         if args.upload_url:
-            try:
-                filtered_secs = {k: v for k, v in sections.items() if should_include_section(k, section_filter)}
-                payload = json.dumps({'sections': filtered_secs, 'summary': summary}).encode('utf-8')
-                headers = {'Content-Type':'application/json'}
-                # Add auth header if provided
-                if getattr(args, 'upload_bearer', None):
-                    headers['Authorization'] = f"Bearer {args.upload_bearer}"
-                elif getattr(args, 'upload_user', None) and getattr(args, 'upload_pass', None):
-                    import base64
-                    creds = f"{args.upload_user}:{args.upload_pass}".encode('utf-8')
-                    headers['Authorization'] = 'Basic ' + base64.b64encode(creds).decode('ascii')
-                req = urllib.request.Request(args.upload_url, data=payload, headers=headers)
-                with urllib.request.urlopen(req, timeout=30) as resp:
-                    code = resp.getcode()
-                print(f"{Colors.OKGREEN}Upload succeeded, HTTP {code}{Colors.ENDC}")
-            except urllib.error.HTTPError as he:
-                print(f"{Colors.FAIL}Upload failed: HTTP {he.code}{Colors.ENDC}")
-            except Exception as e:
-                print(f"{Colors.FAIL}Upload error: {e}{Colors.ENDC}")
+            with profiler.stage('upload'):
+                run_upload(upload_sections, summary)
     else:
         print(f"\n{Colors.WARNING}No batch info available.{Colors.ENDC}")
     
     # Display system information
-    get_system_info()
+    with profiler.stage('system_info'):
+        get_system_info()
+    if args.profile:
+        print_profile(profiler)
     print(f"\n{Colors.OKGREEN}✓ Information retrieval complete!{Colors.ENDC}\n")
     input("Press Enter to exit...")
\ No newline at end of file
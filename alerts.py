@@ -0,0 +1,364 @@
+"""Threshold, rate-of-change and service-state alerting for LPM.
+
+Rules are plain text, one per line, optionally named:
+
+    disk_full: disk_used_pct > 90 for 3 samples
+    mem_climb: rate(mem_used_bytes) > 500MB per minute
+    ping_p95: ping_p95_ms >= 150 for 2 samples cooldown 1h
+    spooler: service Spooler != Running
+
+A rule fires once its condition has held for `for N samples` consecutive
+samples (default 1), re-notifies at most once per cooldown while it keeps
+firing, and sends a "resolved" event when the condition clears. Rules are
+compiled once and indexed by the metric (or service) they watch, so each
+sample only touches the rules whose inputs it carries.
+"""
+import json
+import operator
+import os
+import platform
+import queue
+import re
+import subprocess
+import threading
+import time
+
+import cache
+from history import parse_duration
+from records import Service, parse_size_to_bytes
+
+DEFAULT_COOLDOWN = 15 * 60.0
+DEFAULT_MAX_PER_MINUTE = 30
+# One-shot runs keep rule streaks here so "for N samples" spans runs
+STATE_CACHE = 'alerts_state.json'
+
+OPERATORS = {
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
+RATE_UNITS = {'second': 1.0, 'minute': 60.0, 'hour': 3600.0}
+
+RULE_RE = re.compile(
+    r"^(?:(?P<name>[\w-]+)\s*:\s+)?(?P<cond>.+?)"
+    r"(?:\s+for\s+(?P<samples>\d+)\s+samples?)?"
+    r"(?:\s+cooldown\s+(?P<cooldown>\S+))?\s*$", re.I)
+THRESHOLD_RE = re.compile(r"^(?P<metric>\S+?)\s*(?P<op>>=|<=|==|!=|>|<)\s*(?P<value>\S+(?:\s*[KMGT]?B)?)$", re.I)
+RATE_RE = re.compile(
+    r"^rate\((?P<metric>[^)\s]+)\)\s*(?P<op>>=|<=|==|!=|>|<)\s*(?P<value>\S+(?:\s*[KMGT]?B)?)"
+    r"(?:\s+per\s+(?P<unit>second|minute|hour))?$", re.I)
+SERVICE_RE = re.compile(r"^service\s+(?P<service>.+?)\s+(?P<op>==|!=)\s+(?P<state>[\w ]+)$", re.I)
+
+
+class RuleError(ValueError):
+    """A rule line that does not parse"""
+
+
+def _number(text):
+    text = text.strip()
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    if re.search(r"[KMGT]?B$", text, re.I):
+        return float(parse_size_to_bytes(text))
+    raise RuleError(f"not a number: {text!r}")
+
+
+class Rule:
+    """One compiled rule and its evaluation state"""
+
+    __slots__ = ('name', 'text', 'kind', 'key', 'op', 'op_text', 'threshold', 'per', 'samples',
+                 'cooldown', 'streak', 'firing', 'last_notified', 'prev_value', 'prev_time', 'value')
+
+    def __init__(self, name, text, kind, key, op_text, threshold, per=1.0, samples=1, cooldown=DEFAULT_COOLDOWN):
+        self.name = name
+        self.text = text
+        self.kind = kind
+        self.key = key
+        self.op_text = op_text
+        self.op = OPERATORS[op_text]
+        self.threshold = threshold
+        self.per = per
+        self.samples = samples
+        self.cooldown = cooldown
+        self.streak = 0
+        self.firing = False
+        self.last_notified = None
+        self.prev_value = None
+        self.prev_time = None
+        self.value = None
+
+    def observe(self, value, timestamp):
+        """Feed one observation; returns 'firing', 'resolved' or None"""
+        if self.kind == 'rate':
+            prev_value, prev_time = self.prev_value, self.prev_time
+            self.prev_value, self.prev_time = value, timestamp
+            if prev_time is None or timestamp <= prev_time:
+                return None
+            value = (value - prev_value) / (timestamp - prev_time) * self.per
+        self.value = value
+        if self.op(value, self.threshold):
+            self.streak += 1
+            if self.streak < self.samples:
+                return None
+            if not self.firing or timestamp - self.last_notified >= self.cooldown:
+                self.firing = True
+                self.last_notified = timestamp
+                return 'firing'
+            return None
+        self.streak = 0
+        if self.firing:
+            self.firing = False
+            return 'resolved'
+        return None
+
+    def describe(self, value):
+        if self.kind == 'service':
+            return f"service {self.key} is {value} (alerts when {self.op_text} {self.threshold})"
+        what = f"rate({self.key})" if self.kind == 'rate' else self.key
+        return f"{what} = {value:,.2f} (alerts when {self.op_text} {self.threshold:,.2f})"
+
+    def state(self):
+        return [self.streak, self.firing, self.last_notified, self.prev_value, self.prev_time]
+
+    def restore(self, state):
+        self.streak, self.firing, self.last_notified, self.prev_value, self.prev_time = state
+
+
+def parse_rule(line, default_cooldown=DEFAULT_COOLDOWN):
+    """Compile one rule line into a Rule; raises RuleError"""
+    m = RULE_RE.match(line.strip())
+    if not m:
+        raise RuleError(f"cannot parse rule: {line.strip()!r}")
+    cond = m.group('cond').strip()
+    samples = int(m.group('samples') or 1)
+    try:
+        cooldown = parse_duration(m.group('cooldown')) if m.group('cooldown') else default_cooldown
+    except ValueError as e:
+        raise RuleError(str(e))
+    name = m.group('name') or cond
+    if samples < 1:
+        raise RuleError(f"{name}: 'for' needs at least 1 sample")
+    sm = SERVICE_RE.match(cond)
+    if sm:
+        return Rule(name, line.strip(), 'service', sm.group('service').strip(), sm.group('op'),
+                    sm.group('state').strip().lower(), samples=samples, cooldown=cooldown)
+    rm = RATE_RE.match(cond)
+    if rm:
+        per = RATE_UNITS[(rm.group('unit') or 'second').lower()]
+        return Rule(name, line.strip(), 'rate', rm.group('metric'), rm.group('op'), _number(rm.group('value')),
+                    per=per, samples=samples, cooldown=cooldown)
+    tm = THRESHOLD_RE.match(cond)
+    if tm:
+        return Rule(name, line.strip(), 'threshold', tm.group('metric'), tm.group('op'), _number(tm.group('value')),
+                    samples=samples, cooldown=cooldown)
+    raise RuleError(f"cannot parse condition: {cond!r}")
+
+
+def load_rules(path, default_cooldown=DEFAULT_COOLDOWN):
+    """Read a rules file; blank lines and # comments are skipped"""
+    rules = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            try:
+                rules.append(parse_rule(line, default_cooldown))
+            except RuleError as e:
+                raise RuleError(f"{path}:{lineno}: {e}")
+    return rules
+
+
+def derive_metrics(metrics):
+    """Add disk_used_pct and mem_used_pct when the byte totals are present"""
+    if metrics.get('disk_total_bytes') and metrics.get('disk_used_bytes') is not None:
+        metrics.setdefault('disk_used_pct', metrics['disk_used_bytes'] / metrics['disk_total_bytes'] * 100)
+    if metrics.get('mem_total_bytes') and metrics.get('mem_used_bytes') is not None:
+        metrics.setdefault('mem_used_pct', metrics['mem_used_bytes'] / metrics['mem_total_bytes'] * 100)
+    return metrics
+
+
+class AlertEngine:
+    """Evaluates compiled rules incrementally against each new sample.
+
+    evaluate() returns alert events as dicts with rule, status ('firing' or
+    'resolved'), message, value, timestamp and host.
+    """
+
+    def __init__(self, rules, host=None):
+        self.rules = list(rules)
+        self.host = host or platform.node()
+        self.by_metric = {}
+        self.by_service = {}
+        for rule in self.rules:
+            index = self.by_service if rule.kind == 'service' else self.by_metric
+            index.setdefault(rule.key.lower() if rule.kind == 'service' else rule.key, []).append(rule)
+
+    @property
+    def watches_services(self):
+        return bool(self.by_service)
+
+    def _event(self, rule, status, value, timestamp):
+        return {
+            'rule': rule.name,
+            'status': status,
+            'message': rule.describe(value),
+            'value': value,
+            'condition': rule.text,
+            'timestamp': timestamp,
+            'host': self.host,
+        }
+
+    def evaluate(self, metrics, timestamp=None):
+        """Check {metric: value}; metrics missing or None leave their rules untouched"""
+        timestamp = time.time() if timestamp is None else timestamp
+        events = []
+        watched = self.by_metric
+        # Look up only metrics present on both sides, walking the smaller one
+        for key in (metrics if len(metrics) <= len(watched) else watched):
+            rules = watched.get(key)
+            value = metrics.get(key)
+            # NaN marks a missing sample in the daemon's ring buffer
+            if not rules or value is None or value != value:
+                continue
+            for rule in rules:
+                status = rule.observe(value, timestamp)
+                if status:
+                    events.append(self._event(rule, status, rule.value, timestamp))
+        return events
+
+    def evaluate_services(self, services, timestamp=None):
+        """Check Service records (or (name, display_name, state) tuples) against service rules"""
+        timestamp = time.time() if timestamp is None else timestamp
+        events = []
+        if not self.by_service:
+            return events
+        for svc in services:
+            if not isinstance(svc, Service):
+                svc = Service(svc[0], svc[1], svc[2], None)
+            rules = self.by_service.get(svc.name.lower()) or self.by_service.get((svc.display_name or '').lower())
+            if not rules:
+                continue
+            state = (svc.state or '').lower()
+            for rule in rules:
+                # The op compares the state, so "!= running" holds when the state is not running
+                status = rule.observe(state, timestamp)
+                if status:
+                    events.append(self._event(rule, status, svc.state, timestamp))
+        return events
+
+    def save_state(self, name=STATE_CACHE):
+        cache.save_json(name, {rule.text: rule.state() for rule in self.rules})
+
+    def load_state(self, name=STATE_CACHE):
+        saved = cache.load_json(name) or {}
+        for rule in self.rules:
+            state = saved.get(rule.text)
+            if isinstance(state, list) and len(state) == 5:
+                rule.restore(state)
+
+
+class WebhookSink:
+    """POSTs each event as JSON over a kept-alive connection"""
+
+    def __init__(self, url, headers=None, timeout=10):
+        from uploader import HttpSession
+        self.session = HttpSession(url, timeout=timeout, gzip_body=False)
+        self.headers = headers or {}
+
+    def send(self, event):
+        status, _body = self.session.post_json(event, self.headers)
+        if status >= 400:
+            raise OSError(f"webhook returned HTTP {status}")
+
+    def close(self):
+        self.session.close()
+
+
+class CommandSink:
+    """Runs a command per event with the event JSON on stdin and LPM_ALERT_* in the environment"""
+
+    def __init__(self, command, timeout=30):
+        self.command = command
+        self.timeout = timeout
+
+    def send(self, event):
+        env = dict(os.environ)
+        env.update({
+            'LPM_ALERT_RULE': event['rule'],
+            'LPM_ALERT_STATUS': event['status'],
+            'LPM_ALERT_MESSAGE': event['message'],
+            'LPM_ALERT_HOST': event['host'],
+        })
+        subprocess.run(self.command, shell=True, input=json.dumps(event).encode('utf-8'),
+                       env=env, timeout=self.timeout, check=True)
+
+
+class AlertDispatcher:
+    """Delivers events to sinks on a background thread, rate limited.
+
+    At most `max_per_minute` events are delivered per minute (a token bucket);
+    the rest are dropped and counted in `suppressed`, and the next delivered
+    event carries that count. Sampling never waits on a slow sink.
+    """
+
+    def __init__(self, sinks, max_per_minute=DEFAULT_MAX_PER_MINUTE, on_error=None):
+        self.sinks = list(sinks)
+        self.rate = max_per_minute / 60.0
+        self.capacity = float(max_per_minute)
+        self.tokens = self.capacity
+        self.refilled = time.monotonic()
+        self.suppressed = 0
+        self.sent = 0
+        self.on_error = on_error
+        self.queue = queue.Queue(maxsize=1000)
+        self.thread = threading.Thread(target=self._run, name='lpm-alerts', daemon=True)
+        self.thread.start()
+
+    def _allow(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.refilled) * self.rate)
+        self.refilled = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+    def dispatch(self, events):
+        for event in events:
+            if not self._allow():
+                self.suppressed += 1
+                continue
+            if self.suppressed:
+                event = dict(event, suppressed=self.suppressed)
+                self.suppressed = 0
+            try:
+                self.queue.put_nowait(event)
+            except queue.Full:
+                self.suppressed += 1
+
+    def _run(self):
+        while True:
+            event = self.queue.get()
+            if event is None:
+                return
+            for sink in self.sinks:
+                try:
+                    sink.send(event)
+                except Exception as e:
+                    if self.on_error:
+                        self.on_error(sink, e)
+            self.sent += 1
+
+    def close(self, timeout=10.0):
+        """Deliver what is queued (waiting up to `timeout` seconds), then stop"""
+        self.queue.put(None)
+        self.thread.join(timeout)
+        for sink in self.sinks:
+            if hasattr(sink, 'close'):
+                sink.close()
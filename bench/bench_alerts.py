@@ -0,0 +1,84 @@
+"""Time alert rule compilation and per-sample evaluation.
+
+Generates a mix of threshold, rate and service rules over the metrics a
+--daemon sample carries, compiles them once, then evaluates a stream of
+synthetic samples and reports the cost per sample:
+
+    python bench/bench_alerts.py
+    python bench/bench_alerts.py --rules 1000 --samples 20000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from alerts import AlertEngine, derive_metrics, parse_rule  # noqa: E402
+
+METRICS = ['cpu_pct', 'disk_used_pct', 'mem_used_pct', 'ping_avg_ms'] + \
+          [f"cpu{i}_pct" for i in range(16)] + [f"disk.{d}:.used_pct" for d in 'CDEFGH']
+
+
+def make_rules(n, rng):
+    lines = []
+    for i in range(n):
+        kind = i % 10
+        metric = rng.choice(METRICS)
+        if kind < 7:
+            lines.append(f"r{i}: {metric} > {rng.uniform(50, 99):.1f} for {rng.randint(1, 5)} samples")
+        elif kind < 9:
+            lines.append(f"r{i}: rate({metric}) > {rng.uniform(1, 20):.1f} per minute")
+        else:
+            lines.append(f"r{i}: service Svc{rng.randint(0, 200)} != Running")
+    return lines
+
+
+def make_samples(n, rng):
+    """Steady readings around 30 with an occasional spike, as a healthy host looks"""
+    samples = []
+    for t in range(n):
+        sample = {m: 30 + rng.gauss(0, 0.005) for m in METRICS}
+        if rng.random() < 0.01:
+            sample[rng.choice(METRICS)] = 99.5
+        sample.update({'mem_total_bytes': 16 * 1024**3, 'mem_used_bytes': 8 * 1024**3,
+                       'disk_total_bytes': 1024**4, 'disk_used_bytes': 0.6 * 1024**4})
+        samples.append((float(t), sample))
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the alert rules engine')
+    parser.add_argument('--rules', type=int, default=500, help='Number of rules to compile')
+    parser.add_argument('--samples', type=int, default=10000, help='Samples to evaluate')
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    lines = make_rules(args.rules, rng)
+    samples = make_samples(args.samples, rng)
+
+    start = time.perf_counter()
+    engine = AlertEngine([parse_rule(line) for line in lines], host='bench')
+    compile_s = time.perf_counter() - start
+
+    events = 0
+    start = time.perf_counter()
+    for timestamp, sample in samples:
+        events += len(engine.evaluate(derive_metrics(sample), timestamp))
+    eval_s = time.perf_counter() - start
+
+    services = [(f"Svc{i}", f"Service {i}", 'Stopped' if i % 7 else 'Running') for i in range(300)]
+    start = time.perf_counter()
+    events += len(engine.evaluate_services(services, 0.0))
+    services_s = time.perf_counter() - start
+
+    print(f"{args.rules} rules over {len(engine.by_metric)} metrics and {len(engine.by_service)} services")
+    print(f"  compile          {compile_s * 1000:>10.2f} ms")
+    print(f"  evaluate         {eval_s / args.samples * 1e6:>10.1f} us/sample ({args.samples} samples, {events} events)")
+    print(f"  services (300)   {services_s * 1e6:>10.1f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Measure the --live dashboard's own cost.
+
+Draws frames into a byte-counting sink for --seconds at --interval, then
+reports CPU time used by the dashboard as a share of one core, and bytes
+written per frame. The same run is repeated with every frame fully redrawn,
+which shows what the cell diff saves:
+
+    python bench/bench_dashboard.py
+    python bench/bench_dashboard.py --seconds 30 --interval 0.5
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from dashboard import Dashboard  # noqa: E402
+
+
+class Styles:
+    BOLD = '\033[1m'
+    OKGREEN = '\033[92m'
+    OKCYAN = '\033[96m'
+    WARNING = '\033[93m'
+    FAIL = '\033[91m'
+    ENDC = '\033[0m'
+
+
+class NullSink:
+    def write(self, data):
+        return len(data)
+
+    def flush(self):
+        pass
+
+
+def run(seconds, interval, full_redraw):
+    dashboard = Dashboard(Styles, interval=interval, out=NullSink(), size=(120, 50))
+    dashboard.step()
+    start_bytes = dashboard.screen.bytes_written
+    start_cpu = time.process_time()
+    start = time.monotonic()
+    next_tick = start
+    frames = 0
+    while time.monotonic() - start < seconds:
+        if full_redraw:
+            dashboard.screen.invalidate()
+        dashboard.step()
+        frames += 1
+        next_tick += interval
+        time.sleep(max(0.0, next_tick - time.monotonic()))
+    cpu = time.process_time() - start_cpu
+    wall = time.monotonic() - start
+    dashboard.sampler.stop()
+    return {
+        'frames': frames,
+        'cpu_pct': cpu / wall * 100,
+        'bytes_per_frame': (dashboard.screen.bytes_written - start_bytes) / frames,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the --live dashboard')
+    parser.add_argument('--seconds', type=float, default=20.0, help='How long to run each mode')
+    parser.add_argument('--interval', type=float, default=1.0, help='Seconds between frames')
+    args = parser.parse_args()
+
+    for label, full in (('cell diff', False), ('full redraw', True)):
+        r = run(args.seconds, args.interval, full)
+        print(f"{label:<12}{r['frames']:>6} frames  {r['cpu_pct']:>6.2f}% CPU  {r['bytes_per_frame']:>8.0f} bytes/frame")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Time report diffing: keyed indexes against naive line comparison.
+
+Builds a baseline report and variants of it with services changing state,
+programs installed, upgraded and removed, and hotfixes added. It times the
+keyed diff (ReportIndex + diff_indexes) against the naive approach of
+checking every raw line for membership in the other report's list, for one
+pair of reports and for one baseline against many:
+
+    python bench/bench_diff.py
+    python bench/bench_diff.py --size huge --reports 2000
+"""
+import argparse
+import copy
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from diff import ReportIndex, count_changes, diff_indexes, diff_reports  # noqa: E402
+from fixtures import SIZES, make_sections  # noqa: E402
+
+
+def mutate(sections, rng, changes):
+    """A copy of a report with `changes` random inventory changes"""
+    out = copy.deepcopy(sections)
+    services, programs = out['Services'], out['Installed Programs']
+    for i in range(changes):
+        kind = rng.randrange(5)
+        if kind == 0:
+            n = rng.randrange(len(services))
+            name, display, state, mode = services[n].split(' | ')
+            services[n] = ' | '.join((name, display, 'Stopped' if state == 'Running' else 'Running', mode))
+        elif kind == 1:
+            programs.insert(rng.randrange(len(programs)), f"New Program {i} | 1.{i} | Vendor {i % 5}")
+        elif kind == 2:
+            n = rng.randrange(len(programs) - 1)
+            name, _version, publisher = programs[n].split(' | ')
+            programs[n] = f"{name} | 99.{i} | {publisher}"
+        elif kind == 3:
+            del programs[rng.randrange(len(programs) - 1)]
+        else:
+            out['Installed Hotfixes (recent)'].append(f"KB59{i:05d}  2/1/2026 12:00:00 AM  Update")
+    return out
+
+
+def naive_diff(a, b):
+    """Added and removed raw lines per section via list membership, as done by hand"""
+    result = {}
+    for section in set(a) | set(b):
+        old, new = a.get(section, []), b.get(section, [])
+        added = [line for line in new if line not in old]
+        removed = [line for line in old if line not in new]
+        if added or removed:
+            result[section] = (added, removed)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark report diffing')
+    parser.add_argument('--size', choices=sorted(SIZES), default='large', help='Report size (see fixtures.SIZES)')
+    parser.add_argument('--reports', type=int, default=500, help='Reports compared with one baseline')
+    parser.add_argument('--changes', type=int, default=20, help='Random changes per report')
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    _, base = make_sections(seed=1, **SIZES[args.size])
+    others = [mutate(base, rng, args.changes) for _ in range(args.reports)]
+    lines = sum(len(v) for v in base.values())
+
+    start = time.perf_counter()
+    diff = diff_reports(base, others[0])
+    pair_s = time.perf_counter() - start
+    start = time.perf_counter()
+    naive_diff(base, others[0])
+    naive_pair_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = ReportIndex(base)
+    total = [0, 0, 0]
+    for other in others:
+        for i, n in enumerate(count_changes(diff_indexes(index, ReportIndex(other)))):
+            total[i] += n
+    many_s = time.perf_counter() - start
+    start = time.perf_counter()
+    for other in others:
+        naive_diff(base, other)
+    naive_many_s = time.perf_counter() - start
+
+    added, removed, changed = count_changes(diff)
+    print(f"{args.size} reports ({lines} lines), {args.changes} changes each")
+    print(f"  one pair, keyed     {pair_s * 1000:>9.2f} ms  (+{added} -{removed} ~{changed})")
+    print(f"  one pair, naive     {naive_pair_s * 1000:>9.2f} ms  ({naive_pair_s / pair_s:.0f}x slower, changes split into +/- lines)")
+    print(f"  1 vs {args.reports}, keyed    {many_s:>9.2f} s   ({many_s / args.reports * 1000:.2f} ms/report, "
+          f"+{total[0]} -{total[1]} ~{total[2]})")
+    print(f"  1 vs {args.reports}, naive    {naive_many_s:>9.2f} s   ({naive_many_s / many_s:.0f}x slower)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Benchmark LPM export formats: serialisation time and output size.
+
+Runs every streaming exporter over the same synthetic report, next to the
+original in-memory json.dump(indent=2) and ElementTree writers for reference.
+
+    python bench/bench_exporters.py --services 5000 --programs 2000 --repeat 5
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fixtures import make_sections  # noqa: E402
+from exporters import EXPORTERS, read_msgpack  # noqa: E402
+from report import iter_sections, summarize  # noqa: E402
+
+
+def legacy_sanitize(text):
+    if not text:
+        return ''
+    return ''.join(c for c in text if c >= ' ' or c in '\t\n\r')
+
+
+def legacy_json(path, sections, summary):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'sections': sections, 'summary': summary}, f, indent=2, ensure_ascii=False)
+
+
+def legacy_xml(path, sections, summary):
+    root = ET.Element('report')
+    secs_el = ET.SubElement(root, 'sections')
+    for sec, lines in sections.items():
+        sec_el = ET.SubElement(secs_el, 'section', name=legacy_sanitize(sec))
+        for ln in lines:
+            ET.SubElement(sec_el, 'entry').text = legacy_sanitize(ln)
+    sum_el = ET.SubElement(root, 'summary')
+    for k, v in summary.items():
+        ET.SubElement(sum_el, 'metric', name=legacy_sanitize(str(k))).text = legacy_sanitize(str(v))
+    ET.ElementTree(root).write(path, encoding='utf-8', xml_declaration=True)
+
+
+def stream_export(exporter_cls):
+    def run(path, sections, summary):
+        exporter = exporter_cls(path)
+        for sec, line in iter_sections(sections):
+            if line is None:
+                exporter.begin_section(sec)
+            else:
+                exporter.write_line(line)
+        exporter.finish(summary)
+    return run
+
+
+def measure(fn, path, sections, summary, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(path, sections, summary)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    with open(path, 'rb') as f:
+        data = f.read()
+    return {
+        'seconds': round(best, 5),
+        'bytes': len(data),
+        'gzip_bytes': len(gzip.compress(data, 6)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark LPM export formats')
+    parser.add_argument('--services', type=int, default=2000)
+    parser.add_argument('--programs', type=int, default=1000)
+    parser.add_argument('--hotfixes', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', dest='json_out', help='Also write results to this JSON file')
+    args = parser.parse_args()
+
+    _, sections = make_sections(services=args.services, programs=args.programs, hotfixes=args.hotfixes)
+    summary = summarize(sections)
+    candidates = [('json (legacy json.dump)', legacy_json), ('xml (legacy ElementTree)', legacy_xml)]
+    candidates += [(fmt, stream_export(cls)) for fmt, cls in EXPORTERS.items()]
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, fn in candidates:
+            path = os.path.join(tmp, name.split()[0] + '.out')
+            results[name] = measure(fn, path, sections, summary, args.repeat)
+            if name == 'msgpack':
+                loaded, _ = read_msgpack(path)
+                assert loaded == sections, 'MessagePack round trip mismatch'
+
+    lines = sum(len(v) for v in sections.values())
+    print(f"{lines} lines, best of {args.repeat}")
+    print(f"{'format':<26}{'ms':>10}{'bytes':>12}{'gzip':>10}")
+    for name, r in results.items():
+        print(f"{name:<26}{r['seconds'] * 1000:>10.1f}{r['bytes']:>12}{r['gzip_bytes']:>10}")
+    if args.json_out:
+        with open(args.json_out, 'w', encoding='utf-8') as f:
+            json.dump({'lines': lines, 'repeat': args.repeat, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Time a fleet sweep against simulated hosts.
+
+Each simulated host is a local `sh` command that sleeps for a per-host delay
+(standing in for connection and collection time) and then prints a synthetic
+info.txt report. The sweep's wall time is compared with the slowest host and
+with the sum of all hosts, which is what collecting one after another costs.
+POSIX only (needs sh, sleep and cat):
+
+    python bench/bench_fleet.py
+    python bench/bench_fleet.py --hosts 500 --workers 128 --max-delay 3
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fixtures import make_sections, format_info  # noqa: E402
+from fleet import LocalTransport, run_sweep  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark LPM.py fleet against simulated hosts')
+    parser.add_argument('--hosts', type=int, default=200, help='Simulated hosts')
+    parser.add_argument('--workers', type=int, default=256, help='Hosts collected at once')
+    parser.add_argument('--max-delay', type=float, default=2.0, help='Slowest simulated host, in seconds')
+    parser.add_argument('--timeout', type=float, default=60.0, help='Seconds allowed per host')
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        _, sections = make_sections(seed=1, services=150, programs=80)
+        report = os.path.join(tmp, 'report.txt')
+        with open(report, 'w', encoding='utf-8') as f:
+            f.writelines(line + '\n' for line in format_info(sections))
+        hosts, delays = [], {}
+        for i in range(args.hosts):
+            host = f"host-{i:04d}"
+            hosts.append(host)
+            delays[host] = round(rng.uniform(0.1, args.max_delay), 2)
+            with open(os.path.join(tmp, host), 'w') as f:
+                f.write(str(delays[host]))
+        transport = LocalTransport(f"sh -c 'sleep $(cat {tmp}/{{host}}); cat {report}'")
+
+        start = time.perf_counter()
+        results = run_sweep(hosts, transport, args.workers, args.timeout)
+        wall = time.perf_counter() - start
+
+    ok = sum(1 for r in results if r['status'] == 'ok')
+    slowest = max(delays.values())
+    total = sum(delays.values())
+    print(f"{args.hosts} hosts, {args.workers} workers: {ok} reported")
+    print(f"  sweep          {wall:>8.2f} s")
+    print(f"  slowest host   {slowest:>8.2f} s  (sweep overhead {wall - slowest:+.2f} s)")
+    print(f"  sequential     {total:>8.2f} s  ({total / wall:.0f}x slower)")
+    if ok != args.hosts:
+        for r in results:
+            if r['status'] != 'ok':
+                print(f"  FAIL {r['host']}: {r['error']}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
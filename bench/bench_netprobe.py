@@ -0,0 +1,124 @@
+"""Check and time the concurrent Ping Test prober against local listeners.
+
+Starts loopback TCP listeners (plus one that never accepts, so its queue fills
+and later probes are lost), probes them all at once with netprobe, and checks
+that every target reports sub-millisecond-precision stats, that the lossy
+target shows loss, and that probing N targets takes about as long as one.
+The same probes are then timed sequentially, the way the old Ping Test ran:
+
+    python bench/bench_netprobe.py
+    python bench/bench_netprobe.py --targets 16 --count 20 --out netprobe.json
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import netprobe  # noqa: E402
+from collector import format_ping_stats, tcp_rtt_ms  # noqa: E402
+from records import PingStats, parser_for  # noqa: E402
+
+
+def open_listeners(n):
+    """n accepting loopback listeners; the kernel completes handshakes for them"""
+    listeners = []
+    for _ in range(n):
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        s.bind(('127.0.0.1', 0))
+        s.listen(128)
+        listeners.append(s)
+    return listeners
+
+
+def open_blackhole():
+    """A listener that never accepts: once its backlog is full, SYNs go unanswered"""
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    s.bind(('127.0.0.1', 0))
+    s.listen(0)
+    return s
+
+
+def target_of(sock):
+    host, port = sock.getsockname()
+    return f"{host}:{port}"
+
+
+def sequential(targets, count, timeout):
+    """The previous Ping Test: one blocking connect after another"""
+    start = time.perf_counter()
+    for target in targets:
+        host, port = netprobe.parse_target(target)
+        for _ in range(count):
+            try:
+                tcp_rtt_ms(host, port, timeout)
+            except OSError:
+                pass
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the concurrent Ping Test prober')
+    parser.add_argument('--targets', type=int, default=8, help='Accepting listeners to probe')
+    parser.add_argument('--count', type=int, default=10, help='Probes per target')
+    parser.add_argument('--interval', type=float, default=0.05, help='Seconds between probes to one target')
+    parser.add_argument('--timeout', type=float, default=0.5, help='Per-probe timeout in seconds')
+    parser.add_argument('--out', help='Write results JSON to this path')
+    args = parser.parse_args()
+
+    listeners = open_listeners(args.targets)
+    blackhole = open_blackhole()
+    targets = [target_of(s) for s in listeners]
+    lossy = target_of(blackhole)
+    failures = []
+    try:
+        start = time.perf_counter()
+        results = netprobe.run_probes(targets + [lossy], args.count, args.interval, args.timeout)
+        concurrent_s = time.perf_counter() - start
+        seq_s = sequential(targets, args.count, args.timeout)
+    finally:
+        for s in listeners + [blackhole]:
+            s.close()
+
+    stats = [r.stats() for r in results]
+    for st in stats:
+        print(format_ping_stats(st))
+        # The stats line must round-trip through the report parser
+        record = parser_for('Ping Test').feed(format_ping_stats(st))
+        if not isinstance(record, PingStats) or record.sent != st['sent']:
+            failures.append(f"{st['target']}: stats line did not parse")
+    for st in stats[:-1]:
+        if st['received'] != args.count:
+            failures.append(f"{st['target']}: {st['received']}/{args.count} replies from an accepting listener")
+        if st['p50_ms'] is None or st['p50_ms'] >= 100:
+            failures.append(f"{st['target']}: implausible loopback p50 {st['p50_ms']}")
+    if stats[-1]['loss_pct'] <= 0:
+        failures.append(f"{lossy}: no loss reported for a listener that never accepts")
+    # Probes to one target are paced by interval; the lossy target can run to its deadline
+    budget = netprobe.worst_case_seconds(args.count, args.interval, args.timeout) + 0.5
+    if concurrent_s > budget:
+        failures.append(f"concurrent run took {concurrent_s:.2f}s, over the {budget:.2f}s budget")
+
+    paced = args.count * args.interval
+    probes = len(targets) * args.count
+    mean_p50 = sum(st['p50_ms'] for st in stats[:-1]) / len(targets)
+    print(f"\n{len(targets)} targets + 1 lossy x {args.count} probes: concurrent {concurrent_s * 1000:.0f} ms "
+          f"(pacing alone {paced * 1000:.0f} ms, lossy deadline {(paced + args.timeout) * 1000:.0f} ms)")
+    print(f"loopback p50 {mean_p50:.3f} ms concurrent vs {seq_s / probes * 1000:.3f} ms per blocking connect "
+          f"({seq_s * 1000:.0f} ms for all {probes} one after another)")
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump({'concurrent_seconds': concurrent_s, 'sequential_seconds': seq_s, 'targets': stats}, f, indent=2)
+    if failures:
+        for failure in failures:
+            print(f"FAIL {failure}")
+        sys.exit(1)
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
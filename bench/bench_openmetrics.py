@@ -0,0 +1,104 @@
+"""Time OpenMetrics rendering and scrapes of the cached exposition.
+
+Renders a synthetic report (services, disks, adapters, ping targets) once, as
+the background refresher does, then points concurrent keep-alive scrapers at
+`LPM.py metrics` and reports scrape latency. Collection never runs here, so the
+numbers are the cost the exporter adds per scrape:
+
+    python bench/bench_openmetrics.py
+    python bench/bench_openmetrics.py --scrapers 32 --requests 500 --gzip
+"""
+import argparse
+import asyncio
+import gzip
+import os
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fixtures import make_sections  # noqa: E402
+from monitor import percentile  # noqa: E402
+from openmetrics import MetricsCache, render, serve  # noqa: E402
+from report import summarize  # noqa: E402
+
+
+def add_ping(sections, targets):
+    lines = []
+    for i in range(targets):
+        lines.append(f"Target 10.0.0.{i}:53 | Sent 10 | Received 10 | Loss 0.0% | Min 1.000ms | Mean 1.500ms | "
+                     f"Max 2.000ms | p50 1.400ms | p95 1.900ms | p99 2.000ms | Jitter 0.200ms")
+    sections['Ping Test'] = lines + ['Average: 1.500ms']
+    sections['Processes'] = ['ProcessCount: 312']
+
+
+async def scraper(port, requests, accept_gzip, latencies):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    request = b'GET /metrics HTTP/1.1\r\nHost: bench\r\n' + (b'Accept-Encoding: gzip\r\n' if accept_gzip else b'') + b'\r\n'
+    size = 0
+    for _ in range(requests):
+        start = time.perf_counter()
+        writer.write(request)
+        length = 0
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            if line.lower().startswith(b'content-length:'):
+                length = int(line.split(b':', 1)[1])
+        body = await reader.readexactly(length)
+        latencies.append(time.perf_counter() - start)
+        size = len(body)
+    writer.close()
+    return size
+
+
+async def scrape_all(port, scrapers, requests, accept_gzip):
+    latencies = []
+    start = time.perf_counter()
+    sizes = await asyncio.gather(*(scraper(port, requests, accept_gzip, latencies) for _ in range(scrapers)))
+    return time.perf_counter() - start, latencies, sizes[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the OpenMetrics exporter')
+    parser.add_argument('--services', type=int, default=300, help='Services in the synthetic report')
+    parser.add_argument('--targets', type=int, default=4, help='Ping targets in the synthetic report')
+    parser.add_argument('--scrapers', type=int, default=8, help='Concurrent keep-alive scrapers')
+    parser.add_argument('--requests', type=int, default=200, help='Scrapes per scraper')
+    parser.add_argument('--gzip', action='store_true', help='Ask for gzip bodies')
+    parser.add_argument('--port', type=int, default=9191, help='Port for the exporter under test')
+    args = parser.parse_args()
+
+    _, sections = make_sections(seed=1, services=args.services, programs=0, disks=4, adapters=4)
+    add_ping(sections, args.targets)
+    summary = summarize(sections, live_memory=False)
+
+    runs = 20
+    start = time.perf_counter()
+    for _ in range(runs):
+        text = render(sections, summary, collected_at=time.time(), duration=1.0, collections=1)
+    render_s = (time.perf_counter() - start) / runs
+    body = text.encode('utf-8')
+
+    cache = MetricsCache()
+    cache.payload = (body, gzip.compress(body, compresslevel=6))
+    ready = threading.Event()
+    threading.Thread(target=lambda: asyncio.run(serve('127.0.0.1', args.port, cache, ready)), daemon=True).start()
+    ready.wait(5)
+
+    wall, latencies, size = asyncio.run(scrape_all(args.port, args.scrapers, args.requests, args.gzip))
+    latencies.sort()
+    total = len(latencies)
+    print(f"Exposition: {len(text.splitlines())} lines, {len(body)} bytes ({len(cache.payload[1])} gzip)")
+    print(f"  render (refresher)   {render_s * 1000:>9.2f} ms per collection")
+    print(f"{total} scrapes from {args.scrapers} scrapers, {size} byte bodies:")
+    print(f"  throughput           {total / wall:>9.0f} scrapes/s")
+    for pct in (50, 95, 99):
+        print(f"  p{pct:<19} {percentile(latencies, pct) * 1e6:>9.0f} us")
+
+
+if __name__ == '__main__':
+    main()
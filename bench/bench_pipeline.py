@@ -0,0 +1,186 @@
+"""Benchmark each stage of the collect -> parse -> summarise -> export pipeline.
+
+Synthetic info.txt fixtures from small to huge (5,000 services and 2,000
+programs) are written to a temporary directory, then every stage is timed
+(best of --repeat) and run once more under tracemalloc for its peak
+allocation. Results are JSON so runs can be compared between commits:
+
+    python bench/bench_pipeline.py --out before.json
+    python bench/bench_pipeline.py --out after.json --compare before.json
+    python bench/bench_pipeline.py --sizes small,huge --collect
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fixtures import SIZES, make_sections, format_info  # noqa: E402
+from exporters import EXPORTERS  # noqa: E402
+from records import parse_records, parser_for  # noqa: E402
+from report import iter_info, iter_sections, parse_info, summarize, SummaryBuilder  # noqa: E402
+
+
+def git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                             capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def measure(fn, repeat):
+    """Best wall time over `repeat` runs, then one traced run for peak allocation"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'seconds': round(best, 6), 'peak_alloc_bytes': peak}
+
+
+def stream_file(path):
+    """Single streaming pass over info.txt feeding the summary, as LPM does"""
+    builder = SummaryBuilder()
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        for sec, line in iter_info(f):
+            builder.feed(sec, line)
+    return builder.result()
+
+
+def export(exporter_cls, path, sections, summary):
+    exporter = exporter_cls(path)
+    for sec, line in iter_sections(sections):
+        if line is None:
+            exporter.begin_section(sec)
+        else:
+            exporter.write_line(line)
+    exporter.finish(summary)
+
+
+def bench_size(name, spec, tmp, repeat):
+    _, sections = make_sections(seed=1, **spec)
+    info_path = os.path.join(tmp, f"{name}.txt")
+    with open(info_path, 'w', encoding='utf-8') as f:
+        f.writelines(line + '\n' for line in format_info(sections))
+
+    def parse():
+        with open(info_path, 'r', encoding='utf-8', errors='ignore') as f:
+            return parse_info(f.read())
+
+    parsed = parse()
+    summary = summarize(parsed)
+    typed = [sec for sec in parsed if parser_for(sec) is not None]
+    stages = {
+        'parse': parse,
+        'records': lambda: [parse_records(sec, parsed[sec]) for sec in typed],
+        'summarise': lambda: summarize(parsed),
+        'stream': lambda: stream_file(info_path),
+    }
+    for fmt, cls in EXPORTERS.items():
+        out_path = os.path.join(tmp, f"{name}.{fmt}")
+        stages[f"export.{fmt}"] = lambda cls=cls, out_path=out_path: export(cls, out_path, parsed, summary)
+
+    result = {
+        'lines': sum(len(lines) for lines in parsed.values()),
+        'bytes': os.path.getsize(info_path),
+        'stages': {},
+    }
+    for stage, fn in stages.items():
+        result['stages'][stage] = measure(fn, repeat)
+    return result
+
+
+def bench_collect(repeat):
+    """Time the native collector on this machine (environment dependent)"""
+    from collector import run_collectors
+    return measure(lambda: run_collectors(), repeat)
+
+
+def compare(results, baseline, threshold):
+    """Print per-stage time changes against a baseline; return the regressions"""
+    regressions = []
+    print(f"\nCompared with {baseline['meta'].get('commit') or 'baseline'}:")
+    for size, current in results['sizes'].items():
+        before = baseline.get('sizes', {}).get(size)
+        if not before:
+            continue
+        for stage, r in current['stages'].items():
+            old = before['stages'].get(stage)
+            if not old or not old['seconds']:
+                continue
+            change = (r['seconds'] - old['seconds']) / old['seconds'] * 100
+            flag = ''
+            if change > threshold:
+                flag = '  REGRESSION'
+                regressions.append((size, stage, change))
+            print(f"  {size:<8}{stage:<18}{old['seconds'] * 1000:>10.2f} -> {r['seconds'] * 1000:>8.2f} ms  {change:+6.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the LPM report pipeline')
+    parser.add_argument('--sizes', default=','.join(SIZES), help=f"Comma-separated fixture sizes ({', '.join(SIZES)})")
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per stage; the best is kept')
+    parser.add_argument('--collect', action='store_true', help='Also time the native collector on this machine')
+    parser.add_argument('--out', help='Write results JSON to this path')
+    parser.add_argument('--compare', help='Baseline results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=20.0, help='Percent slowdown reported as a regression')
+    args = parser.parse_args()
+
+    sizes = [s.strip() for s in args.sizes.split(',') if s.strip()]
+    unknown = [s for s in sizes if s not in SIZES]
+    if unknown:
+        parser.error(f"unknown size(s): {', '.join(unknown)}")
+
+    results = {
+        'meta': {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'repeat': args.repeat,
+        },
+        'sizes': {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            results['sizes'][size] = bench_size(size, SIZES[size], tmp, args.repeat)
+    if args.collect:
+        results['collect'] = bench_collect(1)
+
+    for size, r in results['sizes'].items():
+        print(f"{size}: {r['lines']} lines, {r['bytes']} bytes")
+        for stage, s in r['stages'].items():
+            print(f"  {stage:<18}{s['seconds'] * 1000:>10.2f} ms{s['peak_alloc_bytes'] / 1024:>12.0f} KiB peak")
+    if 'collect' in results:
+        c = results['collect']
+        print(f"collect: {c['seconds'] * 1000:.0f} ms, {c['peak_alloc_bytes'] / 1024:.0f} KiB peak")
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
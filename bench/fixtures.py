@@ -0,0 +1,76 @@
+"""Synthetic LPM report data for benchmarks and load tests."""
+import random
+
+# info.txt rendering is shared with `python collector.py`; benchmarks use it from here
+from report import format_info  # noqa: F401
+
+SERVICE_STATES = ('Running', 'Stopped')
+START_MODES = ('Auto', 'Manual', 'Disabled')
+
+
+def make_sections(seed=0, services=200, programs=150, hotfixes=10, disks=2, adapters=3):
+    """Return a {section: [lines]} dict shaped like a real Windows report."""
+    rng = random.Random(seed)
+    host = f"HOST-{seed:05d}"
+    sections = {
+        'General': [
+            'Timestamp: 2026-01-01T00:00:00.0000000+00:00',
+            f"User: user{seed}",
+            'CurrentDirectory: C:\\LPM',
+        ],
+        'OS & System': [
+            'Caption: Microsoft Windows 11 Pro',
+            'Version: 10.0.26100',
+            'BuildNumber: 26100',
+            'OSArchitecture: 64-bit',
+            f"Manufacturer: Vendor {seed % 7}",
+            f"Model: Model {seed % 13}",
+            f"SerialNumber (BIOS): SN{seed:08d}",
+            'TotalPhysicalMemory: 15.82 GB',
+        ],
+        'CPU(s)': [
+            'Name: 13th Gen Intel(R) Core(TM) i5-13600KF',
+            'Manufacturer: GenuineIntel',
+            'Cores: 14, LogicalProcessors: 20',
+            'MaxClockSpeedMHz: 3500',
+        ],
+        'Disks (Logical)': [],
+        'Network Adapters': [],
+        'Processes': [f"ProcessCount: {rng.randint(150, 400)}"],
+        'Installed Hotfixes (recent)': [],
+        'Installed Programs': [],
+        'Services': [],
+        'Ping Test': [],
+        'End of Report': [],
+    }
+    for d in range(disks):
+        size = rng.uniform(200, 2000)
+        sections['Disks (Logical)'] += [
+            f"DeviceID: {chr(ord('C') + d)}:  FileSystem: NTFS",
+            f"Size: {size:,.2f} GB  Free: {size * rng.uniform(0.02, 0.6):,.2f} GB",
+        ]
+    for a in range(adapters):
+        sections['Network Adapters'].append(
+            f"Name: Ethernet {a}  Status: {'Up' if a == 0 else 'Disconnected'}  LinkSpeed: {rng.choice(('1 Gbps', '100 Mbps', '2.5 Gbps'))}")
+    for h in range(hotfixes):
+        if rng.random() < 0.9:
+            sections['Installed Hotfixes (recent)'].append(f"KB50{h:05d}  1/{h % 28 + 1}/2026 12:00:00 AM  Security Update")
+    for p in range(programs):
+        sections['Installed Programs'].append(f"Program {p} | {p % 10}.{p % 7}.{seed % 5} | Publisher {p % 40}")
+    sections['Installed Programs'].append(f"[Collected {programs} programs]")
+    for s in range(services):
+        sections['Services'].append(
+            f"svc{s:04d} | Service Number {s} | {rng.choice(SERVICE_STATES)} | {rng.choice(START_MODES)}")
+    times = [rng.randint(8, 40) for _ in range(4)]
+    sections['Ping Test'] = [f"Reply from 8.8.8.8: time={t}ms" for t in times]
+    sections['Ping Test'].append(f"Average: {sum(times) / len(times)}ms")
+    return host, sections
+
+
+# Fixture sizes for the pipeline benchmark, small to huge
+SIZES = {
+    'small': {'services': 50, 'programs': 30, 'hotfixes': 5},
+    'medium': {'services': 300, 'programs': 200, 'hotfixes': 30},
+    'large': {'services': 1500, 'programs': 800, 'hotfixes': 120},
+    'huge': {'services': 5000, 'programs': 2000, 'hotfixes': 400},
+}
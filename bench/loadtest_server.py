@@ -0,0 +1,130 @@
+"""Load test for the LPM fleet ingestion server (server.py).
+
+Fires synthetic {'sections', 'summary'} reports from many concurrent clients
+over keep-alive connections and reports throughput and latency percentiles.
+
+    python bench/loadtest_server.py                      # starts a temporary server
+    python bench/loadtest_server.py --url http://127.0.0.1:8765/report
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fixtures import make_sections  # noqa: E402
+from report import summarize  # noqa: E402
+
+
+def build_payloads(hosts, services, programs):
+    payloads = []
+    for i in range(hosts):
+        host, sections = make_sections(seed=i, services=services, programs=programs)
+        summary = summarize(sections)
+        rng = random.Random(i)
+        summary['mem_total_bytes'] = 16 * 1024**3
+        summary['mem_used_bytes'] = int(summary['mem_total_bytes'] * rng.uniform(0.2, 0.95))
+        summary['mem_available_bytes'] = summary['mem_total_bytes'] - summary['mem_used_bytes']
+        payloads.append((host, json.dumps({'sections': sections, 'summary': summary}).encode('utf-8')))
+    return payloads
+
+
+def start_local_server(db_path):
+    """Run server.serve() on a background event loop; returns the base URL."""
+    import socket
+    from server import FleetStore, serve
+
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    store = FleetStore(db_path)
+    ready = threading.Event()
+    threading.Thread(target=lambda: asyncio.run(serve('127.0.0.1', port, store, ready=ready)), daemon=True).start()
+    ready.wait(10)
+    return f"http://127.0.0.1:{port}"
+
+
+def client(url, payloads, count, latencies, errors):
+    parts = urllib.parse.urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+    path = parts.path or '/'
+    for n in range(count):
+        host, body = payloads[n % len(payloads)]
+        start = time.perf_counter()
+        try:
+            conn.request('POST', path, body=body, headers={'Content-Type': 'application/json', 'X-LPM-Host': host})
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status != 200:
+                errors.append(resp.status)
+                continue
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(str(e))
+            conn.close()
+            conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the LPM fleet server')
+    parser.add_argument('--url', help='Server base URL; omit to start a temporary local server')
+    parser.add_argument('--clients', type=int, default=32, help='Concurrent client connections')
+    parser.add_argument('--reports', type=int, default=5000, help='Total reports to send')
+    parser.add_argument('--hosts', type=int, default=500, help='Distinct synthetic hosts')
+    parser.add_argument('--services', type=int, default=200, help='Services per report')
+    parser.add_argument('--programs', type=int, default=150, help='Installed programs per report')
+    parser.add_argument('--json', dest='json_out', help='Write results as JSON to this path')
+    args = parser.parse_args()
+
+    tmpdir = None
+    url = args.url
+    if not url:
+        tmpdir = tempfile.mkdtemp(prefix='lpm-loadtest-')
+        url = start_local_server(os.path.join(tmpdir, 'fleet.db'))
+    report_url = url.rstrip('/') + '/report'
+
+    payloads = build_payloads(args.hosts, args.services, args.programs)
+    per_client, extra = divmod(args.reports, args.clients)
+    latencies, errors = [], []
+    threads = [threading.Thread(target=client, args=(report_url, payloads[i::args.clients] or payloads,
+                                                      per_client + (1 if i < extra else 0), latencies, errors))
+               for i in range(args.clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(p / 100.0 * len(latencies)))] * 1000 if latencies else None
+
+    results = {
+        'reports_ok': len(latencies),
+        'errors': len(errors),
+        'seconds': round(elapsed, 3),
+        'reports_per_minute': round(len(latencies) / elapsed * 60, 1) if elapsed else None,
+        'latency_ms': {'p50': pct(50), 'p95': pct(95), 'p99': pct(99)},
+        'payload_bytes_avg': sum(len(b) for _h, b in payloads) // len(payloads),
+        'clients': args.clients,
+    }
+    print(json.dumps(results, indent=2))
+    if args.json_out:
+        with open(args.json_out, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
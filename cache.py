@@ -0,0 +1,75 @@
+"""Small on-disk caches that let LPM skip slow work on repeat launches.
+
+Entries are JSON files in a per-user cache directory, written atomically.
+Anything that can only change across a reboot (CPU identification) is keyed
+by boot_id(); dependency checks are keyed by the Python interpreter.
+"""
+import json
+import os
+import sys
+import tempfile
+
+BOOT_ID_PATH = '/proc/sys/kernel/random/boot_id'
+
+
+def cache_dir():
+    """Per-user cache directory, honouring LPM_CACHE_DIR"""
+    override = os.environ.get('LPM_CACHE_DIR')
+    if override:
+        return override
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+        return os.path.join(base, 'LPM', 'cache')
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'lpm')
+
+
+def cache_path(name):
+    return os.path.join(cache_dir(), name)
+
+
+def load_json(name):
+    """Return a cached JSON value, or None if missing or unreadable"""
+    try:
+        with open(cache_path(name), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_json(name, value):
+    """Atomically write a JSON value to the cache; failures are ignored"""
+    directory = cache_dir()
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=name, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(value, f)
+        os.replace(tmp, cache_path(name))
+        return True
+    except (OSError, TypeError, ValueError):
+        return False
+
+
+def remove(name):
+    try:
+        os.remove(cache_path(name))
+    except OSError:
+        pass
+
+
+def boot_id():
+    """Identifier that changes on every reboot"""
+    try:
+        with open(BOOT_ID_PATH, 'r') as f:
+            return f.read().strip()
+    except OSError:
+        pass
+    # Elsewhere the boot time works; it can drift a second between calls, so round it
+    import psutil
+    return str(int(psutil.boot_time()) // 10)
+
+
+def interpreter_key():
+    """Identifies the running interpreter for caching dependency checks"""
+    return f"{sys.executable}|{sys.version}"
@@ -0,0 +1,787 @@
+"""Native in-process collector for LPM.
+
+Produces the same section dict that parse_info() builds from info.txt, using
+psutil/platform/cpuinfo directly instead of launching info.ps1. The few
+sections psutil cannot see (GPUs, physical disks, hotfixes) come from the same
+CIM classes info.ps1 reads, queried through one short PowerShell call each.
+"""
+import base64
+import os
+import shutil
+import subprocess
+import sys
+import platform
+import socket
+import time
+import getpass
+import datetime
+import queue
+import threading
+
+import psutil
+
+import cache
+
+# Values match the Win32_Service State / StartMode strings info.ps1 writes
+SERVICE_STATES = {
+    'running': 'Running',
+    'stopped': 'Stopped',
+    'paused': 'Paused',
+    'start_pending': 'Start Pending',
+    'stop_pending': 'Stop Pending',
+    'pause_pending': 'Pause Pending',
+    'continue_pending': 'Continue Pending',
+}
+SERVICE_START_MODES = {
+    'automatic': 'Auto',
+    'manual': 'Manual',
+    'disabled': 'Disabled',
+}
+
+UNINSTALL_KEYS = [
+    ('HKEY_LOCAL_MACHINE', r"Software\Microsoft\Windows\CurrentVersion\Uninstall"),
+    ('HKEY_LOCAL_MACHINE', r"Software\WOW6432Node\Microsoft\Windows\CurrentVersion\Uninstall"),
+    ('HKEY_CURRENT_USER', r"Software\Microsoft\Windows\CurrentVersion\Uninstall"),
+]
+PROGRAM_LIMIT = 200
+HOTFIX_LIMIT = 10
+
+# Registry keys whose shape changes when a hotfix is installed or a disk attached
+HOTFIX_PACKAGES_KEY = r"SOFTWARE\Microsoft\Windows\CurrentVersion\Component Based Servicing\Packages"
+DISK_ENUM_KEY = r"SYSTEM\CurrentControlSet\Services\disk\Enum"
+
+# Ping Test probes every target concurrently (see netprobe.py); targets are host:port.
+# Four probes per target, as info.ps1 sends, paced closely so a run stays short.
+PING_TARGETS = ('8.8.8.8:53', '1.1.1.1:53')
+PING_COUNT = 4
+PING_INTERVAL = 0.05
+PING_TIMEOUT = 2.0
+# The daemon's periodic single probe uses the first target
+PING_HOST = '8.8.8.8'
+PING_PORT = 53
+
+# Top Processes reads CPU times twice this far apart to measure rates. The
+# window is no longer than Ping Test's pacing, so while both run concurrently
+# it never lengthens a run.
+PROCESS_SAMPLE_SECONDS = (PING_COUNT - 1) * PING_INTERVAL
+TOP_PROCESSES = 10
+
+
+def ping_deadline(count=PING_COUNT):
+    """Seconds Ping Test can take: name lookup plus each target's probe budget
+    (see netprobe.worst_case_seconds), with a second to spare"""
+    return 2 * PING_TIMEOUT + (count + 1) * PING_INTERVAL + 1.0
+
+
+# Per-section deadlines (seconds) for run_collectors(); others use DEFAULT_TIMEOUT.
+# CIM sections start a PowerShell process, which can take seconds when cold.
+DEFAULT_TIMEOUT = 10.0
+CIM_TIMEOUT = 20.0
+DEFAULT_SECTION_TIMEOUTS = {
+    'GPU(s)': CIM_TIMEOUT,
+    'Physical Disks': CIM_TIMEOUT,
+    'Installed Hotfixes (recent)': CIM_TIMEOUT,
+    'Installed Programs': 20.0,
+    'Services': 20.0,
+    'Ping Test': ping_deadline(),
+}
+
+CPU_INFO_CACHE = 'cpuinfo.json'
+INVENTORY_CACHE = 'inventory.json'
+
+# Slow-changing sections reused from the inventory cache: section -> TTL in seconds.
+# Everything else (memory, disk free, processes, services, ping...) is collected every run.
+INVENTORY_TTLS = {
+    'OS & System': 24 * 3600.0,
+    'CPU(s)': 7 * 24 * 3600.0,
+    'GPU(s)': 24 * 3600.0,
+    'Physical Disks': 24 * 3600.0,
+    'Installed Hotfixes (recent)': 24 * 3600.0,
+    'Installed Programs': 24 * 3600.0,
+}
+
+_cpu_info_cache = None
+
+
+def format_size(num_bytes):
+    """Format a byte count the way Format-Size in info.ps1 does"""
+    num_bytes = num_bytes or 0
+    for unit, mul in (('TB', 1024**4), ('GB', 1024**3), ('MB', 1024**2), ('KB', 1024)):
+        if num_bytes >= mul:
+            return f"{num_bytes / mul:,.2f} {unit}"
+    return f"{num_bytes} B"
+
+
+def get_cpu_info():
+    """Return cpuinfo.get_cpu_info(), computed once per boot.
+
+    cpuinfo can take seconds (it may spawn subprocesses), so the result is kept
+    in memory for the process and on disk keyed by the boot ID.
+    """
+    global _cpu_info_cache
+    if _cpu_info_cache is not None:
+        return _cpu_info_cache
+    try:
+        boot = cache.boot_id()
+    except Exception:
+        boot = None
+    cached = cache.load_json(CPU_INFO_CACHE) if boot else None
+    if cached and cached.get('boot_id') == boot and cached.get('info'):
+        _cpu_info_cache = cached['info']
+        return _cpu_info_cache
+    try:
+        import cpuinfo
+        _cpu_info_cache = cpuinfo.get_cpu_info()
+    except Exception:
+        _cpu_info_cache = {}
+    if boot and _cpu_info_cache:
+        cache.save_json(CPU_INFO_CACHE, {'boot_id': boot, 'info': _cpu_info_cache})
+    return _cpu_info_cache
+
+
+def _clean(text):
+    """Strip non-printable characters, like the -replace in info.ps1"""
+    return ''.join(c for c in str(text or '') if ' ' <= c <= '~')
+
+
+def _read_registry(hive, path, name):
+    """Read a single registry value, or None when unavailable"""
+    if sys.platform != 'win32':
+        return None
+    try:
+        import winreg
+        with winreg.OpenKey(getattr(winreg, hive), path) as key:
+            return winreg.QueryValueEx(key, name)[0]
+    except OSError:
+        return None
+
+
+def _read_sysfs(name):
+    """Read a DMI attribute from /sys/class/dmi/id, or None when unavailable"""
+    try:
+        with open(os.path.join('/sys/class/dmi/id', name), 'r', encoding='utf-8', errors='ignore') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def _boot_datetime():
+    return datetime.datetime.fromtimestamp(psutil.boot_time())
+
+
+def collect_general():
+    return [
+        f"Timestamp: {datetime.datetime.now().astimezone().isoformat()}",
+        f"User: {getpass.getuser()}",
+        f"CurrentDirectory: {os.getcwd()}",
+    ]
+
+
+def collect_os():
+    caption = f"{platform.system()} {platform.release()}"
+    edition = getattr(platform, 'win32_edition', lambda: None)()
+    if edition:
+        caption = f"{caption} {edition}"
+    build = sys.getwindowsversion().build if sys.platform == 'win32' else 'N/A'
+
+    nt_key = r"SOFTWARE\Microsoft\Windows NT\CurrentVersion"
+    install_ts = _read_registry('HKEY_LOCAL_MACHINE', nt_key, 'InstallDate')
+    install_date = datetime.datetime.fromtimestamp(install_ts) if install_ts else 'N/A'
+
+    bios_key = r"HARDWARE\DESCRIPTION\System\BIOS"
+    manufacturer = _read_registry('HKEY_LOCAL_MACHINE', bios_key, 'SystemManufacturer') or _read_sysfs('sys_vendor')
+    model = _read_registry('HKEY_LOCAL_MACHINE', bios_key, 'SystemProductName') or _read_sysfs('product_name')
+    serial = _read_sysfs('product_serial')
+
+    return [
+        f"Caption: {caption}",
+        f"Version: {platform.version()}",
+        f"BuildNumber: {build}",
+        f"OSArchitecture: {platform.machine()}",
+        f"InstallDate: {install_date}",
+        f"LastBootUpTime: {_boot_datetime()}",
+        f"Manufacturer: {manufacturer or 'N/A'}",
+        f"Model: {model or 'N/A'}",
+        f"SerialNumber (BIOS): {serial or 'N/A'}",
+        f"TotalPhysicalMemory: {format_size(psutil.virtual_memory().total)}",
+    ]
+
+
+def collect_cpu():
+    cpu = get_cpu_info()
+    freq = psutil.cpu_freq()
+    max_mhz = int(freq.max or freq.current) if freq else 'N/A'
+
+    def cache_kb(value):
+        # py-cpuinfo reports bytes in recent releases and "256 KiB" strings in older ones
+        if isinstance(value, int):
+            return value // 1024
+        return value or 'N/A'
+
+    return [
+        f"Name: {cpu.get('brand_raw') or platform.processor() or 'Unknown'}",
+        f"Manufacturer: {cpu.get('vendor_id_raw', 'Unknown')}",
+        f"Cores: {psutil.cpu_count(logical=False)}, LogicalProcessors: {psutil.cpu_count(logical=True)}",
+        f"MaxClockSpeedMHz: {max_mhz}",
+        f"L2CacheSizeKB: {cache_kb(cpu.get('l2_cache_size'))}, L3CacheSizeKB: {cache_kb(cpu.get('l3_cache_size'))}",
+    ]
+
+
+def _cim_rows(script, fields, timeout=CIM_TIMEOUT):
+    """Run a PowerShell snippet that writes one tab-separated row per object.
+
+    Returns a list of `fields`-long lists of cleaned strings, or None when not
+    on Windows. Raises OSError (or TimeoutExpired) when PowerShell fails, so
+    the section reports the error instead of going missing.
+    """
+    if sys.platform != 'win32':
+        return None
+    exe = shutil.which('powershell') or shutil.which('pwsh')
+    if exe is None:
+        raise OSError('PowerShell not found')
+    script = '[Console]::OutputEncoding = [Text.Encoding]::UTF8\n' + script
+    encoded = base64.b64encode(script.encode('utf-16-le')).decode('ascii')
+    proc = subprocess.run([exe, '-NoProfile', '-NonInteractive', '-EncodedCommand', encoded],
+                          capture_output=True, timeout=timeout,
+                          creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0))
+    if proc.returncode != 0:
+        err = proc.stderr.decode('utf-8', errors='ignore').strip().splitlines()
+        raise OSError(err[-1] if err else f"PowerShell exited with {proc.returncode}")
+    rows = []
+    for line in proc.stdout.decode('utf-8', errors='ignore').splitlines():
+        if line.strip():
+            parts = line.split('\t')[:fields]
+            rows.append([_clean(p).strip() for p in parts] + [''] * (fields - len(parts)))
+    return rows
+
+
+def collect_gpus():
+    rows = _cim_rows('Get-CimInstance Win32_VideoController | ForEach-Object { '
+                     '"{0}`t{1}`t{2}" -f $_.Name, $_.AdapterRAM, $_.DriverVersion }', 3)
+    if rows is None:
+        return None
+    lines = []
+    for name, ram, driver in rows:
+        lines.append(f"Name: {name}")
+        if ram.isdigit() and int(ram):
+            lines.append(f"AdapterRAM: {format_size(int(ram))}")
+        lines.append(f"DriverVersion: {driver}")
+    return lines
+
+
+def collect_physical_disks():
+    rows = _cim_rows('Get-CimInstance -Namespace root\\Microsoft\\Windows\\Storage MSFT_PhysicalDisk '
+                     '-ErrorAction SilentlyContinue | ForEach-Object { '
+                     '"{0}`t{1}`t{2}" -f $_.FriendlyName, $_.Size, $_.MediaType }', 3)
+    # info.ps1 leaves the section out when there are no physical disks to list
+    if not rows:
+        return None
+    return [f"FriendlyName: {name}  Size: {format_size(int(size) if size.isdigit() else 0)}  MediaType: {media}"
+            for name, size, media in rows]
+
+
+def collect_hotfixes():
+    rows = _cim_rows(f'Get-HotFix -ErrorAction SilentlyContinue | Select-Object -First {HOTFIX_LIMIT} | '
+                     'ForEach-Object { "{0}`t{1}`t{2}" -f $_.HotFixID, $_.InstalledOn, $_.Description }', 3)
+    if not rows:
+        return None
+    return [f"{hotfix_id}  {installed_on}  {description}" for hotfix_id, installed_on, description in rows]
+
+
+def fixed_partitions():
+    """Return local fixed-disk partitions, matching Win32_LogicalDisk DriveType=3"""
+    parts = []
+    seen = set()
+    for part in psutil.disk_partitions(all=False):
+        if 'cdrom' in part.opts or not part.fstype or part.device in seen:
+            continue
+        seen.add(part.device)
+        parts.append(part)
+    return parts
+
+
+def collect_disks():
+    lines = []
+    for part in fixed_partitions():
+        try:
+            usage = psutil.disk_usage(part.mountpoint)
+        except OSError:
+            continue
+        device_id = part.device.rstrip('\\') if sys.platform == 'win32' else part.mountpoint
+        lines.append(f"DeviceID: {device_id}  FileSystem: {part.fstype}")
+        lines.append(f"Size: {format_size(usage.total)}  Free: {format_size(usage.free)}")
+    return lines
+
+
+def collect_network():
+    lines = []
+    for name, addrs in psutil.net_if_addrs().items():
+        ipv4 = [a.address for a in addrs if a.family == socket.AF_INET]
+        ipv6 = [a.address for a in addrs if a.family == socket.AF_INET6]
+        if not ipv4 and not ipv6:
+            continue
+        lines.append(f"Interface: {name}")
+        lines.extend(f"IPv4: {ip}" for ip in ipv4)
+        lines.extend(f"IPv6: {ip}" for ip in ipv6)
+    return lines
+
+
+def _format_link_speed(mbps):
+    if not mbps:
+        return '0 bps'
+    if mbps >= 1000:
+        return f"{mbps / 1000:g} Gbps"
+    return f"{mbps} Mbps"
+
+
+def collect_adapters():
+    stats = psutil.net_if_stats()
+    if not stats:
+        return None
+    return [
+        f"Name: {name}  Status: {'Up' if st.isup else 'Disconnected'}  LinkSpeed: {_format_link_speed(st.speed)}"
+        for name, st in stats.items()
+    ]
+
+
+def collect_uptime():
+    boot = _boot_datetime()
+    uptime = datetime.datetime.now() - boot
+    return [
+        f"LastBootUpTime: {boot}",
+        f"Uptime: {uptime}",
+    ]
+
+
+def collect_processes():
+    return [f"ProcessCount: {len(psutil.pids())}"]
+
+
+def format_process(entry):
+    """Format a processes.ProcessEntry as a Top Processes line"""
+    cpu = f"{entry.cpu_pct:.1f}%" if entry.cpu_pct is not None else '-'
+    rss = format_size(entry.rss_bytes) if entry.rss_bytes is not None else '-'
+    io = f"{format_size(entry.io_bps)}/s" if entry.io_bps is not None else '-'
+    handles = entry.handles if entry.handles is not None else '-'
+    return f"{_clean(entry.name)} | PID {entry.pid} | CPU {cpu} | RSS {rss} | IO {io} | Handles {handles}"
+
+
+def collect_top_processes(top=None):
+    from processes import ProcessTable
+    top = top or TOP_PROCESSES
+    table = ProcessTable()
+    start = time.monotonic()
+    table.refresh(detail=True)
+    # The first read already took part of the window
+    time.sleep(max(0.0, PROCESS_SAMPLE_SECONDS - (time.monotonic() - start)))
+    table.refresh(detail=True)
+    lines = [format_process(entry) for entry in table.leaderboard(top)]
+    lines.append(f"[Top {top} by CPU, memory, I/O and handles of {len(table)} processes]")
+    return lines
+
+
+def collect_battery():
+    batt = psutil.sensors_battery() if hasattr(psutil, 'sensors_battery') else None
+    if batt is None:
+        return None
+    status = 'Charging' if batt.power_plugged else 'Discharging'
+    return [f"Status: {status}  EstimatedChargeRemaining: {int(batt.percent)}"]
+
+
+def collect_programs():
+    if sys.platform != 'win32':
+        return None
+    return _iter_programs()
+
+
+def _iter_programs():
+    import winreg
+
+    seen = set()
+    for hive, path in UNINSTALL_KEYS:
+        try:
+            root = winreg.OpenKey(getattr(winreg, hive), path)
+        except OSError:
+            continue
+        with root:
+            index = 0
+            while len(seen) < PROGRAM_LIMIT:
+                try:
+                    sub = winreg.EnumKey(root, index)
+                except OSError:
+                    break
+                index += 1
+                try:
+                    with winreg.OpenKey(root, sub) as key:
+                        values = {}
+                        for field in ('DisplayName', 'DisplayVersion', 'Publisher'):
+                            try:
+                                values[field] = winreg.QueryValueEx(key, field)[0]
+                            except OSError:
+                                values[field] = ''
+                except OSError:
+                    continue
+                if not values['DisplayName']:
+                    continue
+                dedupe_key = f"{values['DisplayName']}|{values['Publisher']}"
+                if dedupe_key in seen:
+                    continue
+                seen.add(dedupe_key)
+                yield f"{_clean(values['DisplayName'])} | {_clean(values['DisplayVersion'])} | {_clean(values['Publisher'])}"
+    yield f"[Collected {len(seen)} programs]"
+
+
+def collect_services():
+    if not hasattr(psutil, 'win_service_iter'):
+        return None
+    rows = []
+    for svc in psutil.win_service_iter():
+        try:
+            state = SERVICE_STATES.get(svc.status(), svc.status())
+            start = SERVICE_START_MODES.get(svc.start_type(), svc.start_type())
+        except (psutil.Error, OSError):
+            continue
+        rows.append((svc.display_name(), f"{svc.name()} | {svc.display_name()} | {state} | {start}"))
+    rows.sort(key=lambda r: r[0].lower())
+    return [line for _display, line in rows]
+
+
+def tcp_rtt_ms(host, port, timeout):
+    """Time a TCP handshake to host:port; works without raw-socket privileges"""
+    start = time.perf_counter()
+    with socket.create_connection((host, port), timeout=timeout):
+        pass
+    return (time.perf_counter() - start) * 1000.0
+
+
+def _ms(value):
+    return f"{value:.3f}ms" if value is not None else '-'
+
+
+def format_ping_stats(stats):
+    """One "Target host:port | Sent N | ... | Jitter 0.512ms" line; "-" when unknown"""
+    return (f"Target {stats['target']} | Sent {stats['sent']} | Received {stats['received']} | "
+            f"Loss {stats['loss_pct']:.1f}% | Min {_ms(stats['min_ms'])} | Mean {_ms(stats['mean_ms'])} | "
+            f"Max {_ms(stats['max_ms'])} | p50 {_ms(stats['p50_ms'])} | p95 {_ms(stats['p95_ms'])} | "
+            f"p99 {_ms(stats['p99_ms'])} | Jitter {_ms(stats['jitter_ms'])}")
+
+
+def collect_ping(targets=None, count=None):
+    """Probe every target concurrently, streaming replies as they arrive.
+
+    The probes run on their own event loop thread and hand lines over a queue,
+    so replies already received survive a section timeout.
+    """
+    import netprobe
+    targets = list(targets or PING_TARGETS)
+    count = count or PING_COUNT
+    lines = queue.Queue()
+
+    def on_reply(result, rtt):
+        if rtt is None:
+            lines.put(f"Request to {result.target} timed out.")
+        else:
+            lines.put(f"Reply from {result.target}: time={rtt:.3f}ms")
+
+    def run():
+        try:
+            results = netprobe.run_probes(targets, count, PING_INTERVAL, PING_TIMEOUT, on_reply)
+        except Exception:
+            results = []
+        lines.put(results)
+
+    threading.Thread(target=run, name='lpm-ping-test', daemon=True).start()
+    while True:
+        item = lines.get()
+        if isinstance(item, str):
+            yield item
+            continue
+        break
+    times = []
+    for result in item:
+        if result.error:
+            yield f"Target {result.target}: {result.error}"
+        yield format_ping_stats(result.stats())
+        times.extend(result.replies)
+    if times:
+        yield f"Average: {sum(times) / len(times):.3f}ms"
+    else:
+        yield "Ping failed or blocked."
+
+
+# Ordered like the sections info.ps1 writes. A collector returns a list or an
+# iterator of lines; None means the section does not apply on this host and is
+# left out, as info.ps1 does. Iterators let the scheduler keep partial output.
+SECTION_COLLECTORS = [
+    ('General', collect_general),
+    ('OS & System', collect_os),
+    ('CPU(s)', collect_cpu),
+    ('GPU(s)', collect_gpus),
+    ('Disks (Logical)', collect_disks),
+    ('Physical Disks', collect_physical_disks),
+    ('Network', collect_network),
+    ('Network Adapters', collect_adapters),
+    ('System Uptime', collect_uptime),
+    ('Processes', collect_processes),
+    ('Top Processes', collect_top_processes),
+    ('Battery', collect_battery),
+    ('Installed Hotfixes (recent)', collect_hotfixes),
+    ('Installed Programs', collect_programs),
+    ('Services', collect_services),
+    ('Ping Test', collect_ping),
+]
+
+
+def _boot_signal():
+    return cache.boot_id()
+
+
+def _programs_signal():
+    """Subkey count and last-write time of each uninstall key; changes on (un)install"""
+    if sys.platform != 'win32':
+        return None
+    import winreg
+    parts = []
+    for hive, path in UNINSTALL_KEYS:
+        try:
+            with winreg.OpenKey(getattr(winreg, hive), path) as key:
+                subkeys, _values, modified = winreg.QueryInfoKey(key)
+                parts.append(f"{subkeys}:{modified}")
+        except OSError:
+            parts.append('-')
+    return '|'.join(parts)
+
+
+def _hotfix_signal():
+    """Package count and last-write time of the servicing store; changes when an update installs"""
+    if sys.platform != 'win32':
+        return None
+    import winreg
+    with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, HOTFIX_PACKAGES_KEY) as key:
+        subkeys, _values, modified = winreg.QueryInfoKey(key)
+    return f"{subkeys}:{modified}"
+
+
+def _disks_signal():
+    """Instance IDs of the attached disks, as enumerated by the disk driver"""
+    count = _read_registry('HKEY_LOCAL_MACHINE', DISK_ENUM_KEY, 'Count')
+    if count is None:
+        return None
+    return '|'.join(str(_read_registry('HKEY_LOCAL_MACHINE', DISK_ENUM_KEY, str(n))) for n in range(count))
+
+
+# Cheap invalidation signals: a cached section is dropped as soon as its signal changes
+INVENTORY_SIGNALS = {
+    'OS & System': _boot_signal,
+    'CPU(s)': _boot_signal,
+    'GPU(s)': _boot_signal,
+    'Physical Disks': _disks_signal,
+    'Installed Hotfixes (recent)': _hotfix_signal,
+    'Installed Programs': _programs_signal,
+}
+
+
+class InventoryCache:
+    """Lines of slow-changing sections kept on disk between runs.
+
+    A section is reused while it is younger than its TTL and its invalidation
+    signal (boot ID, uninstall-key counts...) still matches the value recorded
+    with it. Signals are evaluated at most once per run.
+    """
+
+    def __init__(self, name=INVENTORY_CACHE, ttls=None, signals=None, refresh=False):
+        self.name = name
+        self.ttls = INVENTORY_TTLS if ttls is None else ttls
+        self.signals = INVENTORY_SIGNALS if signals is None else signals
+        self._signal_values = {}
+        # refresh=True ignores what is on disk but still stores this run's sections
+        data = None if refresh else cache.load_json(name)
+        self.entries = data.get('sections', {}) if isinstance(data, dict) else {}
+        self.dirty = False
+
+    def signal(self, section):
+        """Current signal value for a section, or None if it cannot be cached"""
+        if section not in self._signal_values:
+            func = self.signals.get(section)
+            try:
+                value = func() if func else ''
+            except Exception:
+                value = None
+            self._signal_values[section] = value
+        return self._signal_values[section]
+
+    def lookup(self, section, now=None):
+        """Return cached lines for a section, or None when missing or stale"""
+        ttl = self.ttls.get(section)
+        entry = self.entries.get(section)
+        if ttl is None or not entry:
+            return None
+        now = time.time() if now is None else now
+        age = now - entry.get('stored_at', 0)
+        if age < 0 or age > ttl:
+            return None
+        signal = self.signal(section)
+        if signal is None or entry.get('signal') != signal:
+            return None
+        return list(entry.get('lines', []))
+
+    def store(self, section, lines, now=None):
+        if section not in self.ttls:
+            return
+        signal = self.signal(section)
+        if signal is None:
+            return
+        self.entries[section] = {
+            'lines': list(lines),
+            'stored_at': time.time() if now is None else now,
+            'signal': signal,
+        }
+        self.dirty = True
+
+    def save(self):
+        if self.dirty:
+            cache.save_json(self.name, {'version': 1, 'sections': self.entries})
+            self.dirty = False
+
+
+def run_collectors(collectors=None, timeouts=None, max_workers=None, inventory=None):
+    """Run section collectors concurrently, each against its own deadline.
+
+    Returns (sections, status). status maps each section to a dict with
+    'status' ('ok', 'cached', 'error', 'skipped' or 'timed_out') and 'elapsed'
+    seconds. A timed-out section keeps whatever lines it produced before its
+    deadline. Workers are daemon threads, so a hung source never blocks
+    process exit. With an InventoryCache, fresh cached sections are reused
+    instead of collected, and newly collected ones are stored back.
+    """
+    collectors = list(collectors or SECTION_COLLECTORS)
+    timeouts = dict(DEFAULT_SECTION_TIMEOUTS, **(timeouts or {}))
+
+    jobs = queue.Queue()
+    state = {}
+    cond = threading.Condition()
+    for name, func in collectors:
+        cached = inventory.lookup(name) if inventory is not None else None
+        if cached is not None:
+            state[name] = {'lines': cached, 'status': 'cached', 'started': None, 'elapsed': 0.0}
+            continue
+        state[name] = {'lines': [], 'status': 'pending', 'started': None, 'elapsed': 0.0}
+        jobs.put((name, func))
+    max_workers = max_workers or jobs.qsize()
+
+    def worker():
+        while True:
+            try:
+                name, func = jobs.get_nowait()
+            except queue.Empty:
+                return
+            entry = state[name]
+            # Keep our own reference: a timeout swaps entry['lines'] for a snapshot
+            lines = entry['lines']
+            with cond:
+                entry['status'] = 'running'
+                entry['started'] = time.monotonic()
+            try:
+                out = func()
+                if out is None:
+                    result = 'skipped'
+                else:
+                    for line in out:
+                        lines.append(line)
+                    result = 'ok'
+            except Exception as e:
+                lines.append(f"({name} not available: {e})")
+                result = 'error'
+            with cond:
+                # A section that already hit its deadline stays timed_out
+                if entry['status'] == 'running':
+                    entry['status'] = result
+                    entry['elapsed'] = time.monotonic() - entry['started']
+                cond.notify_all()
+
+    def start_worker():
+        threading.Thread(target=worker, name='lpm-collector', daemon=True).start()
+
+    for _ in range(min(max_workers, jobs.qsize())):
+        start_worker()
+
+    with cond:
+        while True:
+            now = time.monotonic()
+            waiting = False
+            next_deadline = None
+            for name, entry in state.items():
+                if entry['status'] == 'pending':
+                    waiting = True
+                elif entry['status'] == 'running':
+                    deadline = entry['started'] + timeouts.get(name, DEFAULT_TIMEOUT)
+                    if now >= deadline:
+                        entry['status'] = 'timed_out'
+                        entry['elapsed'] = now - entry['started']
+                        entry['lines'] = list(entry['lines']) + [f"[timed out after {entry['elapsed']:.1f}s]"]
+                        # The stuck thread keeps its slot; replace it so queued sections still run
+                        if not jobs.empty():
+                            start_worker()
+                    else:
+                        waiting = True
+                        next_deadline = deadline if next_deadline is None else min(next_deadline, deadline)
+            if not waiting:
+                break
+            cond.wait(timeout=(next_deadline - now) if next_deadline is not None else None)
+
+    sections = {}
+    status = {}
+    for name, _func in collectors:
+        entry = state[name]
+        status[name] = {'status': entry['status'], 'elapsed': entry['elapsed']}
+        if entry['status'] != 'skipped':
+            sections[name] = list(entry['lines'])
+        if inventory is not None and entry['status'] == 'ok':
+            inventory.store(name, sections[name])
+    if inventory is not None:
+        inventory.save()
+    sections['End of Report'] = []
+    return sections, status
+
+
+def collect_sections(timeouts=None, inventory=None):
+    """Collect all sections in-process, returning {section: [lines]} like parse_info()"""
+    sections, _status = run_collectors(timeouts=timeouts, inventory=inventory)
+    return sections
+
+
+def collect_memory():
+    """Exact byte counts for the Memory section of `python collector.py` output"""
+    vm = psutil.virtual_memory()
+    return [f"TotalBytes: {vm.total}", f"AvailableBytes: {vm.available}"]
+
+
+def main(argv=None):
+    """Print this host's report as info.txt text on stdout.
+
+    This is what `LPM.py fleet` runs on each host. A Memory section is added so
+    the summary reflects the remote host's memory rather than the caller's.
+    """
+    import argparse
+    from report import END_OF_REPORT, MEMORY_SECTION, format_info, should_include_section
+    parser = argparse.ArgumentParser(description='Print an LPM report in info.txt format')
+    parser.add_argument('--sections', help='Comma-separated sections to collect (default: all)')
+    parser.add_argument('--no-inventory-cache', action='store_true', help='Recollect slow-changing sections')
+    args = parser.parse_args(argv)
+
+    wanted = [s.strip() for s in args.sections.split(',')] if args.sections else None
+    collectors = [(name, func) for name, func in SECTION_COLLECTORS if should_include_section(name, wanted)]
+    inventory = None if args.no_inventory_cache else InventoryCache()
+    sections, _status = run_collectors(collectors, inventory=inventory)
+    del sections[END_OF_REPORT]
+    sections[MEMORY_SECTION] = collect_memory()
+    sections[END_OF_REPORT] = []
+    out = sys.stdout
+    for line in format_info(sections):
+        out.write(line + '\n')
+    out.flush()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,249 @@
+"""Live terminal dashboard for LPM --live.
+
+The screen is a grid of fixed-position cells. Each frame lays out every cell,
+and Screen.flush() compares the frame with the previous one and writes only
+the cells whose text or style changed, in a single write, with a cursor move
+before each. Labels and headers are therefore drawn once, and a steady
+system costs a few dozen bytes per frame. Metrics come from monitor.Sampler.
+The process table is refreshed on its own, slower schedule because it costs
+far more than a metrics sample.
+"""
+import shutil
+import socket
+import sys
+import time
+
+from collector import format_process, format_size
+
+CSI = '\033['
+DEFAULT_INTERVAL = 1.0
+# Seconds between process table refreshes; reading every process is the
+# dashboard's most expensive step
+PROCESS_INTERVAL = 5.0
+CORE_CELL_WIDTH = 26
+BAR_WIDTH = 20
+
+
+def enable_ansi():
+    """Turn on escape sequence handling in the Windows console; True if usable"""
+    if sys.platform != 'win32':
+        return True
+    try:
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.GetStdHandle(-11)
+        mode = ctypes.c_uint32()
+        if not kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+            return False
+        # ENABLE_VIRTUAL_TERMINAL_PROCESSING
+        return bool(kernel32.SetConsoleMode(handle, mode.value | 0x0004))
+    except Exception:
+        return False
+
+
+class Screen:
+    """Cell-diffing renderer: only cells that changed since the last flush are written"""
+
+    def __init__(self, out=None):
+        self.out = out or sys.stdout
+        self.frame = {}
+        self.previous = {}
+        self.bytes_written = 0
+        self.cells_written = 0
+
+    def start(self):
+        # Alternate screen, hidden cursor, cleared
+        self._write(f"{CSI}?1049h{CSI}?25l{CSI}2J")
+
+    def stop(self):
+        self._write(f"{CSI}0m{CSI}?25h{CSI}?1049l")
+
+    def invalidate(self):
+        """Forget what is on screen (after a resize) so the next flush redraws everything"""
+        self.previous = {}
+        self._write(f"{CSI}2J")
+
+    def put(self, row, col, text, width, style=''):
+        """Place text at 1-based (row, col), padded or cut to width"""
+        if len(text) > width:
+            text = text[:width]
+        self.frame[(row, col)] = (text.ljust(width), style)
+
+    def flush(self):
+        parts = []
+        frame, previous = self.frame, self.previous
+        for pos, cell in frame.items():
+            if previous.get(pos) != cell:
+                text, style = cell
+                parts.append(f"{CSI}{pos[0]};{pos[1]}H{style}{text}{CSI}0m" if style else f"{CSI}{pos[0]};{pos[1]}H{text}")
+                self.cells_written += 1
+        for pos, (text, _style) in previous.items():
+            if pos not in frame:
+                parts.append(f"{CSI}{pos[0]};{pos[1]}H{' ' * len(text)}")
+        self.previous, self.frame = frame, {}
+        if parts:
+            self._write(''.join(parts))
+
+    def _write(self, data):
+        self.out.write(data)
+        self.out.flush()
+        self.bytes_written += len(data)
+
+
+def _rate(value):
+    return f"{format_size(value)}/s" if value is not None and value == value else '-'
+
+
+class Dashboard:
+    """Lays out host metrics, per-core CPU, disk and NIC throughput and top processes.
+
+    `styles` is a class with the Colors attributes LPM uses (BOLD, OKGREEN,
+    WARNING, FAIL, OKCYAN, ENDC).
+    """
+
+    def __init__(self, styles, interval=DEFAULT_INTERVAL, top=10, process_interval=PROCESS_INTERVAL,
+                 out=None, size=None):
+        from monitor import Sampler
+        self.styles = styles
+        self.interval = interval
+        self.top = top
+        self.process_interval = max(process_interval, interval)
+        self.screen = Screen(out)
+        self.size = size
+        self.sampler = Sampler()
+        self.columns = self.sampler.columns
+        self.index = {name: i for i, name in enumerate(self.columns)}
+        self.host = socket.gethostname()
+        self.ping_ms = None
+        self.process_table = None
+        self.next_processes = 0.0
+        self.frames = 0
+        self._last_size = None
+        # Devices are listed once they have shown any traffic, and then stay put
+        self.active = set()
+        if top > 0:
+            from processes import ProcessTable
+            self.process_table = ProcessTable(detail_interval=self.process_interval)
+
+    def _level(self, pct):
+        if pct is None:
+            return ''
+        if pct >= 90:
+            return self.styles.FAIL
+        if pct >= 70:
+            return self.styles.WARNING
+        return self.styles.OKGREEN
+
+    def _bar(self, row, col, pct):
+        filled = 0 if pct is None else int(round(min(100.0, max(0.0, pct)) / 100 * BAR_WIDTH))
+        self.screen.put(row, col, '█' * filled + '·' * (BAR_WIDTH - filled), BAR_WIDTH, self._level(pct))
+
+    def render(self, values, now):
+        """Lay out one frame from a Sampler row"""
+        put = self.screen.put
+        bold = self.styles.BOLD
+        width, height = self.size or shutil.get_terminal_size((100, 40))
+        get = lambda name: values[self.index[name]]
+
+        put(1, 1, f"═══ LPM Live: {self.host} ═══", width - 22, bold)
+        put(1, width - 20, time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(now)), 20)
+        put(2, 1, f"Refresh {self.interval:g}s, processes every {self.process_interval:g}s  (Ctrl+C to quit)", width)
+
+        cpu = get('cpu_pct')
+        mem_total, mem_used = get('mem_total_bytes'), get('mem_used_bytes')
+        disk_total, disk_used = get('disk_total_bytes'), get('disk_used_bytes')
+        mem_pct = mem_used / mem_total * 100 if mem_total else None
+        disk_pct = disk_used / disk_total * 100 if disk_total else None
+        ping = get('ping_avg_ms')
+        if ping is not None and ping == ping:
+            self.ping_ms = ping
+        rows = [
+            ('CPU', cpu, f"{cpu:5.1f}%" if cpu is not None else '-'),
+            ('Memory', mem_pct, f"{mem_pct:5.1f}%  {format_size(mem_used)} of {format_size(mem_total)}" if mem_pct is not None else '-'),
+            ('Disk', disk_pct, f"{disk_pct:5.1f}%  {format_size(disk_used)} of {format_size(disk_total)}" if disk_pct is not None else '-'),
+        ]
+        row = 4
+        put(row - 1, 1, 'Summary', 20, bold)
+        for label, pct, text in rows:
+            put(row, 3, label, 8)
+            self._bar(row, 12, pct)
+            put(row, 34, text, max(1, width - 34))
+            row += 1
+        put(row, 3, 'Ping', 8)
+        put(row, 12, f"{self.ping_ms:.1f} ms" if self.ping_ms is not None else 'waiting...', 20)
+        row += 2
+
+        put(row, 1, 'Per-core CPU', 20, bold)
+        row += 1
+        per_row = max(1, (width - 2) // CORE_CELL_WIDTH)
+        for i in range(self.sampler.cpus):
+            pct = get(f"cpu{i}_pct")
+            r, c = row + i // per_row, 3 + (i % per_row) * CORE_CELL_WIDTH
+            put(r, c, f"cpu{i}", 6)
+            filled = 0 if pct is None else int(round(min(100.0, pct) / 100 * 10))
+            put(r, c + 6, '█' * filled + '·' * (10 - filled), 10, self._level(pct))
+            put(r, c + 17, f"{pct:5.1f}%" if pct is not None else '    -', 7)
+        row += (self.sampler.cpus + per_row - 1) // per_row + 1
+
+        for title, prefix, names, fields in (('Disk I/O', 'disk', self.sampler.disks, ('read', 'write')),
+                                             ('Network', 'net', self.sampler.nics, ('sent', 'recv'))):
+            put(row, 1, title, 20, bold)
+            put(row, 24, fields[0].capitalize(), 16, bold)
+            put(row, 42, fields[1].capitalize(), 16, bold)
+            row += 1
+            for name in names:
+                first, second = get(f"{prefix}.{name}.{fields[0]}_bps"), get(f"{prefix}.{name}.{fields[1]}_bps")
+                key = f"{prefix}.{name}"
+                if key not in self.active:
+                    if not (first or second):
+                        continue
+                    self.active.add(key)
+                if row >= height - 2:
+                    break
+                put(row, 3, name, 20)
+                put(row, 24, _rate(first), 16)
+                put(row, 42, _rate(second), 16)
+                row += 1
+            row += 1
+
+        if self.process_table is not None and row < height - 1:
+            put(row, 1, f"Top processes ({len(self.process_table)} running)", 40, bold)
+            row += 1
+            for entry in self.process_table.leaderboard(self.top):
+                if row >= height:
+                    break
+                put(row, 3, format_process(entry), max(1, width - 3))
+                row += 1
+
+    def step(self):
+        """Sample, refresh slow sources when due, and draw one frame"""
+        now, values = self.sampler.sample()
+        if self.process_table is not None and time.monotonic() >= self.next_processes:
+            self.process_table.refresh()
+            self.next_processes = time.monotonic() + self.process_interval
+        if self.size is None:
+            size = shutil.get_terminal_size((100, 40))
+            if self.frames and size != self._last_size:
+                self.screen.invalidate()
+            self._last_size = size
+        self.render(values, now)
+        self.screen.flush()
+        self.frames += 1
+
+    def run(self):
+        """Redraw every interval until Ctrl+C"""
+        self.screen.start()
+        next_tick = time.monotonic()
+        try:
+            while True:
+                self.step()
+                next_tick += self.interval
+                now = time.monotonic()
+                if next_tick < now:
+                    next_tick = now + self.interval
+                time.sleep(next_tick - now)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.sampler.stop()
+            self.screen.stop()
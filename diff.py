@@ -0,0 +1,331 @@
+"""Compare LPM reports: what was added, removed or changed between snapshots.
+
+Sections with typed records are matched by key: a service by name, a program
+by name|publisher, a hotfix by ID, a disk by DeviceID and an adapter by name.
+Lines are counted into hashed multisets, so identical lines cancel out before
+anything is parsed, and the remaining records are matched through dicts: a
+diff is linear in the size of the two reports, and a changed field is reported
+as a change of that one record rather than a removed line and an added one.
+Sections without records are compared as multisets of lines. Sections that
+change on every run (timestamps, uptime, process and ping figures) are skipped
+unless asked for.
+
+    python LPM.py diff before.json after.json
+    python LPM.py diff baseline.json reports/          # one baseline vs many
+
+The library API is diff_reports() / diff_files() for two reports and
+diff_against() for a baseline against many, reusing one ReportIndex.
+"""
+import argparse
+import json
+import os
+import sys
+from collections import Counter
+
+from records import (Adapter, Disk, Hotfix, Program, Service, AdapterParser, HotfixParser, ProgramParser,
+                     ServiceParser, parse_records, parser_for)
+from report import should_include_section
+
+# Record type -> function returning its match key
+RECORD_KEYS = {
+    Service: lambda r: r.name,
+    Program: lambda r: f"{r.name}|{r.publisher}",
+    Hotfix: lambda r: r.hotfix_id,
+    Disk: lambda r: r.device_id,
+    Adapter: lambda r: r.name,
+}
+# Sections that differ on every run; left out unless include_volatile is set
+VOLATILE_SECTIONS = ('General', 'System Uptime', 'Processes', 'Top Processes', 'Ping Test', 'Memory',
+                     'Battery', 'End of Report')
+REPORT_EXTENSIONS = ('.json', '.ndjson', '.msgpack', '.txt')
+# Parsers that turn each line into one record on its own (a disk spans two lines)
+ONE_LINE_PARSERS = (ServiceParser, ProgramParser, HotfixParser, AdapterParser)
+_UNSET = object()
+
+
+def load_report(path):
+    """Load an exported report (JSON, NDJSON, MessagePack or info.txt) as a sections dict"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.msgpack':
+        from exporters import read_msgpack
+        return read_msgpack(path)[0]
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        if ext == '.txt':
+            from report import parse_info
+            return parse_info(f.read())
+        if ext == '.ndjson':
+            sections = {}
+            for line in f:
+                if line.strip():
+                    obj = json.loads(line)
+                    if 'section' in obj:
+                        sections.setdefault(obj['section'], []).append(obj['entry'])
+            return sections
+        doc = json.load(f)
+    if not isinstance(doc, dict) or not isinstance(doc.get('sections'), dict):
+        raise ValueError(f"{path}: no 'sections' object (columnar exports are not supported)")
+    return doc['sections']
+
+
+def _keyed(section, lines):
+    """key -> record for a section's lines; {} for a keyed section with no
+    records (or no section), None when its records have no key"""
+    records = parse_records(section, lines) if section is not None else []
+    key_of = RECORD_KEYS.get(type(records[0])) if records else None
+    if key_of is None:
+        return {} if not records and (section is None or parser_for(section) is not None) else None
+    keyed = {}
+    seen = Counter()
+    for record in records:
+        key = key_of(record)
+        # Repeated keys (the same program installed twice) are matched in order
+        seen[key] += 1
+        keyed[key if seen[key] == 1 else f"{key} #{seen[key]}"] = record
+    return keyed
+
+
+class SectionIndex:
+    """One section's lines, with its records keyed for matching on first use.
+
+    Most sections are identical between two reports and are settled by
+    comparing their line lists, so records are only parsed for sections that
+    differ, and only once for a baseline compared with many reports.
+    """
+
+    __slots__ = ('section', 'lines', '_records', '_counts')
+
+    def __init__(self, section, lines):
+        self.section = section
+        self.lines = lines
+        self._records = _UNSET
+        self._counts = None
+
+    @property
+    def records(self):
+        """key -> record for keyed sections (empty when there are none), else None"""
+        if self._records is _UNSET:
+            self._records = _keyed(self.section, self.lines)
+        return self._records
+
+    @property
+    def counts(self):
+        """Multiset of the section's lines"""
+        if self._counts is None:
+            self._counts = Counter(self.lines)
+        return self._counts
+
+
+class ReportIndex:
+    """A report's sections indexed once, for comparing against any number of others.
+
+    `only` is a list of section filters matched like LPM's --sections
+    (case-insensitive substrings).
+    """
+
+    def __init__(self, sections, only=None, include_volatile=False):
+        self.index = {}
+        for section, lines in sections.items():
+            if not should_include_section(section, only):
+                continue
+            if not include_volatile and section in VOLATILE_SECTIONS:
+                continue
+            self.index[section] = SectionIndex(section, list(lines or []))
+
+
+def _match(old, new):
+    added = [dict(key=key, **r.as_dict()) for key, r in new.items() if key not in old]
+    removed = [dict(key=key, **r.as_dict()) for key, r in old.items() if key not in new]
+    changed = []
+    for key, r in new.items():
+        before = old.get(key)
+        if before is not None and before != r:
+            changes = {name: [getattr(before, name), getattr(r, name)] for name in r.__slots__
+                       if getattr(before, name) != getattr(r, name)}
+            changed.append({'key': key, 'changes': changes})
+    return added, removed, changed
+
+
+def _diff_section(section, a, b):
+    if a.lines == b.lines:
+        return None
+    old = new = None
+    if isinstance(parser_for(section), ONE_LINE_PARSERS):
+        # A line present on both sides is the same record on both sides, so
+        # only the lines that differ need parsing and matching
+        old = _keyed(section, list((a.counts - b.counts).elements()))
+        new = _keyed(section, list((b.counts - a.counts).elements()))
+    if old is None or new is None:
+        old, new = a.records, b.records
+    if old is not None and new is not None:
+        added, removed, changed = _match(old, new)
+    else:
+        added = list((b.counts - a.counts).elements())
+        removed = list((a.counts - b.counts).elements())
+        changed = []
+    if not (added or removed or changed):
+        return None
+    return {'added': added, 'removed': removed, 'changed': changed}
+
+
+def diff_indexes(a, b):
+    """Diff two ReportIndex objects; returns {section: {'added', 'removed', 'changed'}} for sections that differ"""
+    result = {}
+    empty = SectionIndex(None, [])
+    for section in list(a.index) + [s for s in b.index if s not in a.index]:
+        entry = _diff_section(section, a.index.get(section, empty), b.index.get(section, empty))
+        if entry is not None:
+            result[section] = entry
+    return result
+
+
+def diff_reports(a, b, only=None, include_volatile=False):
+    """Diff two sections dicts (or ReportIndex objects) from report A to report B"""
+    if not isinstance(a, ReportIndex):
+        a = ReportIndex(a, only, include_volatile)
+    if not isinstance(b, ReportIndex):
+        b = ReportIndex(b, only, include_volatile)
+    return diff_indexes(a, b)
+
+
+def diff_files(path_a, path_b, only=None, include_volatile=False):
+    """Diff two report files (see load_report for the formats)"""
+    return diff_reports(load_report(path_a), load_report(path_b), only, include_volatile)
+
+
+def report_paths(path):
+    """Report files in a directory, sorted; a file path is returned as is"""
+    if not os.path.isdir(path):
+        return [path]
+    return sorted(os.path.join(path, name) for name in os.listdir(path)
+                  if os.path.splitext(name)[1].lower() in REPORT_EXTENSIONS)
+
+
+def diff_against(baseline, paths, only=None, include_volatile=False):
+    """Yield (path, diff, error) for each report compared with one baseline.
+
+    `baseline` is a path or sections dict; it is parsed and indexed once.
+    """
+    if not isinstance(baseline, dict):
+        baseline = load_report(baseline)
+    base = ReportIndex(baseline, only, include_volatile)
+    for path in paths:
+        try:
+            other = ReportIndex(load_report(path), only, include_volatile)
+        except (OSError, ValueError) as e:
+            yield path, None, str(e)
+            continue
+        yield path, diff_indexes(base, other), None
+
+
+def count_changes(diff):
+    """(added, removed, changed) totals over all sections of a diff"""
+    totals = [0, 0, 0]
+    for entry in diff.values():
+        totals[0] += len(entry['added'])
+        totals[1] += len(entry['removed'])
+        totals[2] += len(entry['changed'])
+    return tuple(totals)
+
+
+def _describe(item):
+    if isinstance(item, str):
+        return item
+    key = item['key']
+    # Fields already spelled out in the key are not repeated
+    parts = set(key.split('|'))
+    rest = [f"{name}={value}" for name, value in item.items()
+            if name != 'key' and value not in (None, '') and str(value) not in parts]
+    return f"{key} ({', '.join(rest)})" if rest else key
+
+
+def format_diff(diff):
+    """Console lines for a diff: + added, - removed, ~ changed"""
+    lines = []
+    for section, entry in diff.items():
+        added, removed, changed = len(entry['added']), len(entry['removed']), len(entry['changed'])
+        lines.append(f"=== {section} === (+{added} -{removed} ~{changed})")
+        lines.extend(f"  + {_describe(item)}" for item in entry['added'])
+        lines.extend(f"  - {_describe(item)}" for item in entry['removed'])
+        for item in entry['changed']:
+            fields = ', '.join(f"{name}: {old} -> {new}" for name, (old, new) in item['changes'].items())
+            lines.append(f"  ~ {item['key']}: {fields}")
+    return lines
+
+
+def _change_keys(diff):
+    """Hashable (section, kind, item) tuples, for counting how many reports share a change"""
+    for section, entry in diff.items():
+        for kind in ('added', 'removed'):
+            for item in entry[kind]:
+                yield section, kind, item if isinstance(item, str) else item['key']
+        for item in entry['changed']:
+            yield section, 'changed', f"{item['key']} ({', '.join(item['changes'])})"
+
+
+def main(argv=None):
+    """Entry point for `LPM.py diff`; exit code 0 when identical, 1 on differences, 2 on errors"""
+    parser = argparse.ArgumentParser(prog='LPM.py diff', description='Compare LPM reports')
+    parser.add_argument('a', help='Report A (the baseline)')
+    parser.add_argument('b', help='Report B, or a directory of reports to compare with A one by one')
+    parser.add_argument('--sections', help='Comma-separated sections to compare, matched like LPM --sections (default: all but volatile ones)')
+    parser.add_argument('--all', dest='include_volatile', action='store_true',
+                        help='Also compare sections that change every run (General, uptime, processes, ping...)')
+    parser.add_argument('--json', action='store_true', help='Print the structured diff as JSON')
+    parser.add_argument('--brief', action='store_true', help='With a directory, print only per-report totals')
+    parser.add_argument('--top', type=int, default=20, help='With a directory, most common changes to list (default: 20)')
+    args = parser.parse_args(argv)
+    only = [s.strip() for s in args.sections.split(',')] if args.sections else None
+
+    if not os.path.isdir(args.b):
+        try:
+            diff = diff_files(args.a, args.b, only, args.include_volatile)
+        except (OSError, ValueError) as e:
+            print(f"diff: {e}", file=sys.stderr)
+            return 2
+        if args.json:
+            print(json.dumps({'a': args.a, 'b': args.b, 'sections': diff}, ensure_ascii=False, indent=2, default=str))
+        else:
+            for line in format_diff(diff) or ['No differences.']:
+                print(line)
+        return 1 if diff else 0
+
+    paths = [p for p in report_paths(args.b) if os.path.abspath(p) != os.path.abspath(args.a)]
+    if not paths:
+        print(f"diff: no reports in {args.b}", file=sys.stderr)
+        return 2
+    try:
+        results = diff_against(args.a, paths, only, args.include_volatile)
+        common = Counter()
+        differing = failed = 0
+        for path, diff, error in results:
+            if error:
+                failed += 1
+                if args.json:
+                    print(json.dumps({'a': args.a, 'b': path, 'error': error}, ensure_ascii=False))
+                else:
+                    print(f"ERROR {error}")
+                continue
+            differing += bool(diff)
+            common.update(set(_change_keys(diff)))
+            if args.json:
+                print(json.dumps({'a': args.a, 'b': path, 'sections': diff}, ensure_ascii=False, default=str))
+                continue
+            added, removed, changed = count_changes(diff)
+            print(f"{path}: +{added} -{removed} ~{changed}")
+            if not args.brief:
+                for line in format_diff(diff):
+                    print(f"  {line}")
+    except (OSError, ValueError) as e:
+        print(f"diff: {e}", file=sys.stderr)
+        return 2
+    if not args.json:
+        print(f"\n{differing}/{len(paths)} reports differ from {args.a}" + (f", {failed} unreadable" if failed else ''))
+        if common and args.top > 0:
+            print('Most common changes:')
+            for (section, kind, item), n in common.most_common(args.top):
+                print(f"  {n:>6}  {section}: {kind} {item}")
+    return 2 if failed else (1 if differing else 0)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,420 @@
+"""Streaming exporters for LPM reports.
+
+Each exporter receives sections and lines as they are parsed and writes them
+straight to disk, so exporting never needs the whole report in memory.
+Consumers call begin_section(name), write_line(line) for each entry, and
+finish(summary) once the stream ends; close() releases the file on failure.
+
+Besides JSON, CSV and XML there are formats meant for bulk loading: NDJSON
+(one object per line), MessagePack (compact binary, written with a small
+built-in encoder so no extra package is needed) and a columnar JSON layout of
+the typed section records.
+"""
+import csv
+import json
+import re
+import struct
+from xml.sax.saxutils import escape, quoteattr
+
+from records import parser_for
+
+# Control characters other than tab, newline and carriage return are invalid in XML
+XML_INVALID_RE = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+COMPACT = (',', ':')
+
+
+def sanitize_xml_text(text):
+    """Remove null bytes and other invalid XML characters."""
+    if not text:
+        return ''
+    return XML_INVALID_RE.sub('', text)
+
+
+def packb(obj):
+    """Encode obj (None, bool, int, float, str, bytes, list, tuple, dict) as MessagePack"""
+    if obj is None:
+        return b'\xc0'
+    if obj is True:
+        return b'\xc3'
+    if obj is False:
+        return b'\xc2'
+    if isinstance(obj, int):
+        if 0 <= obj < 0x80:
+            return struct.pack('B', obj)
+        if -0x20 <= obj < 0:
+            return struct.pack('b', obj)
+        if 0 <= obj <= 0xffffffff:
+            return struct.pack('>BI', 0xce, obj)
+        if 0 <= obj <= 0xffffffffffffffff:
+            return struct.pack('>BQ', 0xcf, obj)
+        if -0x80000000 <= obj < 0:
+            return struct.pack('>Bi', 0xd2, obj)
+        return struct.pack('>Bq', 0xd3, obj)
+    if isinstance(obj, float):
+        return struct.pack('>Bd', 0xcb, obj)
+    if isinstance(obj, str):
+        data = obj.encode('utf-8', 'surrogatepass')
+        n = len(data)
+        if n < 32:
+            return struct.pack('B', 0xa0 | n) + data
+        if n <= 0xff:
+            return struct.pack('>BB', 0xd9, n) + data
+        if n <= 0xffff:
+            return struct.pack('>BH', 0xda, n) + data
+        return struct.pack('>BI', 0xdb, n) + data
+    if isinstance(obj, (bytes, bytearray)):
+        n = len(obj)
+        if n <= 0xff:
+            return struct.pack('>BB', 0xc4, n) + bytes(obj)
+        if n <= 0xffff:
+            return struct.pack('>BH', 0xc5, n) + bytes(obj)
+        return struct.pack('>BI', 0xc6, n) + bytes(obj)
+    if isinstance(obj, (list, tuple)):
+        n = len(obj)
+        if n < 16:
+            head = struct.pack('B', 0x90 | n)
+        elif n <= 0xffff:
+            head = struct.pack('>BH', 0xdc, n)
+        else:
+            head = struct.pack('>BI', 0xdd, n)
+        return head + b''.join(packb(v) for v in obj)
+    if isinstance(obj, dict):
+        n = len(obj)
+        if n < 16:
+            head = struct.pack('B', 0x80 | n)
+        elif n <= 0xffff:
+            head = struct.pack('>BH', 0xde, n)
+        else:
+            head = struct.pack('>BI', 0xdf, n)
+        return head + b''.join(packb(k) + packb(v) for k, v in obj.items())
+    raise TypeError(f"cannot pack {type(obj).__name__}")
+
+
+def _unpack(data, pos):
+    """Decode one MessagePack value at data[pos]; returns (value, next_pos)"""
+    b = data[pos]
+    pos += 1
+    if b < 0x80:
+        return b, pos
+    if b >= 0xe0:
+        return b - 0x100, pos
+    if 0xa0 <= b <= 0xbf:
+        n = b & 0x1f
+        return data[pos:pos + n].decode('utf-8', 'surrogatepass'), pos + n
+    if 0x90 <= b <= 0x9f:
+        return _unpack_array(data, pos, b & 0x0f)
+    if 0x80 <= b <= 0x8f:
+        return _unpack_map(data, pos, b & 0x0f)
+    if b == 0xc0:
+        return None, pos
+    if b in (0xc2, 0xc3):
+        return b == 0xc3, pos
+    fixed = {0xcb: '>d', 0xca: '>f', 0xcc: '>B', 0xcd: '>H', 0xce: '>I', 0xcf: '>Q',
+             0xd0: '>b', 0xd1: '>h', 0xd2: '>i', 0xd3: '>q'}
+    if b in fixed:
+        fmt = fixed[b]
+        return struct.unpack_from(fmt, data, pos)[0], pos + struct.calcsize(fmt)
+    sized = {0xd9: ('>B', 'str'), 0xda: ('>H', 'str'), 0xdb: ('>I', 'str'),
+             0xc4: ('>B', 'bin'), 0xc5: ('>H', 'bin'), 0xc6: ('>I', 'bin'),
+             0xdc: ('>H', 'array'), 0xdd: ('>I', 'array'),
+             0xde: ('>H', 'map'), 0xdf: ('>I', 'map')}
+    if b not in sized:
+        raise ValueError(f"unsupported MessagePack type 0x{b:02x}")
+    fmt, kind = sized[b]
+    n = struct.unpack_from(fmt, data, pos)[0]
+    pos += struct.calcsize(fmt)
+    if kind == 'str':
+        return data[pos:pos + n].decode('utf-8', 'surrogatepass'), pos + n
+    if kind == 'bin':
+        return bytes(data[pos:pos + n]), pos + n
+    if kind == 'array':
+        return _unpack_array(data, pos, n)
+    return _unpack_map(data, pos, n)
+
+
+def _unpack_array(data, pos, n):
+    items = []
+    for _ in range(n):
+        value, pos = _unpack(data, pos)
+        items.append(value)
+    return items, pos
+
+
+def _unpack_map(data, pos, n):
+    result = {}
+    for _ in range(n):
+        key, pos = _unpack(data, pos)
+        result[key], pos = _unpack(data, pos)
+    return result, pos
+
+
+def unpack_stream(data):
+    """Yield each MessagePack value in a buffer of concatenated values"""
+    pos = 0
+    while pos < len(data):
+        value, pos = _unpack(data, pos)
+        yield value
+
+
+def read_msgpack(path):
+    """Load a MsgpackExporter file back into ({section: [lines]}, summary)"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    sections = {}
+    summary = None
+    current = None
+    for value in unpack_stream(data):
+        if isinstance(value, str):
+            sections[current].append(value)
+        elif 'section' in value:
+            current = value['section']
+            sections[current] = []
+        elif 'summary' in value:
+            summary = value['summary']
+    return sections, summary
+
+
+class Exporter:
+    """Base class for streaming exporters writing to a single file."""
+
+    label = None
+    newline = None
+    binary = False
+
+    def __init__(self, path):
+        self.path = path
+        if self.binary:
+            self.f = open(path, 'wb')
+        else:
+            self.f = open(path, 'w', encoding='utf-8', newline=self.newline)
+
+    def begin_section(self, name):
+        pass
+
+    def write_line(self, line):
+        pass
+
+    def finish(self, summary):
+        self.close()
+
+    def close(self):
+        if not self.f.closed:
+            self.f.close()
+
+
+class JsonExporter(Exporter):
+    """Writes {'sections': {...}, 'summary': {...}} with the layout of json.dump(indent=2)."""
+
+    label = 'JSON'
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.f.write('{\n  "sections": {')
+        self._sections = 0
+        self._lines = 0
+
+    def _end_section(self):
+        if self._sections:
+            self.f.write('\n    ]' if self._lines else ']')
+
+    def begin_section(self, name):
+        self._end_section()
+        self.f.write(',\n' if self._sections else '\n')
+        self.f.write(f"    {json.dumps(name, ensure_ascii=False)}: [")
+        self._sections += 1
+        self._lines = 0
+
+    def write_line(self, line):
+        self.f.write(',\n' if self._lines else '\n')
+        self.f.write(f"      {json.dumps(line, ensure_ascii=False)}")
+        self._lines += 1
+
+    def finish(self, summary):
+        self._end_section()
+        self.f.write('\n  },\n' if self._sections else '},\n')
+        body = json.dumps(summary, indent=2, ensure_ascii=False).replace('\n', '\n  ')
+        self.f.write(f'  "summary": {body}\n}}')
+        self.close()
+
+
+class CsvExporter(Exporter):
+    """Writes one (section, entry) row per line."""
+
+    label = 'CSV'
+    newline = ''
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.writer = csv.writer(self.f)
+        self.writer.writerow(['section', 'entry'])
+        self._section = None
+
+    def begin_section(self, name):
+        self._section = name
+
+    def write_line(self, line):
+        self.writer.writerow([self._section, line])
+
+
+class XmlExporter(Exporter):
+    """Writes <report><sections>...</sections><summary>...</summary></report> incrementally."""
+
+    label = 'XML'
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.f.write("<?xml version='1.0' encoding='utf-8'?>\n<report><sections>")
+        self._open = False
+        self._lines = 0
+
+    def _end_section(self):
+        # Empty sections are self-closing, as ElementTree writes them
+        if self._open:
+            self.f.write('</section>' if self._lines else ' />')
+
+    def begin_section(self, name):
+        self._end_section()
+        self.f.write(f"<section name={quoteattr(sanitize_xml_text(name))}")
+        self._open = True
+        self._lines = 0
+
+    def write_line(self, line):
+        self.f.write(f"{'' if self._lines else '>'}<entry>{escape(sanitize_xml_text(line))}</entry>")
+        self._lines += 1
+
+    def finish(self, summary):
+        self._end_section()
+        self.f.write('</sections><summary>')
+        for k, v in summary.items():
+            self.f.write(f"<metric name={quoteattr(sanitize_xml_text(str(k)))}>{escape(sanitize_xml_text(str(v)))}</metric>")
+        self.f.write('</summary></report>')
+        self.close()
+
+
+class NdjsonExporter(Exporter):
+    """Writes one {"section", "entry"} object per line, then a {"summary"} line."""
+
+    label = 'NDJSON'
+    newline = '\n'
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._prefix = None
+
+    def begin_section(self, name):
+        # The section key is encoded once and reused for every line
+        self._prefix = f'{{"section":{json.dumps(name, ensure_ascii=False)},"entry":'
+
+    def write_line(self, line):
+        self.f.write(f"{self._prefix}{json.dumps(line, ensure_ascii=False)}}}\n")
+
+    def finish(self, summary):
+        self.f.write(json.dumps({'summary': summary}, ensure_ascii=False, separators=COMPACT) + '\n')
+        self.close()
+
+
+class MsgpackExporter(Exporter):
+    """Writes a stream of MessagePack values: {"section": name}, then each line as a string.
+
+    The file ends with {"summary": {...}}. Any MessagePack reader can iterate it
+    (e.g. msgpack.Unpacker); read_msgpack() loads it without extra packages.
+    """
+
+    label = 'MessagePack'
+    binary = True
+
+    def begin_section(self, name):
+        self.f.write(packb({'section': name}))
+
+    def write_line(self, line):
+        self.f.write(packb(line))
+
+    def finish(self, summary):
+        self.f.write(packb({'summary': summary}))
+        self.close()
+
+
+class ColumnarExporter(Exporter):
+    """Writes typed section records column by column.
+
+    Sections with a record parser (services, programs, disks, adapters,
+    hotfixes, ping, top processes) become tables of {"rows": N, "columns": {field: [values]},
+    "extra": [lines]}, where "extra" keeps the lines no record accounts for
+    ("[Collected N programs]", "Ping failed or blocked.", collector errors), so
+    nothing is lost relative to the JSON export. Other sections are kept as
+    plain line lists. Columns have to be complete before they are written, so
+    only the parsed records and extra lines are held until finish().
+    """
+
+    label = 'Columnar'
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.records = {}
+        self.extra = {}
+        self.lines = {}
+        self.tables = []
+        self._parser = None
+        self._rows = None
+        self._out = None
+
+    def _flush(self):
+        if self._parser is not None:
+            rec = self._parser.finish()
+            if rec is not None:
+                self._rows.append(rec)
+
+    def begin_section(self, name):
+        self._flush()
+        self._parser = parser_for(name)
+        if self._parser is not None:
+            if name not in self.records:
+                self.tables.append(name)
+            self._rows = self.records.setdefault(name, [])
+            self._out = self.extra.setdefault(name, [])
+        else:
+            self._out = self.lines.setdefault(name, [])
+
+    def write_line(self, line):
+        parser = self._parser
+        if parser is None:
+            self._out.append(line)
+            return
+        pending = getattr(parser, 'pending', None)
+        rec = parser.feed(line)
+        if rec is not None:
+            self._rows.append(rec)
+        elif getattr(parser, 'pending', None) is pending:
+            # Neither a record nor the start of one (a disk's DeviceID line)
+            self._out.append(line)
+
+    def finish(self, summary):
+        self._flush()
+        self._parser = None
+        tables = {}
+        for section in self.tables:
+            rows = self.records[section]
+            # A section can mix record types (ping replies and per-target stats);
+            # columns are the union of their fields, None where a type lacks one
+            fields = {}
+            for cls in dict.fromkeys(type(r) for r in rows):
+                fields.update(dict.fromkeys(cls.__slots__))
+            tables[section] = {
+                'rows': len(rows),
+                'columns': {name: [getattr(r, name, None) for r in rows] for name in fields},
+                'extra': self.extra[section],
+            }
+        doc = {'format': 'lpm-columnar', 'version': 1, 'tables': tables, 'lines': self.lines, 'summary': summary}
+        json.dump(doc, self.f, ensure_ascii=False, separators=COMPACT)
+        self.close()
+
+
+# Export format -> exporter class, in the order LPM opens them
+EXPORTERS = {
+    'json': JsonExporter,
+    'csv': CsvExporter,
+    'xml': XmlExporter,
+    'ndjson': NdjsonExporter,
+    'msgpack': MsgpackExporter,
+    'columnar': ColumnarExporter,
+}
@@ -0,0 +1,237 @@
+"""Collect LPM reports from many hosts at once.
+
+`LPM.py fleet --hosts hosts.txt` runs the collector on every listed host over
+a transport (ssh by default, or a local command standing in for one) with at
+most --workers sessions open at a time. Each host's info.txt-format output is
+parsed with parse_info() and summarised as soon as that host finishes, so
+results stream out in completion order and a sweep takes about as long as the
+slowest host rather than the sum of them.
+
+    python LPM.py fleet --hosts hosts.txt --out fleet.ndjson
+    python LPM.py fleet --hosts hosts.txt --transport local --command "python collector.py"
+"""
+import argparse
+import asyncio
+import json
+import os
+import shlex
+import sys
+import time
+
+from report import parse_info, summarize
+
+DEFAULT_WORKERS = 64
+DEFAULT_TIMEOUT = 120.0
+DEFAULT_REMOTE_COMMAND = 'python3 collector.py'
+COLLECTOR_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'collector.py')
+# Lines of stderr kept for a failed host
+STDERR_TAIL = 5
+
+
+def read_hosts(path):
+    """Host names from a file, one per line; blank lines and # comments skipped.
+
+    Raises ValueError for an entry starting with '-', which ssh (or a local
+    command) would take as an option rather than a host.
+    """
+    hosts = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for n, line in enumerate(f, 1):
+            line = line.split('#', 1)[0].strip()
+            if line.startswith('-'):
+                raise ValueError(f"{path}:{n}: host {line!r} starts with '-'")
+            if line:
+                hosts.append(line)
+    return hosts
+
+
+class Transport:
+    """Builds the command that prints one host's report on stdout"""
+
+    name = None
+
+    def command(self, host):
+        raise NotImplementedError
+
+
+class SshTransport(Transport):
+    """Runs the collector over ssh; keys or an agent must already be set up (BatchMode)"""
+
+    name = 'ssh'
+
+    def __init__(self, remote_command=DEFAULT_REMOTE_COMMAND, ssh='ssh', options=(), connect_timeout=10):
+        self.remote_command = remote_command
+        self.ssh = ssh
+        self.options = list(options)
+        self.connect_timeout = connect_timeout
+
+    def command(self, host):
+        argv = [self.ssh, '-o', 'BatchMode=yes', '-o', f"ConnectTimeout={self.connect_timeout}"]
+        for option in self.options:
+            argv += ['-o', option]
+        # '--' ends ssh's options, so the host can never be read as one
+        return argv + ['--', host, self.remote_command]
+
+
+class LocalTransport(Transport):
+    """Runs a local command per host, with {host} substituted.
+
+    A stand-in for hosts reached some other way (a container exec, a jump
+    script) and for trying the fleet mode against this machine.
+    """
+
+    name = 'local'
+
+    def __init__(self, command=None):
+        self.template = command
+
+    def command(self, host):
+        if not self.template:
+            return [sys.executable, COLLECTOR_PATH]
+        return shlex.split(self.template.replace('{host}', host), posix=os.name != 'nt')
+
+
+TRANSPORTS = {
+    'ssh': SshTransport,
+    'local': LocalTransport,
+}
+
+
+def summarize_output(text):
+    """Parse one host's report; returns (sections, summary)"""
+    sections = parse_info(text)
+    return sections, summarize(sections, live_memory=False)
+
+
+async def collect_host(host, transport, timeout):
+    """Run the transport command for one host; returns a result dict"""
+    result = {'host': host, 'status': 'error', 'elapsed': 0.0, 'error': None, 'summary': None, 'sections': None}
+    start = time.monotonic()
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *transport.command(host), stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+    except OSError as e:
+        result['error'] = str(e)
+        return result
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        result['status'] = 'timed_out'
+        result['error'] = f"no report after {timeout:g}s"
+        result['elapsed'] = time.monotonic() - start
+        return result
+    result['elapsed'] = time.monotonic() - start
+    text = stdout.decode('utf-8', errors='ignore')
+    if proc.returncode != 0 or not text.strip():
+        tail = stderr.decode('utf-8', errors='ignore').strip().splitlines()[-STDERR_TAIL:]
+        result['error'] = f"exit {proc.returncode}: " + (' / '.join(tail) or 'no output')
+        return result
+    # Parsing is CPU work; keep it off the loop so other hosts' output keeps flowing
+    loop = asyncio.get_running_loop()
+    result['sections'], result['summary'] = await loop.run_in_executor(None, summarize_output, text)
+    result['status'] = 'ok'
+    return result
+
+
+async def sweep(hosts, transport, workers=DEFAULT_WORKERS, timeout=DEFAULT_TIMEOUT, on_result=None):
+    """Collect every host with at most `workers` running at once.
+
+    `on_result(result)` is called as each host finishes, in completion order.
+    Returns the results in host order.
+    """
+    limit = asyncio.Semaphore(max(1, workers))
+
+    async def bounded(host):
+        async with limit:
+            result = await collect_host(host, transport, timeout)
+        if on_result:
+            on_result(result)
+        return result
+
+    return await asyncio.gather(*(bounded(host) for host in hosts))
+
+
+def run_sweep(hosts, transport, workers=DEFAULT_WORKERS, timeout=DEFAULT_TIMEOUT, on_result=None):
+    """Blocking wrapper around sweep()"""
+    return asyncio.run(sweep(hosts, transport, workers, timeout, on_result))
+
+
+def _pct(part, whole):
+    return f"{part / whole * 100:5.1f}%" if part is not None and whole else '    -'
+
+
+def format_result(result):
+    """One console line for a finished host"""
+    if result['status'] != 'ok':
+        return f"FAIL {result['host']:<28}{result['elapsed']:>7.2f}s  {result['status']}: {result['error']}"
+    s = result['summary']
+    ping = f"{s['ping_avg_ms']:.1f} ms" if s.get('ping_avg_ms') is not None else '-'
+    return (f"OK   {result['host']:<28}{result['elapsed']:>7.2f}s  disk {_pct(s['disk_used_bytes'], s['disk_total_bytes'])}"
+            f"  mem {_pct(s['mem_used_bytes'], s['mem_total_bytes'])}  ping {ping}")
+
+
+def main(argv=None):
+    """Entry point for `LPM.py fleet`; returns the process exit code"""
+    parser = argparse.ArgumentParser(prog='LPM.py fleet', description='Collect LPM reports from many hosts concurrently')
+    parser.add_argument('--hosts', required=True, help='File listing one host per line (user@host works for ssh)')
+    parser.add_argument('--transport', choices=sorted(TRANSPORTS), default='ssh', help='How to reach each host (default: ssh)')
+    parser.add_argument('--command', help=f"Command run per host: the remote command for ssh (default: {DEFAULT_REMOTE_COMMAND!r}), "
+                                          'or a local command with {host} substituted for local')
+    parser.add_argument('--ssh-option', action='append', default=[], help='Extra ssh -o option, e.g. StrictHostKeyChecking=accept-new')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help=f"Hosts collected at once (default: {DEFAULT_WORKERS})")
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT, help=f"Seconds allowed per host (default: {DEFAULT_TIMEOUT:g})")
+    parser.add_argument('--out', help='Append one JSON line per host (host, status, summary, sections) as results arrive')
+    parser.add_argument('--no-sections', action='store_true', help='Leave section lines out of --out, keeping only summaries')
+    args = parser.parse_args(argv)
+
+    try:
+        hosts = read_hosts(args.hosts)
+    except (OSError, ValueError) as e:
+        print(f"fleet: {e}", file=sys.stderr)
+        return 2
+    if not hosts:
+        print(f"fleet: no hosts in {args.hosts}", file=sys.stderr)
+        return 2
+    if args.transport == 'ssh':
+        transport = SshTransport(args.command or DEFAULT_REMOTE_COMMAND, options=args.ssh_option)
+    else:
+        transport = LocalTransport(args.command)
+
+    out = open(args.out, 'a', encoding='utf-8') if args.out else None
+    done = [0]
+
+    def on_result(result):
+        done[0] += 1
+        print(f"[{done[0]:>{len(str(len(hosts)))}}/{len(hosts)}] {format_result(result)}", flush=True)
+        if out is not None:
+            record = {k: v for k, v in result.items() if not (k == 'sections' and args.no_sections)}
+            out.write(json.dumps(record, ensure_ascii=False) + '\n')
+            out.flush()
+
+    print(f"Collecting from {len(hosts)} host(s) over {transport.name}, {args.workers} at a time...")
+    start = time.monotonic()
+    try:
+        results = run_sweep(hosts, transport, args.workers, args.timeout, on_result)
+    except KeyboardInterrupt:
+        print('fleet: interrupted', file=sys.stderr)
+        return 130
+    finally:
+        if out is not None:
+            out.close()
+    wall = time.monotonic() - start
+
+    ok = [r for r in results if r['status'] == 'ok']
+    slowest = max(results, key=lambda r: r['elapsed'])
+    print(f"\n{len(ok)}/{len(results)} hosts reported in {wall:.2f}s "
+          f"(slowest {slowest['host']} {slowest['elapsed']:.2f}s, sum of hosts {sum(r['elapsed'] for r in results):.2f}s)")
+    failed = [r['host'] for r in results if r['status'] != 'ok']
+    if failed:
+        print(f"Failed: {', '.join(failed)}")
+    return 0 if not failed else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
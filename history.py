@@ -0,0 +1,414 @@
+"""Local time-series history of LPM metrics.
+
+Each run's summary (plus per-disk metrics), and every --daemon sample, is
+appended to a small SQLite store with three tiers: raw samples, 1-minute and
+1-hour rollups. Rollups are maintained as samples arrive, each tier has its
+own retention, and the file is kept under a size cap by pruning the oldest
+raw data first. Queries read the coarsest tier that still resolves the range,
+so they touch a few thousand rows at most.
+
+    python LPM.py history --list
+    python LPM.py history --metric mem_used --since 7d --agg p95
+    python LPM.py history --metric cpu_pct --since 24h --agg max --by 1h
+"""
+import argparse
+import json
+import math
+import re
+import sqlite3
+import sys
+import time
+
+from records import RecordStream, Disk, PingStats
+
+DEFAULT_HISTORY_PATH = 'lpm_history.db'
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# (tier name, bucket seconds, retention seconds); bucket 0 is the raw tier
+TIERS = (
+    ('raw', 0, 2 * 86400),
+    ('1m', 60, 30 * 86400),
+    ('1h', 3600, 730 * 86400),
+)
+# Auto tier selection aims for at most this many rows per query
+MAX_POINTS = 5000
+FLUSH_INTERVAL = 30.0
+FLUSH_VALUES = 5000
+AGGREGATES = ('mean', 'min', 'max', 'sum', 'count', 'last', 'p50', 'p90', 'p95', 'p99')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS metrics (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS samples (
+    metric_id INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (metric_id, ts)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS samples_ts ON samples (ts);
+CREATE TABLE IF NOT EXISTS rollups (
+    tier INTEGER NOT NULL,
+    metric_id INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    sum REAL NOT NULL,
+    min REAL NOT NULL,
+    max REAL NOT NULL,
+    PRIMARY KEY (tier, metric_id, bucket)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS rollups_bucket ON rollups (tier, bucket);
+"""
+
+DURATION_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([smhdw]?)\s*$", re.I)
+DURATION_UNITS = {'': 1, 's': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 7 * 86400}
+
+
+def parse_duration(text):
+    """Parse "90s", "15m", "12h", "7d" or "2w" into seconds"""
+    m = DURATION_RE.match(text or '')
+    if not m:
+        raise ValueError(f"invalid duration: {text!r} (use e.g. 30m, 12h, 7d)")
+    return float(m.group(1)) * DURATION_UNITS[m.group(2).lower()]
+
+
+def _percentile(rows, pct):
+    """Nearest-rank percentile of (value, weight) pairs"""
+    rows = sorted(rows)
+    total = sum(w for _v, w in rows)
+    if not total:
+        return None
+    rank = max(1, int(math.ceil(pct / 100.0 * total)))
+    seen = 0
+    for value, weight in rows:
+        seen += weight
+        if seen >= rank:
+            return value
+    return rows[-1][0]
+
+
+def aggregate(rows, agg):
+    """Aggregate (ts, count, sum, min, max) rows; percentiles use per-row means"""
+    if not rows:
+        return None
+    if agg == 'mean':
+        return sum(r[2] for r in rows) / sum(r[1] for r in rows)
+    if agg == 'min':
+        return min(r[3] for r in rows)
+    if agg == 'max':
+        return max(r[4] for r in rows)
+    if agg == 'sum':
+        return sum(r[2] for r in rows)
+    if agg == 'count':
+        return sum(r[1] for r in rows)
+    if agg == 'last':
+        last = max(rows)
+        return last[2] / last[1]
+    if agg.startswith('p'):
+        return _percentile([(r[2] / r[1], r[1]) for r in rows], float(agg[1:]))
+    raise ValueError(f"unknown aggregate: {agg}")
+
+
+class HistoryStore:
+    """Tiered SQLite time-series store for local trend queries."""
+
+    def __init__(self, path=DEFAULT_HISTORY_PATH, max_bytes=DEFAULT_MAX_BYTES, tiers=TIERS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.tiers = tiers
+        self.conn = sqlite3.connect(path, isolation_level=None)
+        # Only takes effect on a new file; lets pruning hand pages back to the OS
+        self.conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        self._ids = dict((name, i) for i, name in self.conn.execute('SELECT id, name FROM metrics'))
+        self._pending = []
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    def _metric_id(self, cur, name):
+        metric_id = self._ids.get(name)
+        if metric_id is None:
+            cur.execute('INSERT OR IGNORE INTO metrics (name) VALUES (?)', (name,))
+            metric_id = cur.execute('SELECT id FROM metrics WHERE name = ?', (name,)).fetchone()[0]
+            self._ids[name] = metric_id
+        return metric_id
+
+    def add(self, timestamp, metrics):
+        """Queue {name: value} observed at `timestamp`; None and NaN are skipped.
+
+        Writes are batched and flushed every FLUSH_INTERVAL seconds or
+        FLUSH_VALUES values; call flush() or close() to write immediately.
+        """
+        for name, value in metrics.items():
+            if value is None or value != value or isinstance(value, bool):
+                continue
+            self._pending.append((name, timestamp, float(value)))
+        if len(self._pending) >= FLUSH_VALUES or time.monotonic() - self._last_flush >= FLUSH_INTERVAL:
+            self.flush()
+
+    def record(self, timestamp, metrics):
+        """Add one observation and write it straight away"""
+        self.add(timestamp, metrics)
+        self.flush()
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        cur = self.conn.cursor()
+        cur.execute('BEGIN')
+        try:
+            for name, ts, value in pending:
+                metric_id = self._metric_id(cur, name)
+                cur.execute('INSERT OR IGNORE INTO samples (metric_id, ts, value) VALUES (?, ?, ?)',
+                            (metric_id, ts, value))
+                if cur.rowcount == 0:
+                    # Already recorded; rolling it up again would double count it
+                    continue
+                for _tier_name, step, _retention in self.tiers:
+                    if step:
+                        self._roll_up(cur, step, metric_id, int(ts // step) * step, value)
+            self._prune(cur, time.time())
+            cur.execute('COMMIT')
+        except Exception:
+            cur.execute('ROLLBACK')
+            raise
+        self._enforce_size()
+
+    def _roll_up(self, cur, step, metric_id, bucket, value):
+        # UPDATE-then-INSERT rather than ON CONFLICT, which older bundled SQLite lacks
+        cur.execute(
+            'UPDATE rollups SET count = count + 1, sum = sum + ?, min = MIN(min, ?), max = MAX(max, ?) '
+            'WHERE tier = ? AND metric_id = ? AND bucket = ?', (value, value, value, step, metric_id, bucket))
+        if cur.rowcount == 0:
+            cur.execute('INSERT INTO rollups (tier, metric_id, bucket, count, sum, min, max) VALUES (?, ?, ?, 1, ?, ?, ?)',
+                        (step, metric_id, bucket, value, value, value))
+
+    def _prune(self, cur, now):
+        for _tier_name, step, retention in self.tiers:
+            cutoff = now - retention
+            if step:
+                cur.execute('DELETE FROM rollups WHERE tier = ? AND bucket < ?', (step, cutoff))
+            else:
+                cur.execute('DELETE FROM samples WHERE ts < ?', (cutoff,))
+
+    def size_bytes(self):
+        page_size = self.conn.execute('PRAGMA page_size').fetchone()[0]
+        pages = self.conn.execute('PRAGMA page_count').fetchone()[0]
+        free = self.conn.execute('PRAGMA freelist_count').fetchone()[0]
+        return (pages - free) * page_size
+
+    def _enforce_size(self):
+        """Drop the oldest quarter of the finest non-empty tier until under max_bytes"""
+        if not self.max_bytes:
+            return
+        for _ in range(16):
+            if self.size_bytes() <= self.max_bytes:
+                break
+            for _tier_name, step, _retention in self.tiers:
+                if step:
+                    span = self.conn.execute('SELECT MIN(bucket), MAX(bucket) FROM rollups WHERE tier = ?', (step,)).fetchone()
+                    if span[0] is None or span[0] == span[1]:
+                        continue
+                    cutoff = span[0] + (span[1] - span[0]) / 4.0
+                    self.conn.execute('DELETE FROM rollups WHERE tier = ? AND bucket <= ?', (step, cutoff))
+                else:
+                    span = self.conn.execute('SELECT MIN(ts), MAX(ts) FROM samples').fetchone()
+                    if span[0] is None or span[0] == span[1]:
+                        continue
+                    cutoff = span[0] + (span[1] - span[0]) / 4.0
+                    self.conn.execute('DELETE FROM samples WHERE ts <= ?', (cutoff,))
+                break
+            else:
+                break
+        # execute() steps the pragma once (one page); executescript runs it to completion
+        self.conn.executescript('PRAGMA incremental_vacuum;')
+
+    def metrics(self):
+        return sorted(self._ids)
+
+    def resolve(self, name):
+        """Return the stored metric called `name`, or the single one it abbreviates"""
+        # "mem_used" means mem_used_bytes; the unit suffix may be left off
+        for suffix in ('', '_bytes', '_ms'):
+            if name + suffix in self._ids:
+                return name + suffix
+        matches = [m for m in self._ids if m.startswith(name)] or [m for m in self._ids if name in m]
+        if len(matches) == 1:
+            return matches[0]
+        if not matches:
+            raise KeyError(f"no metric matches {name!r}")
+        raise KeyError(f"{name!r} is ambiguous: {', '.join(sorted(matches))}")
+
+    def choose_tier(self, since, until, tier=None):
+        """Pick (name, step, retention): the finest tier within MAX_POINTS that still covers `since`"""
+        if tier:
+            for entry in self.tiers:
+                if entry[0] == tier:
+                    return entry
+            raise ValueError(f"unknown tier: {tier}")
+        now = time.time()
+        span = max(1.0, until - since)
+        for entry in self.tiers:
+            _name, step, retention = entry
+            if since >= now - retention and span / max(step, 1) <= MAX_POINTS:
+                return entry
+        return self.tiers[-1]
+
+    def rows(self, metric, since, until, tier):
+        """Return (ts, count, sum, min, max) rows for one metric from one tier"""
+        metric_id = self._ids[metric]
+        _name, step, _retention = tier
+        if not step:
+            return [(ts, 1, v, v, v) for ts, v in self.conn.execute(
+                'SELECT ts, value FROM samples WHERE metric_id = ? AND ts >= ? AND ts <= ? ORDER BY ts',
+                (metric_id, since, until))]
+        return self.conn.execute(
+            'SELECT bucket, count, sum, min, max FROM rollups WHERE tier = ? AND metric_id = ? '
+            'AND bucket >= ? AND bucket <= ? ORDER BY bucket',
+            (step, metric_id, int(since // step) * step, until)).fetchall()
+
+    def query(self, metric, since, until=None, agg='mean', by=None, tier=None):
+        """Aggregate a metric over [since, until].
+
+        Returns {'metric', 'agg', 'tier', 'points', 'value'}; with `by` seconds
+        'series' holds [(bucket_start, value)] instead of a single value.
+        """
+        metric = self.resolve(metric)
+        until = time.time() if until is None else until
+        chosen = self.choose_tier(since, until, tier)
+        rows = self.rows(metric, since, until, chosen)
+        result = {'metric': metric, 'agg': agg, 'tier': chosen[0], 'points': len(rows)}
+        if by:
+            groups = {}
+            for row in rows:
+                groups.setdefault(int(row[0] // by) * by, []).append(row)
+            result['series'] = [(start, aggregate(group, agg)) for start, group in sorted(groups.items())]
+        else:
+            result['value'] = aggregate(rows, agg)
+        return result
+
+
+class RunMetrics:
+    """Collect the per-run metrics history keeps from (section, line) events.
+
+    Adds per-disk usage, per-target ping latency/loss and the process count to
+    the summary fields, so disks and targets can be trended individually as
+    well as in total.
+    """
+
+    def __init__(self):
+        self.disks = []
+        self.ping_targets = []
+        self.process_count = None
+        self._records = RecordStream(self._add, ('Disks (Logical)', 'Ping Test'))
+
+    def _add(self, section, record):
+        if isinstance(record, Disk) and record.device_id:
+            self.disks.append(record)
+        elif isinstance(record, PingStats):
+            self.ping_targets.append(record)
+
+    def feed(self, section, line):
+        self._records.feed(section, line)
+        if section == 'Processes' and line and line.startswith('ProcessCount:'):
+            try:
+                self.process_count = int(line.split(':', 1)[1])
+            except ValueError:
+                pass
+
+    def result(self, summary):
+        self._records.finish()
+        metrics = {k: v for k, v in summary.items() if isinstance(v, (int, float))}
+        if summary.get('disk_total_bytes'):
+            metrics['disk_used_pct'] = summary['disk_used_bytes'] / summary['disk_total_bytes'] * 100
+        if summary.get('mem_total_bytes'):
+            metrics['mem_used_pct'] = summary['mem_used_bytes'] / summary['mem_total_bytes'] * 100
+        for disk in self.disks:
+            prefix = f"disk.{disk.device_id}"
+            metrics[f"{prefix}.used_bytes"] = disk.used_bytes
+            metrics[f"{prefix}.free_bytes"] = disk.free_bytes
+            if disk.size_bytes:
+                metrics[f"{prefix}.used_pct"] = disk.used_bytes / disk.size_bytes * 100
+        for stats in self.ping_targets:
+            prefix = f"ping.{stats.target}"
+            for field in ('p50_ms', 'p95_ms', 'p99_ms', 'jitter_ms', 'loss_pct'):
+                value = getattr(stats, field)
+                if value is not None:
+                    metrics[f"{prefix}.{field}"] = value
+        if self.process_count is not None:
+            metrics['process_count'] = self.process_count
+        return metrics
+
+
+def format_value(metric, value, agg=None):
+    if value is None:
+        return 'no data'
+    if agg == 'count':
+        return f"{value:,.0f}"
+    if metric.endswith('_bytes'):
+        for unit, mul in (('TB', 1024**4), ('GB', 1024**3), ('MB', 1024**2), ('KB', 1024)):
+            if abs(value) >= mul:
+                return f"{value / mul:,.2f} {unit}"
+        return f"{value:,.0f} B"
+    if metric.endswith('_pct'):
+        return f"{value:.1f}%"
+    if metric.endswith('_ms'):
+        return f"{value:.1f} ms"
+    return f"{value:,.2f}"
+
+
+def main(argv=None):
+    """Entry point for `LPM.py history`; returns the process exit code"""
+    parser = argparse.ArgumentParser(prog='LPM.py history', description='Query the local LPM metric history')
+    parser.add_argument('--db', default=DEFAULT_HISTORY_PATH, help='History database path')
+    parser.add_argument('--metric', help='Metric name, or an unambiguous part of one (e.g. mem_used)')
+    parser.add_argument('--since', default='24h', help='How far back to look, e.g. 90m, 12h, 7d (default: 24h)')
+    parser.add_argument('--until', help='End of the range as a duration ago (default: now)')
+    parser.add_argument('--agg', default='mean', choices=AGGREGATES, help='Aggregate (default: mean)')
+    parser.add_argument('--by', help='Also break the range into buckets of this size, e.g. 1h')
+    parser.add_argument('--tier', choices=[t[0] for t in TIERS], help='Force a storage tier instead of choosing automatically')
+    parser.add_argument('--list', action='store_true', help='List stored metrics')
+    parser.add_argument('--json', action='store_true', help='Print the result as JSON')
+    args = parser.parse_args(argv)
+
+    store = HistoryStore(args.db)
+    try:
+        if args.list or not args.metric:
+            for name in store.metrics():
+                print(name)
+            return 0
+        now = time.time()
+        try:
+            since = now - parse_duration(args.since)
+            until = now - parse_duration(args.until) if args.until else now
+            by = parse_duration(args.by) if args.by else None
+            result = store.query(args.metric, since, until, args.agg, by, args.tier)
+        except (KeyError, ValueError) as e:
+            print(f"history: {e.args[0] if e.args else e}", file=sys.stderr)
+            return 2
+    finally:
+        store.close()
+
+    if args.json:
+        print(json.dumps(result))
+        return 0
+    metric = result['metric']
+    print(f"{metric} {args.agg} over {args.since} ({result['tier']} tier, {result['points']} points)")
+    if 'series' in result:
+        for start, value in result['series']:
+            print(f"  {time.strftime('%Y-%m-%d %H:%M', time.localtime(start))}  {format_value(metric, value, args.agg)}")
+    else:
+        print(f"  {format_value(metric, result['value'], args.agg)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,251 @@
+"""Continuous sampling for LPM's --daemon mode.
+
+Samples the summary metrics plus per-CPU, per-disk and per-NIC counters into a
+preallocated ring buffer and reports rolling statistics over fixed windows.
+"""
+import math
+import threading
+import time
+from array import array
+
+import psutil
+
+from collector import fixed_partitions, tcp_rtt_ms, PING_HOST, PING_PORT, PING_TIMEOUT
+
+SUMMARY_COLUMNS = [
+    'disk_total_bytes',
+    'disk_free_bytes',
+    'disk_used_bytes',
+    'mem_total_bytes',
+    'mem_available_bytes',
+    'mem_used_bytes',
+    'ping_avg_ms',
+    'cpu_pct',
+]
+DEFAULT_PERCENTILES = (50, 95, 99)
+DEFAULT_WINDOWS = (60, 300, 900)
+DEFAULT_CAPACITY = 3600
+NAN = float('nan')
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, int(math.ceil(pct / 100.0 * len(sorted_values))))
+    return sorted_values[rank - 1]
+
+
+class RingBuffer:
+    """Fixed-capacity ring of samples stored in flat float arrays.
+
+    All storage is allocated up front: `capacity` rows of one timestamp plus one
+    float per column. Missing values are stored as NaN and ignored by stats().
+    """
+
+    def __init__(self, columns, capacity=DEFAULT_CAPACITY):
+        self.columns = list(columns)
+        self.index = {name: i for i, name in enumerate(self.columns)}
+        self.width = len(self.columns)
+        self.capacity = capacity
+        self._times = array('d', [0.0]) * capacity
+        self._data = array('d', [NAN]) * (capacity * self.width)
+        self._head = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, timestamp, values):
+        """Store one row; `values` is aligned with self.columns"""
+        base = self._head * self.width
+        data = self._data
+        for i, value in enumerate(values):
+            data[base + i] = NAN if value is None else value
+        self._times[self._head] = timestamp
+        self._head = (self._head + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+
+    def _rows(self, window=None):
+        """Yield row positions newest first, limited to `window` seconds"""
+        if not self._count:
+            return
+        newest = (self._head - 1) % self.capacity
+        cutoff = self._times[newest] - window if window else None
+        for back in range(self._count):
+            pos = (newest - back) % self.capacity
+            if cutoff is not None and self._times[pos] < cutoff:
+                return
+            yield pos
+
+    def latest(self):
+        """Return the newest row as {column: value}, or {} when empty"""
+        for pos in self._rows():
+            base = pos * self.width
+            return {name: self._data[base + i] for i, name in enumerate(self.columns)}
+        return {}
+
+    def column(self, name, window=None):
+        """Return the non-NaN values of one column within `window` seconds, newest first"""
+        offset = self.index[name]
+        data = self._data
+        width = self.width
+        values = []
+        for pos in self._rows(window):
+            v = data[pos * width + offset]
+            if v == v:
+                values.append(v)
+        return values
+
+    def stats(self, window=None, columns=None, percentiles=DEFAULT_PERCENTILES):
+        """Return {column: {count, min, max, mean, pN...}} over the last `window` seconds"""
+        result = {}
+        for name in columns or self.columns:
+            values = sorted(self.column(name, window))
+            if not values:
+                continue
+            entry = {
+                'count': len(values),
+                'min': values[0],
+                'max': values[-1],
+                'mean': sum(values) / len(values),
+            }
+            for pct in percentiles:
+                entry[f"p{pct}"] = percentile(values, pct)
+            result[name] = entry
+        return result
+
+
+class Sampler:
+    """Takes cheap periodic samples of host metrics for a RingBuffer.
+
+    The device set (CPUs, partitions, disks, NICs) is fixed at construction so
+    every sample has the same width. I/O counters are stored as per-second
+    rates. Ping runs on its own thread so a slow probe never delays a sample.
+    """
+
+    def __init__(self, ping_interval=30.0):
+        self.partitions = [p.mountpoint for p in fixed_partitions()]
+        self.cpus = psutil.cpu_count() or 1
+        self.disks = sorted(psutil.disk_io_counters(perdisk=True) or {})
+        self.nics = sorted(psutil.net_io_counters(pernic=True) or {})
+        self.columns = list(SUMMARY_COLUMNS)
+        self.columns += [f"cpu{i}_pct" for i in range(self.cpus)]
+        for disk in self.disks:
+            self.columns += [f"disk.{disk}.read_bps", f"disk.{disk}.write_bps"]
+        for nic in self.nics:
+            self.columns += [f"net.{nic}.sent_bps", f"net.{nic}.recv_bps"]
+
+        self._ping_ms = None
+        self._ping_interval = ping_interval
+        self._stop = threading.Event()
+        self._last_time = None
+        self._last_disk = None
+        self._last_net = None
+        # Prime the CPU counters so the first real sample is a valid delta
+        psutil.cpu_percent(percpu=True)
+        if ping_interval:
+            threading.Thread(target=self._ping_loop, name='lpm-ping', daemon=True).start()
+
+    def _ping_loop(self):
+        while not self._stop.is_set():
+            try:
+                self._ping_ms = tcp_rtt_ms(PING_HOST, PING_PORT, PING_TIMEOUT)
+            except OSError:
+                self._ping_ms = None
+            self._stop.wait(self._ping_interval)
+
+    def stop(self):
+        self._stop.set()
+
+    def sample(self):
+        """Return (timestamp, values) aligned with self.columns"""
+        now = time.time()
+        vm = psutil.virtual_memory()
+        disk_total = disk_free = 0
+        for mount in self.partitions:
+            try:
+                usage = psutil.disk_usage(mount)
+            except OSError:
+                continue
+            disk_total += usage.total
+            disk_free += usage.free
+        per_cpu = psutil.cpu_percent(percpu=True)
+        # Each probe result is recorded once so stats are not skewed by repeats
+        ping_ms, self._ping_ms = self._ping_ms, None
+
+        values = [
+            disk_total,
+            disk_free,
+            max(0, disk_total - disk_free),
+            vm.total,
+            vm.available,
+            vm.total - vm.available,
+            ping_ms,
+            sum(per_cpu) / len(per_cpu) if per_cpu else None,
+        ]
+        values += [per_cpu[i] if i < len(per_cpu) else None for i in range(self.cpus)]
+
+        disk_io = psutil.disk_io_counters(perdisk=True) or {}
+        net_io = psutil.net_io_counters(pernic=True) or {}
+        elapsed = (now - self._last_time) if self._last_time else None
+
+        def rate(current, previous, field):
+            if not elapsed or current is None or previous is None:
+                return None
+            return max(0, getattr(current, field) - getattr(previous, field)) / elapsed
+
+        last_disk = self._last_disk or {}
+        for disk in self.disks:
+            cur, prev = disk_io.get(disk), last_disk.get(disk)
+            values += [rate(cur, prev, 'read_bytes'), rate(cur, prev, 'write_bytes')]
+        last_net = self._last_net or {}
+        for nic in self.nics:
+            cur, prev = net_io.get(nic), last_net.get(nic)
+            values += [rate(cur, prev, 'bytes_sent'), rate(cur, prev, 'bytes_recv')]
+
+        self._last_time = now
+        self._last_disk = disk_io
+        self._last_net = net_io
+        return now, values
+
+
+def run_daemon(interval=1.0, windows=DEFAULT_WINDOWS, capacity=DEFAULT_CAPACITY, report_every=None, on_report=None,
+               on_sample=None, process_table=None):
+    """Sample every `interval` seconds until interrupted, reporting rolling stats.
+
+    `on_report(buffer, windows)` is called every `report_every` seconds
+    (defaults to the smallest window), and `on_sample(columns, timestamp,
+    values)` after every sample. A processes.ProcessTable passed as
+    `process_table` is refreshed with every sample. Returns the RingBuffer on exit.
+    """
+    sampler = Sampler()
+    buffer = RingBuffer(sampler.columns, capacity)
+    windows = list(windows) or list(DEFAULT_WINDOWS)
+    report_every = report_every or min(windows)
+    next_tick = time.monotonic()
+    next_report = next_tick + report_every
+    try:
+        while True:
+            timestamp, values = sampler.sample()
+            buffer.append(timestamp, values)
+            if on_sample:
+                on_sample(sampler.columns, timestamp, values)
+            if process_table is not None:
+                process_table.refresh()
+            now = time.monotonic()
+            if on_report and now >= next_report:
+                on_report(buffer, windows)
+                next_report = now + report_every
+            # Fixed-rate schedule: skip ticks rather than drift when a sample runs long
+            next_tick += interval
+            now = time.monotonic()
+            if next_tick < now:
+                next_tick = now + interval
+            time.sleep(next_tick - now)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sampler.stop()
+    return buffer
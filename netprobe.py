@@ -0,0 +1,150 @@
+"""Concurrent TCP latency prober for LPM's Ping Test.
+
+Each target is probed `count` times by timing a TCP connect with asyncio, so
+it runs unprivileged and every target is measured at the same time instead of
+one after another. Per target it reports loss, min/mean/max, p50/p95/p99 and
+jitter (mean absolute difference between consecutive round trips) with
+sub-millisecond precision.
+
+    results = asyncio.run(probe_targets(['8.8.8.8:53', '1.1.1.1:53']))
+"""
+import asyncio
+import socket
+import time
+
+from monitor import percentile
+
+DEFAULT_TARGETS = ('8.8.8.8:53', '1.1.1.1:53')
+DEFAULT_COUNT = 4
+DEFAULT_INTERVAL = 0.05
+DEFAULT_TIMEOUT = 2.0
+
+
+def parse_target(target, default_port=53):
+    """Split "host:port" (or "[v6]:port", or a bare host) into (host, port)"""
+    target = target.strip()
+    if target.startswith('['):
+        host, _, rest = target[1:].partition(']')
+        return host, int(rest.lstrip(':') or default_port)
+    if target.count(':') == 1:
+        host, port = target.split(':')
+        return host, int(port)
+    return target, default_port
+
+
+class ProbeResult:
+    """Round trips for one target; rtts holds milliseconds, None for a lost probe"""
+
+    __slots__ = ('target', 'address', 'rtts', 'error')
+
+    def __init__(self, target, address=None):
+        self.target = target
+        self.address = address
+        self.rtts = []
+        self.error = None
+
+    @property
+    def replies(self):
+        return [r for r in self.rtts if r is not None]
+
+    def stats(self):
+        replies = self.replies
+        ordered = sorted(replies)
+        sent = len(self.rtts)
+        jitter = None
+        if len(replies) > 1:
+            jitter = sum(abs(b - a) for a, b in zip(replies, replies[1:])) / (len(replies) - 1)
+        return {
+            'target': self.target,
+            'sent': sent,
+            'received': len(replies),
+            'loss_pct': (sent - len(replies)) / sent * 100.0 if sent else 100.0,
+            'min_ms': ordered[0] if ordered else None,
+            'mean_ms': sum(ordered) / len(ordered) if ordered else None,
+            'max_ms': ordered[-1] if ordered else None,
+            'p50_ms': percentile(ordered, 50),
+            'p95_ms': percentile(ordered, 95),
+            'p99_ms': percentile(ordered, 99),
+            'jitter_ms': jitter,
+        }
+
+
+async def tcp_connect_ms(family, sockaddr, timeout):
+    """Time one TCP handshake to a resolved address in milliseconds; None if it
+    times out or fails.
+
+    A bare non-blocking socket keeps streams and name lookups out of the timing.
+    A refused connection still completed a round trip (SYN -> RST), so it counts.
+    """
+    loop = asyncio.get_running_loop()
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setblocking(False)
+    try:
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(loop.sock_connect(sock, sockaddr), timeout)
+        except ConnectionRefusedError:
+            pass
+        except (OSError, asyncio.TimeoutError):
+            return None
+        return (time.perf_counter() - start) * 1000.0
+    finally:
+        sock.close()
+
+
+async def _probe_target(target, count, interval, timeout, on_reply=None, offset=0.0):
+    host, port = parse_target(target)
+    loop = asyncio.get_running_loop()
+    try:
+        # Resolve once up front so name lookups are not timed as latency
+        infos = await asyncio.wait_for(loop.getaddrinfo(host, port, type=socket.SOCK_STREAM), timeout)
+        family, sockaddr = infos[0][0], infos[0][4]
+    except (OSError, asyncio.TimeoutError) as e:
+        result = ProbeResult(target)
+        result.error = f"cannot resolve {host}: {e}"
+        result.rtts = [None] * count
+        return result
+    result = ProbeResult(target, sockaddr[0])
+    if offset:
+        await asyncio.sleep(offset)
+    next_probe = loop.time()
+    # A slow target gets the same time budget as a healthy one; unsent probes count as lost
+    deadline = next_probe + count * interval + timeout
+    for i in range(count):
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            result.rtts.extend([None] * (count - i))
+            break
+        rtt = await tcp_connect_ms(family, sockaddr, min(timeout, remaining))
+        result.rtts.append(rtt)
+        if on_reply:
+            on_reply(result, rtt)
+        if i + 1 < count:
+            next_probe += interval
+            await asyncio.sleep(max(0.0, next_probe - loop.time()))
+    return result
+
+
+async def probe_targets(targets=DEFAULT_TARGETS, count=DEFAULT_COUNT, interval=DEFAULT_INTERVAL,
+                        timeout=DEFAULT_TIMEOUT, on_reply=None):
+    """Probe every target concurrently; returns a ProbeResult per target, in order.
+
+    `on_reply(result, rtt_ms_or_None)` is called as each probe completes.
+    """
+    # Start times are spread over one interval so probes to different targets
+    # do not queue behind each other on the event loop and skew the timings
+    targets = list(targets)
+    step = interval / len(targets) if targets else 0.0
+    return await asyncio.gather(*(_probe_target(t, count, interval, timeout, on_reply, i * step)
+                                  for i, t in enumerate(targets)))
+
+
+def run_probes(targets=DEFAULT_TARGETS, count=DEFAULT_COUNT, interval=DEFAULT_INTERVAL,
+               timeout=DEFAULT_TIMEOUT, on_reply=None):
+    """Blocking wrapper around probe_targets() for threads without an event loop"""
+    return asyncio.run(probe_targets(targets, count, interval, timeout, on_reply))
+
+
+def worst_case_seconds(count=DEFAULT_COUNT, interval=DEFAULT_INTERVAL, timeout=DEFAULT_TIMEOUT):
+    """Upper bound on how long a probe run takes: name lookup, start offset and the per-target budget"""
+    return timeout + interval + count * interval + timeout
@@ -0,0 +1,329 @@
+"""OpenMetrics exporter for LPM.
+
+`LPM.py metrics` serves this host's summary and typed section data (volume
+sizes, adapter link speeds, service states, process count, ping latency) at
+/metrics in OpenMetrics text format for Prometheus and compatible scrapers.
+
+Collection never happens on the request path. A background thread runs the
+native collectors every --interval seconds, renders the whole exposition once
+and swaps the encoded bytes (plain and gzip) into place. A scrape only writes
+those bytes back, so it costs microseconds however many scrapers there are,
+and concurrent scrapes can never start a second collection.
+
+    python LPM.py metrics --port 9101 --interval 30
+"""
+import argparse
+import asyncio
+import gzip
+import sys
+import threading
+import time
+
+DEFAULT_PORT = 9101
+DEFAULT_INTERVAL = 30.0
+CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+PREFIX = 'lpm'
+
+# Only the sections that become metrics are collected on each refresh
+EXPORTED_SECTIONS = ('Disks (Logical)', 'Network Adapters', 'Processes', 'Services', 'Ping Test')
+RECORD_SECTIONS = ('Disks (Logical)', 'Network Adapters', 'Services', 'Ping Test')
+
+# Summary keys exported as gauges: key -> (metric name, unit, scale, help)
+SUMMARY_GAUGES = (
+    ('disk_total_bytes', 'disk_total', 'bytes', 1, 'Size of all fixed volumes'),
+    ('disk_free_bytes', 'disk_free', 'bytes', 1, 'Free space on all fixed volumes'),
+    ('disk_used_bytes', 'disk_used', 'bytes', 1, 'Used space on all fixed volumes'),
+    ('mem_total_bytes', 'memory_total', 'bytes', 1, 'Physical memory'),
+    ('mem_available_bytes', 'memory_available', 'bytes', 1, 'Memory available without swapping'),
+    ('mem_used_bytes', 'memory_used', 'bytes', 1, 'Memory in use'),
+    ('ping_avg_ms', 'ping_average', 'seconds', 0.001, 'Mean round trip over all ping targets'),
+    ('ping_jitter_ms', 'ping_jitter', 'seconds', 0.001, 'Mean change between consecutive replies'),
+    ('ping_loss_pct', 'ping_loss', 'ratio', 0.01, 'Share of probes that got no reply'),
+)
+
+
+def escape_label(value):
+    """Escape a label value for the exposition format"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value != value:
+        return 'NaN'
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Exposition:
+    """Builds OpenMetrics text one metric family at a time"""
+
+    def __init__(self, prefix=PREFIX):
+        self.prefix = prefix
+        self.lines = []
+
+    def family(self, name, kind, help_text, unit=None):
+        """Start a family; returns its full name, which samples are written under"""
+        # OpenMetrics names end in their unit
+        full = f"{self.prefix}_{name}" + (f"_{unit}" if unit else '')
+        self.lines.append(f"# HELP {full} {help_text}")
+        self.lines.append(f"# TYPE {full} {kind}")
+        if unit:
+            self.lines.append(f"# UNIT {full} {unit}")
+        return full
+
+    def sample(self, name, value, labels=(), suffix=''):
+        if value is None:
+            return
+        self.lines.append(f"{name}{suffix}{_labels(labels)} {_number(value)}")
+
+    def render(self):
+        return '\n'.join(self.lines + ['# EOF', ''])
+
+
+def render(sections, summary, status=None, collected_at=None, duration=None, collections=None):
+    """Render a sections dict and its summary as OpenMetrics text"""
+    from records import RecordCollector, Adapter, Disk, PingStats, Service
+    from report import iter_sections
+
+    collector = RecordCollector(RECORD_SECTIONS)
+    for section, line in iter_sections(sections):
+        collector.feed(section, line)
+    records = collector.result()
+    out = Exposition()
+
+    for key, name, unit, scale, help_text in SUMMARY_GAUGES:
+        value = summary.get(key)
+        if value is not None:
+            out.sample(out.family(name, 'gauge', help_text, unit), value * scale)
+
+    disks = [r for r in records.get('Disks (Logical)', []) if isinstance(r, Disk)]
+    if disks:
+        size = out.family('volume_size', 'gauge', 'Size of a fixed volume', 'bytes')
+        for disk in disks:
+            out.sample(size, disk.size_bytes, (('volume', disk.device_id), ('filesystem', disk.filesystem)))
+        free = out.family('volume_free', 'gauge', 'Free space on a fixed volume', 'bytes')
+        for disk in disks:
+            out.sample(free, disk.free_bytes, (('volume', disk.device_id), ('filesystem', disk.filesystem)))
+
+    adapters = [r for r in records.get('Network Adapters', []) if isinstance(r, Adapter)]
+    if adapters:
+        speed = out.family('adapter_link_speed', 'gauge', 'Negotiated link speed', 'bits_per_second')
+        for adapter in adapters:
+            out.sample(speed, adapter.link_speed_bps, (('adapter', adapter.name),))
+        up = out.family('adapter_up', 'gauge', '1 if the adapter is connected')
+        for adapter in adapters:
+            out.sample(up, 1 if adapter.status == 'Up' else 0, (('adapter', adapter.name),))
+
+    services = [r for r in records.get('Services', []) if isinstance(r, Service)]
+    if services:
+        from collector import SERVICE_STATES
+        state = out.family('service_state', 'stateset', 'Current state of each service')
+        known = list(SERVICE_STATES.values())
+        for service in services:
+            states = known if service.state in known else known + [service.state]
+            for value in states:
+                out.sample(state, 1 if value == service.state else 0, (('service', service.name), (state, value)))
+
+    for line in sections.get('Processes') or []:
+        key, _, value = line.partition(':')
+        if key.strip() == 'ProcessCount' and value.strip().isdigit():
+            out.sample(out.family('processes', 'gauge', 'Running processes'), int(value))
+
+    stats = [r for r in records.get('Ping Test', []) if isinstance(r, PingStats)]
+    if stats:
+        rtt = out.family('ping_rtt', 'summary', 'Round trip time per ping target', 'seconds')
+        for s in stats:
+            target = (('target', s.target),)
+            for quantile, value in (('0.5', s.p50_ms), ('0.95', s.p95_ms), ('0.99', s.p99_ms)):
+                if value is not None:
+                    out.sample(rtt, value / 1000, target + (('quantile', quantile),))
+            out.sample(rtt, s.received, target, '_count')
+            if s.mean_ms is not None:
+                out.sample(rtt, round(s.mean_ms * s.received / 1000, 9), target, '_sum')
+        jitter = out.family('ping_target_jitter', 'gauge', 'Mean change between consecutive replies per target', 'seconds')
+        for s in stats:
+            if s.jitter_ms is not None:
+                out.sample(jitter, s.jitter_ms / 1000, (('target', s.target),))
+        loss = out.family('ping_target_loss', 'gauge', 'Share of probes to a target that got no reply', 'ratio')
+        for s in stats:
+            out.sample(loss, s.loss_pct / 100 if s.loss_pct is not None else None, (('target', s.target),))
+
+    if status:
+        up = out.family('section_up', 'gauge', '1 if the section was collected (or reused) without error or timeout')
+        for section, entry in status.items():
+            if entry['status'] == 'skipped':
+                continue
+            out.sample(up, 1 if entry['status'] in ('ok', 'cached') else 0, (('section', section),))
+    if duration is not None:
+        out.sample(out.family('collection_duration', 'gauge', 'Time the last collection took', 'seconds'), duration)
+    if collected_at is not None:
+        out.sample(out.family('collection_timestamp', 'gauge', 'When the served data was collected', 'seconds'), collected_at)
+    if collections is not None:
+        out.sample(out.family('collections', 'counter', 'Collections since the exporter started'), collections, suffix='_total')
+    return out.render()
+
+
+class MetricsCache:
+    """The latest rendered exposition, refreshed by one background thread.
+
+    `payload` is a (plain, gzip) bytes pair replaced in a single assignment,
+    so readers never see a half-built exposition and never take a lock.
+    """
+
+    def __init__(self, interval=DEFAULT_INTERVAL, ping_targets=None, ping_count=None):
+        self.interval = interval
+        self.ping_targets = ping_targets
+        self.ping_count = ping_count
+        self.payload = None
+        self.collections = 0
+        self.errors = 0
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _collectors(self):
+        from collector import SECTION_COLLECTORS, collect_ping
+        configured = {'Ping Test': lambda: collect_ping(self.ping_targets, self.ping_count)}
+        return [(name, configured.get(name, func)) for name, func in SECTION_COLLECTORS if name in EXPORTED_SECTIONS]
+
+    def refresh(self):
+        """Collect once and swap in the new exposition"""
+        from collector import run_collectors, ping_deadline, PING_COUNT
+        from report import summarize
+        start = time.monotonic()
+        sections, status = run_collectors(self._collectors(),
+                                          timeouts={'Ping Test': ping_deadline(self.ping_count or PING_COUNT)})
+        summary = summarize(sections)
+        self.collections += 1
+        text = render(sections, summary, status, collected_at=time.time(),
+                      duration=time.monotonic() - start, collections=self.collections)
+        body = text.encode('utf-8')
+        self.payload = (body, gzip.compress(body, compresslevel=6))
+
+    def _run(self):
+        next_tick = time.monotonic() + self.interval
+        while not self._stop.wait(max(0.0, next_tick - time.monotonic())):
+            try:
+                self.refresh()
+            except Exception as e:
+                # Keep serving the last good exposition
+                self.errors += 1
+                self.last_error = str(e)
+            next_tick += self.interval
+            if next_tick < time.monotonic():
+                next_tick = time.monotonic() + self.interval
+
+    def start(self):
+        """Collect once in the foreground, then keep refreshing in the background"""
+        self.refresh()
+        self._thread = threading.Thread(target=self._run, name='lpm-metrics', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+class MetricsServer:
+    """GET-only HTTP/1.1 server (keep-alive, gzip) writing out the cached exposition"""
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection == 'keep-alive' or (version == 'HTTP/1.1' and connection != 'close')
+                path = target.split('?', 1)[0]
+                if method not in ('GET', 'HEAD'):
+                    self._respond(writer, 405, b'method not allowed\n', keep_alive=keep_alive)
+                elif path == '/metrics':
+                    body, zipped = self.cache.payload
+                    if 'gzip' in headers.get('accept-encoding', ''):
+                        self._respond(writer, 200, zipped, CONTENT_TYPE, keep_alive, 'gzip', method == 'HEAD')
+                    else:
+                        self._respond(writer, 200, body, CONTENT_TYPE, keep_alive, head=method == 'HEAD')
+                elif path == '/':
+                    self._respond(writer, 200, b'LPM exporter: metrics at /metrics\n', keep_alive=keep_alive)
+                else:
+                    self._respond(writer, 404, b'not found\n', keep_alive=keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def _respond(self, writer, status, body, content_type='text/plain; charset=utf-8', keep_alive=True,
+                 encoding=None, head=False):
+        reason = {200: 'OK', 404: 'Not Found', 405: 'Method Not Allowed'}.get(status, 'OK')
+        head_lines = (f"HTTP/1.1 {status} {reason}\r\nContent-Type: {content_type}\r\n"
+                      f"Content-Length: {len(body)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n")
+        if encoding:
+            head_lines += f"Content-Encoding: {encoding}\r\nVary: Accept-Encoding\r\n"
+        writer.write(head_lines.encode('latin-1') + b'\r\n' + (b'' if head else body))
+
+
+async def serve(host, port, cache, ready=None):
+    """Serve the cache until cancelled; `ready` (threading.Event) is set once listening."""
+    app = MetricsServer(cache)
+    server = await asyncio.start_server(app.handle, host, port, backlog=1024)
+    if ready is not None:
+        ready.set()
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    """Entry point for `LPM.py metrics`; returns the process exit code"""
+    parser = argparse.ArgumentParser(prog='LPM.py metrics', description='Serve LPM metrics in OpenMetrics format')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (0.0.0.0 for remote scrapers)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"Port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL,
+                        help=f"Seconds between background collections (default: {DEFAULT_INTERVAL:g})")
+    parser.add_argument('--ping-targets', help='Comma-separated host:port targets for the ping metrics')
+    parser.add_argument('--ping-count', type=int, help='Probes sent to each ping target per collection')
+    args = parser.parse_args(argv)
+
+    targets = [t.strip() for t in args.ping_targets.split(',') if t.strip()] if args.ping_targets else None
+    cache = MetricsCache(max(1.0, args.interval), targets, args.ping_count)
+    print('Collecting initial metrics...')
+    try:
+        cache.start()
+    except Exception as e:
+        print(f"metrics: initial collection failed: {e}", file=sys.stderr)
+        return 1
+    print(f"LPM exporter serving http://{args.host}:{args.port}/metrics (refresh every {cache.interval:g}s)")
+    try:
+        asyncio.run(serve(args.host, args.port, cache))
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"metrics: {e}", file=sys.stderr)
+        return 1
+    finally:
+        cache.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
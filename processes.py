@@ -0,0 +1,168 @@
+"""Per-process resource leaderboard for LPM.
+
+ProcessTable keeps one entry per live process between refreshes. Every
+refresh reads only CPU times (on Linux straight from /proc/<pid>/stat, which
+also carries RSS, skipping psutil's per-call overhead); RSS, I/O bytes and open
+handles change more slowly and are read on a longer detail interval. Rates are
+derived from the previous values, names are read once per process, counters a
+process denied once are not asked for again, and top-N lists come from a
+bounded heap rather than a full sort.
+"""
+import heapq
+import os
+import sys
+import time
+
+import psutil
+
+DEFAULT_TOP = 10
+# Seconds between reads of RSS, I/O counters and handle counts
+DETAIL_INTERVAL = 5.0
+# Leaderboard keys -> ProcessEntry attribute
+RANKINGS = {
+    'cpu': 'cpu_pct',
+    'rss': 'rss_bytes',
+    'io': 'io_bps',
+    'handles': 'handles',
+}
+
+
+class ProcessEntry:
+    __slots__ = ('proc', 'pid', 'name', 'cpu_total', 'cpu_time', 'cpu_pct', 'rss_bytes',
+                 'io_total', 'io_time', 'io_bps', 'handles', 'io_ok', 'handles_ok')
+
+    def __init__(self, proc, name):
+        self.proc = proc
+        self.pid = proc.pid
+        self.name = name
+        self.cpu_total = None
+        self.cpu_time = None
+        self.cpu_pct = None
+        self.rss_bytes = None
+        self.io_total = None
+        self.io_time = None
+        self.io_bps = None
+        self.handles = None
+        self.io_ok = True
+        self.handles_ok = True
+
+
+if sys.platform.startswith('linux'):
+    CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+    PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+
+    def _read_stat(pid):
+        """Return (user + system CPU seconds, RSS bytes) from /proc/<pid>/stat"""
+        fd = os.open(f"/proc/{pid}/stat", os.O_RDONLY)
+        try:
+            data = os.read(fd, 4096)
+        finally:
+            os.close(fd)
+        # The command name is parenthesised and may contain spaces; fields resume after it
+        fields = data[data.rfind(b')') + 2:].split()
+        # fields[0] is field 3 (state): utime/stime are fields 14/15, rss is field 24
+        return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS, int(fields[21]) * PAGE_SIZE
+else:
+    _read_stat = None
+
+
+def _count_handles(proc):
+    if sys.platform == 'win32':
+        return proc.num_handles()
+    return proc.num_fds()
+
+
+class ProcessTable:
+    """Incrementally refreshed per-process CPU, RSS, I/O rate and handle counts.
+
+    CPU percent is relative to one core, as psutil reports it, so a busy
+    multi-threaded process can exceed 100. Rates need two readings: cpu_pct is
+    None until a process has been seen twice, io_bps until two detail reads.
+    """
+
+    def __init__(self, detail_interval=DETAIL_INTERVAL):
+        self.entries = {}
+        self.detail_interval = detail_interval
+        self._next_detail = 0.0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def refresh(self, detail=None):
+        """Re-read every process; `detail` forces (or skips) the RSS/I/O/handles read"""
+        now = time.monotonic()
+        if detail is None:
+            detail = now >= self._next_detail
+        if detail:
+            self._next_detail = now + self.detail_interval
+        entries = self.entries
+        seen = {}
+        # Without attrs, process_iter() only lists PIDs and reuses its cached
+        # Process objects; a reused PID comes back as a new object
+        for proc in psutil.process_iter():
+            entry = entries.get(proc.pid)
+            is_new = entry is None or entry.proc is not proc
+            try:
+                if is_new:
+                    entry = None
+                    entry = ProcessEntry(proc, proc.name())
+                if detail or is_new:
+                    with proc.oneshot():
+                        self._update_cpu(entry, now)
+                        self._update_detail(entry, now)
+                else:
+                    self._update_cpu(entry, now)
+            except (psutil.NoSuchProcess, OSError):
+                continue
+            except psutil.AccessDenied:
+                if entry is None:
+                    continue
+            seen[entry.pid] = entry
+        self.entries = seen
+
+    def _update_cpu(self, entry, now):
+        if _read_stat is not None:
+            cpu_total, entry.rss_bytes = _read_stat(entry.pid)
+        else:
+            times = entry.proc.cpu_times()
+            cpu_total = times.user + times.system
+        if entry.cpu_total is not None and now > entry.cpu_time:
+            entry.cpu_pct = max(0.0, cpu_total - entry.cpu_total) / (now - entry.cpu_time) * 100.0
+        entry.cpu_total = cpu_total
+        entry.cpu_time = now
+
+    def _update_detail(self, entry, now):
+        proc = entry.proc
+        if _read_stat is None:
+            entry.rss_bytes = proc.memory_info().rss
+        if entry.io_ok:
+            try:
+                io = proc.io_counters()
+            except (psutil.AccessDenied, AttributeError, NotImplementedError):
+                entry.io_ok = False
+            else:
+                io_total = io.read_bytes + io.write_bytes
+                if entry.io_total is not None and now > entry.io_time:
+                    entry.io_bps = max(0, io_total - entry.io_total) / (now - entry.io_time)
+                entry.io_total = io_total
+                entry.io_time = now
+        if entry.handles_ok:
+            try:
+                entry.handles = _count_handles(proc)
+            except (psutil.AccessDenied, AttributeError, NotImplementedError):
+                entry.handles_ok = False
+
+    def top(self, n=DEFAULT_TOP, by='cpu'):
+        """Return the n entries with the highest `by` value (see RANKINGS)"""
+        field = RANKINGS[by]
+        # Idle (zero) and unknown (None) values never make a leaderboard
+        candidates = [e for e in self.entries.values() if getattr(e, field)]
+        return heapq.nlargest(n, candidates, key=lambda e: getattr(e, field))
+
+    def leaderboard(self, n=DEFAULT_TOP, rankings=RANKINGS):
+        """Union of the top n by each ranking, busiest CPU first"""
+        chosen = {}
+        for by in rankings:
+            for entry in self.top(n, by):
+                chosen[entry.pid] = entry
+        return sorted(chosen.values(), key=lambda e: (e.cpu_pct or 0.0, e.rss_bytes or 0), reverse=True)
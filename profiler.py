@@ -0,0 +1,114 @@
+"""Per-stage wall time and peak memory for LPM's --profile flag.
+
+Stages can be timed as blocks (stage()), or accumulated across many small
+calls (timed(), timed_iter()) when several stages share LPM's single pass over
+the report. A disabled profiler passes everything through untouched so the
+normal run pays nothing for it.
+"""
+import sys
+import time
+from contextlib import contextmanager
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process so far, or None if unavailable"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', None) or info.rss
+    except Exception:
+        return None
+
+
+class StageProfiler:
+    """Accumulates wall time per named stage, in first-seen order."""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.stages = {}
+        self.start = time.perf_counter()
+
+    def _entry(self, name):
+        entry = self.stages.get(name)
+        if entry is None:
+            entry = self.stages[name] = {'seconds': 0.0, 'calls': 0, 'peak_rss_bytes': None}
+        return entry
+
+    def add(self, name, seconds, calls=1):
+        entry = self._entry(name)
+        entry['seconds'] += seconds
+        entry['calls'] += calls
+
+    @contextmanager
+    def stage(self, name):
+        """Time a block as one call of `name` and note the peak RSS after it"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+            self._entry(name)['peak_rss_bytes'] = peak_rss_bytes()
+
+    def timed(self, name, func):
+        """Wrap func so each call adds to stage `name`"""
+        if not self.enabled:
+            return func
+        entry = self._entry(name)
+        clock = time.perf_counter
+
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                entry['seconds'] += clock() - start
+                entry['calls'] += 1
+        return wrapper
+
+    def instrument(self, obj, name, *methods):
+        """Replace obj's bound methods with timed() wrappers charging `name`"""
+        if self.enabled:
+            for method in methods:
+                setattr(obj, method, self.timed(name, getattr(obj, method)))
+        return obj
+
+    def timed_iter(self, name, iterable):
+        """Yield from iterable, charging the time spent producing items to `name`"""
+        if not self.enabled:
+            return iterable
+        return self._timed_iter(self._entry(name), iter(iterable))
+
+    def _timed_iter(self, entry, iterator):
+        clock = time.perf_counter
+        while True:
+            start = clock()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                entry['seconds'] += clock() - start
+                return
+            entry['seconds'] += clock() - start
+            entry['calls'] += 1
+            yield item
+
+    def mark_peak(self, name):
+        """Record the current peak RSS against a stage timed with timed()/timed_iter()"""
+        if self.enabled and name in self.stages:
+            self.stages[name]['peak_rss_bytes'] = peak_rss_bytes()
+
+    def results(self):
+        """Return [{stage, seconds, calls, peak_rss_bytes}] plus a 'total' row"""
+        rows = [dict(stage=name, **entry) for name, entry in self.stages.items()]
+        rows.append({'stage': 'total', 'seconds': time.perf_counter() - self.start,
+                     'calls': 1, 'peak_rss_bytes': peak_rss_bytes()})
+        return rows
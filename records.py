@@ -0,0 +1,327 @@
+"""Typed records for LPM report sections.
+
+Each structured section (services, programs, disks, adapters, hotfixes, ping
+replies and per-target probe stats) has a parser with precompiled patterns that turns its lines into
+compact __slots__ records once, so consumers read numeric fields directly
+instead of re-running regexes over the raw strings.
+"""
+import re
+
+SIZE_RE = re.compile(r"([0-9,.]+)\s*(KB|MB|GB|TB|B)", re.I)
+SIZE_UNITS = {'B': 1, 'KB': 1024, 'MB': 1024**2, 'GB': 1024**3, 'TB': 1024**4}
+DEVICE_RE = re.compile(r"DeviceID:\s*(.+?)\s+FileSystem:\s*(\S*)")
+DISK_SIZE_RE = re.compile(r"Size:\s*([0-9.,]+\s*(?:KB|MB|GB|TB|B))", re.I)
+DISK_FREE_RE = re.compile(r"Free:\s*([0-9.,]+\s*(?:KB|MB|GB|TB|B))", re.I)
+ADAPTER_RE = re.compile(r"Name:\s*(.+?)\s+Status:\s*(.+?)\s+LinkSpeed:\s*(.*)$")
+LINK_SPEED_RE = re.compile(r"([0-9.,]+)\s*([KMGT]?)bps", re.I)
+LINK_SPEED_UNITS = {'': 1, 'K': 10**3, 'M': 10**6, 'G': 10**9, 'T': 10**12}
+HOTFIX_SPLIT_RE = re.compile(r"\s{2,}")
+PING_REPLY_RE = re.compile(r"Reply from (.+?):\s*time[=<]([0-9.]+)\s*ms", re.I)
+PING_AVG_RE = re.compile(r"Average:\s*([0-9.,]+)\s*ms", re.I)
+PING_STATS_FIELDS = ('sent', 'received', 'loss_pct', 'min_ms', 'mean_ms', 'max_ms',
+                     'p50_ms', 'p95_ms', 'p99_ms', 'jitter_ms')
+
+
+def parse_size_to_bytes(s):
+    """Parse sizes like "1.77 TB" into bytes."""
+    if not s:
+        return 0
+    m = SIZE_RE.search(s)
+    if not m:
+        return 0
+    val = float(m.group(1).replace(',', ''))
+    return int(val * SIZE_UNITS.get(m.group(2).upper(), 1))
+
+
+def parse_link_speed(s):
+    """Parse link speeds like "1 Gbps" into bits per second, or None."""
+    m = LINK_SPEED_RE.search(s or '')
+    if not m:
+        return None
+    return int(float(m.group(1).replace(',', '')) * LINK_SPEED_UNITS[m.group(2).upper()])
+
+
+class Record:
+    """Base for section records; subclasses list their fields in __slots__."""
+
+    __slots__ = ()
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def astuple(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.astuple() == other.astuple()
+
+    def __hash__(self):
+        return hash(self.astuple())
+
+    def __repr__(self):
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class Service(Record):
+    __slots__ = ('name', 'display_name', 'state', 'start_mode')
+
+
+class Program(Record):
+    __slots__ = ('name', 'version', 'publisher')
+
+
+class Disk(Record):
+    __slots__ = ('device_id', 'filesystem', 'size_bytes', 'free_bytes')
+
+    @property
+    def used_bytes(self):
+        return max(0, self.size_bytes - self.free_bytes)
+
+
+class Adapter(Record):
+    __slots__ = ('name', 'status', 'link_speed_bps')
+
+
+class Hotfix(Record):
+    __slots__ = ('hotfix_id', 'installed_on', 'description')
+
+
+class PingReply(Record):
+    # is_average marks the "Average: Nms" line info.ps1 writes after the replies
+    __slots__ = ('address', 'time_ms', 'is_average')
+
+
+class PingStats(Record):
+    # One per probed target; latency fields are None when nothing came back
+    __slots__ = ('target',) + PING_STATS_FIELDS
+
+
+class ProcessStat(Record):
+    # io_bps and handles are None when the process would not report them
+    __slots__ = ('name', 'pid', 'cpu_pct', 'rss_bytes', 'io_bps', 'handles')
+
+
+class SectionParser:
+    """Turns one section's lines into records; feed() returns a record or None."""
+
+    def feed(self, line):
+        raise NotImplementedError
+
+    def finish(self):
+        """Return a record still pending at the end of the section, or None."""
+        return None
+
+
+class ServiceParser(SectionParser):
+    # "Name | DisplayName | State | StartMode"; display names may contain " | "
+    def feed(self, line):
+        parts = line.split(' | ')
+        if len(parts) < 4:
+            return None
+        return Service(parts[0], ' | '.join(parts[1:-2]), parts[-2], parts[-1])
+
+
+class ProgramParser(SectionParser):
+    # "Name | Version | Publisher" followed by a "[Collected N programs]" footer
+    def feed(self, line):
+        parts = line.split(' | ')
+        if len(parts) < 3:
+            return None
+        return Program(' | '.join(parts[:-2]), parts[-2], parts[-1])
+
+
+class DiskParser(SectionParser):
+    # "DeviceID: C:  FileSystem: NTFS" then "Size: 1.77 TB  Free: 400 GB"
+    def __init__(self):
+        self.pending = None
+
+    def feed(self, line):
+        done = None
+        m = DEVICE_RE.search(line)
+        if m:
+            done = self.finish()
+            self.pending = Disk(m.group(1), m.group(2), 0, 0)
+        if 'Size:' in line and 'Free:' in line:
+            disk = self.pending or Disk(None, None, 0, 0)
+            msize = DISK_SIZE_RE.search(line)
+            mfree = DISK_FREE_RE.search(line)
+            disk.size_bytes = parse_size_to_bytes(msize.group(1)) if msize else 0
+            disk.free_bytes = parse_size_to_bytes(mfree.group(1)) if mfree else 0
+            self.pending = None
+            return disk
+        return done
+
+    def finish(self):
+        disk, self.pending = self.pending, None
+        return disk
+
+
+class AdapterParser(SectionParser):
+    # "Name: Ethernet  Status: Up  LinkSpeed: 1 Gbps"
+    def feed(self, line):
+        m = ADAPTER_RE.search(line)
+        if not m:
+            return None
+        return Adapter(m.group(1), m.group(2), parse_link_speed(m.group(3)))
+
+
+class HotfixParser(SectionParser):
+    # "KB5034441  1/10/2024 12:00:00 AM  Security Update"; InstalledOn may be blank
+    def feed(self, line):
+        parts = HOTFIX_SPLIT_RE.split(line.strip(), 2)
+        if not parts[0]:
+            return None
+        if len(parts) == 2:
+            parts = [parts[0], '', parts[1]]
+        parts += [''] * (3 - len(parts))
+        return Hotfix(*parts)
+
+
+class PingParser(SectionParser):
+    # "Reply from 8.8.8.8: time=16ms" lines, then "Average: 16.25ms". The native
+    # collector adds "Target 8.8.8.8:53 | Sent 10 | Received 10 | Loss 0.0% | Min
+    # 11.2ms | Mean | Max | p50 | p95 | p99 | Jitter 0.5ms" lines, "-" when unknown.
+    def feed(self, line):
+        m = PING_REPLY_RE.search(line)
+        if m:
+            return PingReply(m.group(1), float(m.group(2)), False)
+        if line.startswith('Target '):
+            return self._stats(line)
+        m = PING_AVG_RE.search(line)
+        if m:
+            return PingReply(None, float(m.group(1).replace(',', '')), True)
+        return None
+
+    def _stats(self, line):
+        parts = line.split(' | ')
+        if len(parts) != len(PING_STATS_FIELDS) + 1:
+            return None
+        values = []
+        try:
+            for part in parts[1:]:
+                value = part.split(' ', 1)[-1].rstrip('%').replace('ms', '')
+                values.append(float(value) if value != '-' else None)
+        except ValueError:
+            return None
+        values[0] = int(values[0])
+        values[1] = int(values[1])
+        return PingStats(parts[0][len('Target '):], *values)
+
+
+class ProcessParser(SectionParser):
+    # "Name | PID | CPU 12.5% | RSS 512.00 MB | IO 1.20 MB/s | Handles 230", "-" when unknown
+    def feed(self, line):
+        parts = line.split(' | ')
+        if len(parts) < 6:
+            return None
+        name = ' | '.join(parts[:-5])
+        pid, cpu, rss, io, handles = (p.split(' ', 1)[-1] for p in parts[-5:])
+        try:
+            return ProcessStat(
+                name,
+                int(pid),
+                float(cpu.rstrip('%')) if cpu != '-' else None,
+                parse_size_to_bytes(rss) if rss != '-' else None,
+                parse_size_to_bytes(io) if io != '-' else None,
+                int(handles) if handles != '-' else None,
+            )
+        except ValueError:
+            return None
+
+
+# Section title (or title prefix, e.g. "Installed Hotfixes (recent)") -> parser
+RECORD_PARSERS = {
+    'Services': ServiceParser,
+    'Installed Programs': ProgramParser,
+    'Disks (Logical)': DiskParser,
+    'Network Adapters': AdapterParser,
+    'Installed Hotfixes': HotfixParser,
+    'Ping Test': PingParser,
+    'Top Processes': ProcessParser,
+}
+
+
+def parser_for(section):
+    """Return a new parser for a section title, or None if it has no records."""
+    cls = RECORD_PARSERS.get(section)
+    if cls is None:
+        for prefix, candidate in RECORD_PARSERS.items():
+            if section.startswith(prefix):
+                cls = candidate
+                break
+    return cls() if cls else None
+
+
+def parse_records(section, lines):
+    """Parse a section's lines into a list of records."""
+    parser = parser_for(section)
+    if parser is None:
+        return []
+    records = []
+    for line in lines:
+        rec = parser.feed(line)
+        if rec is not None:
+            records.append(rec)
+    rec = parser.finish()
+    if rec is not None:
+        records.append(rec)
+    return records
+
+
+class RecordStream:
+    """Parse records out of (section, line) events, calling callback(section, record).
+
+    Only sections with a registered parser (optionally limited to `sections`)
+    are parsed; everything else is skipped without any regex work.
+    """
+
+    def __init__(self, callback, sections=None):
+        self.callback = callback
+        self.sections = set(sections) if sections else None
+        self.section = None
+        self.parser = None
+
+    def _flush(self):
+        if self.parser is not None:
+            rec = self.parser.finish()
+            if rec is not None:
+                self.callback(self.section, rec)
+        self.parser = None
+
+    def feed(self, section, line):
+        if line is None:
+            self._flush()
+            self.section = section
+            if self.sections is None or section in self.sections:
+                self.parser = parser_for(section)
+            return
+        if self.parser is not None:
+            rec = self.parser.feed(line)
+            if rec is not None:
+                self.callback(section, rec)
+
+    def finish(self):
+        self._flush()
+
+
+class RecordCollector:
+    """Collect {section: [records]} from (section, line) events."""
+
+    def __init__(self, sections=None):
+        self.records = {}
+        self.stream = RecordStream(self._add, sections)
+
+    def _add(self, section, record):
+        self.records.setdefault(section, []).append(record)
+
+    def feed(self, section, line):
+        self.stream.feed(section, line)
+
+    def result(self):
+        self.stream.finish()
+        return self.records
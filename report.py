@@ -0,0 +1,232 @@
+"""Streaming parser and summary for LPM reports.
+
+Reports are handled as a stream of (section, line) events so the console
+printer, the summary and every exporter can share a single pass over the data
+without holding the whole report in memory. A line of None marks the start of
+a section, so empty sections still reach consumers.
+"""
+import hashlib
+import io
+import json
+import time
+
+from records import RecordStream, Disk, PingReply, PingStats
+
+END_OF_REPORT = 'End of Report'
+# Written by `python collector.py` for remote collection; carries the host's own
+# memory figures, which the summary otherwise reads from the local machine
+MEMORY_SECTION = 'Memory'
+
+
+def should_include_section(section_name, filter_list):
+    """Check if section should be included based on filter."""
+    if not filter_list:
+        return True
+    return any(f.strip().lower() in section_name.lower() for f in filter_list)
+
+
+def _follow_lines(f, done=None, deadline=None, poll_interval=0.2):
+    """Yield complete lines from f, waiting for more while a writer is active.
+
+    Stops at EOF once `done()` is true or `deadline` (time.monotonic()) passes.
+    A trailing line without a newline is only emitted when the stream ends.
+    """
+    pending = ''
+    while True:
+        chunk = f.readline()
+        if chunk:
+            pending += chunk
+            if pending.endswith('\n'):
+                yield pending
+                pending = ''
+            continue
+        if (done is not None and done()) or (deadline is not None and time.monotonic() >= deadline):
+            # Pick up anything written between the last read and the done signal
+            pending += f.read()
+            for line in pending.splitlines(True):
+                yield line
+            return
+        time.sleep(poll_interval)
+
+
+def iter_info(f, follow=False, done=None, timeout=None, poll_interval=0.2):
+    """Yield (section, line) events from an info.txt stream.
+
+    With follow=True the file may still be being written: reading continues
+    until the "End of Report" marker, `done()` returning true, or `timeout`
+    seconds elapsing.
+    """
+    if follow:
+        deadline = time.monotonic() + timeout if timeout else None
+        lines = _follow_lines(f, done=done, deadline=deadline, poll_interval=poll_interval)
+    else:
+        lines = f
+    current = None
+    for raw_line in lines:
+        if current is None:
+            current = 'General'
+            yield current, None
+        line = raw_line.strip()
+        # Remove leftover literal backslash-n markers if present
+        if line.startswith('\\n'):
+            line = line[2:].strip()
+        if line.startswith('===') and line.endswith('==='):
+            current = line.strip('= ').strip()
+            yield current, None
+            if follow and current == END_OF_REPORT:
+                return
+            continue
+        if line == '':
+            continue
+        yield current, line
+
+
+def iter_sections(sections):
+    """Yield (section, line) events from an already collected sections dict."""
+    for sec, lines in sections.items():
+        yield sec, None
+        for ln in lines:
+            yield sec, ln
+
+
+def format_info(sections):
+    """Yield info.txt lines for a sections dict, laid out the way info.ps1 writes them."""
+    for sec, lines in sections.items():
+        # info.ps1 writes the General lines before any section header
+        if sec != 'General':
+            yield ''
+            yield f"=== {sec} ==="
+        for ln in lines:
+            yield ln
+
+
+def open_info_file(path='info.txt', wait_seconds=0, poll_interval=0.5):
+    """Open path for streaming once it exists, waiting up to wait_seconds; None if it never appears."""
+    deadline = time.monotonic() + wait_seconds
+    while True:
+        try:
+            return open(path, 'r', encoding='utf-8', errors='ignore')
+        except FileNotFoundError:
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(poll_interval)
+
+
+def parse_info(text):
+    """Parse info.txt text into {section: [lines]}."""
+    sections = {}
+    if not text:
+        return sections
+    for sec, line in iter_info(io.StringIO(text)):
+        if line is None:
+            sections[sec] = []
+        else:
+            sections.setdefault(sec, []).append(line)
+    return sections
+
+
+def section_hash(lines):
+    """Content hash of a section's lines, shared by delta uploads and the fleet server."""
+    data = json.dumps(lines, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+
+class SummaryBuilder:
+    """Accumulate the numeric summary incrementally from (section, line) events."""
+
+    SECTIONS = ('Disks (Logical)', 'Ping Test')
+
+    def __init__(self, live_memory=True):
+        # live_memory=False takes memory from the report's Memory section instead
+        # of this machine, for reports collected on another host
+        self.live_memory = live_memory
+        self.memory = {}
+        self.disk_total = 0
+        self.disk_free = 0
+        self.ping_times = []
+        self.ping_average = None
+        self.ping_last = {}
+        self.ping_deltas = []
+        self.ping_sent = 0
+        self.ping_received = 0
+        self._records = RecordStream(self.add_record, self.SECTIONS)
+
+    def feed(self, section, line):
+        self._records.feed(section, line)
+        if section == MEMORY_SECTION and line and not self.live_memory:
+            key, _, value = line.partition(':')
+            try:
+                self.memory[key.strip()] = int(value)
+            except ValueError:
+                pass
+
+    def add_record(self, section, record):
+        if isinstance(record, Disk):
+            self.disk_total += record.size_bytes
+            self.disk_free += record.free_bytes
+        elif isinstance(record, PingReply):
+            if record.is_average:
+                self.ping_average = record.time_ms
+                return
+            self.ping_times.append(record.time_ms)
+            # Jitter compares consecutive replies from the same target
+            last = self.ping_last.get(record.address)
+            if last is not None:
+                self.ping_deltas.append(abs(record.time_ms - last))
+            self.ping_last[record.address] = record.time_ms
+        elif isinstance(record, PingStats):
+            self.ping_sent += record.sent
+            self.ping_received += record.received
+
+    def _ping_summary(self):
+        times = sorted(self.ping_times)
+        ping = {
+            # Without reply lines only the report's own Average line is left
+            'ping_avg_ms': sum(times) / len(times) if times else self.ping_average,
+            'ping_p50_ms': None,
+            'ping_p95_ms': None,
+            'ping_p99_ms': None,
+            'ping_jitter_ms': sum(self.ping_deltas) / len(self.ping_deltas) if self.ping_deltas else None,
+            # Loss needs the per-target stats lines; info.ps1 reports only replies
+            'ping_loss_pct': (self.ping_sent - self.ping_received) / self.ping_sent * 100 if self.ping_sent else None,
+        }
+        if times:
+            from monitor import percentile
+            for pct in (50, 95, 99):
+                ping[f"ping_p{pct}_ms"] = percentile(times, pct)
+        return ping
+
+    def result(self):
+        """Return the summary dict, adding live memory figures from psutil."""
+        self._records.finish()
+        summary = {
+            'disk_total_bytes': self.disk_total,
+            'disk_free_bytes': self.disk_free,
+            'disk_used_bytes': max(0, self.disk_total - self.disk_free),
+        }
+        summary.update(self._ping_summary())
+        if not self.live_memory:
+            total, available = self.memory.get('TotalBytes'), self.memory.get('AvailableBytes')
+            summary['mem_total_bytes'] = total
+            summary['mem_available_bytes'] = available
+            summary['mem_used_bytes'] = total - available if total is not None and available is not None else None
+            return summary
+        # Memory via psutil for accurate values
+        try:
+            import psutil
+            vm = psutil.virtual_memory()
+            summary['mem_total_bytes'] = vm.total
+            summary['mem_available_bytes'] = vm.available
+            summary['mem_used_bytes'] = vm.total - vm.available
+        except Exception:
+            summary['mem_total_bytes'] = None
+        return summary
+
+
+def summarize(sections, live_memory=True):
+    """Return the summary dict for a sections dict (see SummaryBuilder for live_memory)."""
+    builder = SummaryBuilder(live_memory)
+    for sec, line in iter_sections(sections):
+        builder.feed(sec, line)
+    return builder.result()
+
@@ -0,0 +1,554 @@
+"""Fleet ingestion server for LPM --upload reports.
+
+Accepts the {'sections', 'summary'} JSON body LPM POSTs (or a delta report
+listing 'unchanged' section hashes, see uploader.py), stores reports in a
+local SQLite database (WAL mode) with group-committed batch writes, and answers
+fleet-wide queries over HTTP.
+
+    python server.py --port 8765 --db fleet.db
+    python LPM.py --upload http://127.0.0.1:8765/report
+
+Queries (GET, JSON responses):
+    /health
+    /hosts?disk_used_pct_gt=90&mem_used_pct_gt=80&ping_avg_ms_gt=50
+    /hosts/missing-hotfix?id=KB5034441
+    /hosts/service?name=Spooler&state=Stopped
+    /hosts/program?name=7-Zip
+    /reports?host=NAME&limit=20
+"""
+import argparse
+import asyncio
+import base64
+import concurrent.futures
+import json
+import queue
+import sqlite3
+import threading
+import time
+import urllib.parse
+import zlib
+
+from records import parse_records, Service, Program, Hotfix
+from report import section_hash
+
+MAX_BODY_BYTES = 16 * 1024 * 1024
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_LINGER_MS = 5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY,
+    host TEXT NOT NULL,
+    received_at REAL NOT NULL,
+    disk_total_bytes INTEGER,
+    disk_used_bytes INTEGER,
+    mem_total_bytes INTEGER,
+    mem_used_bytes INTEGER,
+    ping_avg_ms REAL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reports_host_time ON reports (host, received_at);
+
+CREATE TABLE IF NOT EXISTS hosts (
+    host TEXT PRIMARY KEY,
+    last_seen REAL NOT NULL,
+    last_report_id INTEGER,
+    report_count INTEGER NOT NULL DEFAULT 0,
+    disk_total_bytes INTEGER,
+    disk_used_bytes INTEGER,
+    disk_used_pct REAL,
+    mem_total_bytes INTEGER,
+    mem_used_bytes INTEGER,
+    mem_used_pct REAL,
+    ping_avg_ms REAL
+);
+CREATE INDEX IF NOT EXISTS hosts_disk_pct ON hosts (disk_used_pct);
+CREATE INDEX IF NOT EXISTS hosts_mem_pct ON hosts (mem_used_pct);
+
+CREATE TABLE IF NOT EXISTS host_sections (
+    host TEXT NOT NULL,
+    section TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    lines TEXT NOT NULL,
+    hash TEXT,
+    PRIMARY KEY (host, section)
+);
+
+CREATE TABLE IF NOT EXISTS hotfixes (
+    host TEXT NOT NULL,
+    hotfix_id TEXT NOT NULL,
+    installed_on TEXT,
+    description TEXT,
+    PRIMARY KEY (host, hotfix_id)
+);
+CREATE INDEX IF NOT EXISTS hotfixes_id ON hotfixes (hotfix_id);
+
+CREATE TABLE IF NOT EXISTS services (
+    host TEXT NOT NULL,
+    name TEXT NOT NULL,
+    display_name TEXT,
+    state TEXT,
+    start_mode TEXT,
+    PRIMARY KEY (host, name)
+);
+CREATE INDEX IF NOT EXISTS services_name_state ON services (name, state);
+
+CREATE TABLE IF NOT EXISTS programs (
+    host TEXT NOT NULL,
+    name TEXT NOT NULL,
+    publisher TEXT NOT NULL,
+    version TEXT,
+    PRIMARY KEY (host, name, publisher)
+);
+CREATE INDEX IF NOT EXISTS programs_name ON programs (name);
+"""
+
+# Sections whose typed records are indexed for fleet queries: (section prefix, table)
+INDEXED_SECTIONS = (
+    ('Installed Hotfixes', 'hotfixes'),
+    ('Services', 'services'),
+    ('Installed Programs', 'programs'),
+)
+
+
+def report_error(payload):
+    """Why a report body cannot be stored, or None if its shape is valid"""
+    if not isinstance(payload, dict):
+        return "expected {'sections': {...}, 'summary': {...}}"
+    sections = payload.get('sections', {})
+    if not isinstance(sections, dict):
+        return "'sections' must be an object"
+    for section, lines in sections.items():
+        if not isinstance(lines, list) or not all(isinstance(line, str) for line in lines):
+            return f"section {section!r} must be a list of strings"
+    for key in ('summary', 'unchanged'):
+        if payload.get(key) is not None and not isinstance(payload[key], dict):
+            return f"'{key}' must be an object"
+    return None
+
+
+def gunzip(body, limit=MAX_BODY_BYTES):
+    """Decompress a gzip body, or None when it inflates past `limit` bytes.
+
+    Output is capped while inflating, so a small body that expands to
+    gigabytes is refused before it is held in memory.
+    """
+    inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    data = inflater.decompress(body, limit + 1)
+    if len(data) > limit or inflater.unconsumed_tail:
+        return None
+    if not inflater.eof:
+        raise ValueError('truncated gzip stream')
+    return data
+
+
+def _pct(part, total):
+    return (part / total * 100.0) if part is not None and total else None
+
+
+class FleetStore:
+    """SQLite-backed store of host reports with latest-state tables for queries."""
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = self._connect()
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+        self._read_local = threading.local()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _migrate(self):
+        columns = [row[1] for row in self.conn.execute('PRAGMA table_info(host_sections)')]
+        if 'hash' not in columns:
+            self.conn.execute('ALTER TABLE host_sections ADD COLUMN hash TEXT')
+
+    def _reader(self):
+        # WAL lets each reader thread use its own connection alongside the writer
+        conn = getattr(self._read_local, 'conn', None)
+        if conn is None:
+            conn = self._read_local.conn = self._connect()
+            conn.row_factory = sqlite3.Row
+        return conn
+
+    def write_batch(self, reports):
+        """Store [(host, received_at, payload_dict)] in one transaction; returns report ids.
+
+        A delta report whose 'unchanged' hashes do not match the stored sections
+        is not stored; its id is None and the client must resend in full. Each
+        report is written under its own savepoint, so one that fails is rolled
+        back alone and its place in the result holds the exception instead.
+        """
+        ids = []
+        cur = self.conn.cursor()
+        cur.execute('BEGIN')
+        try:
+            for host, received_at, payload in reports:
+                cur.execute('SAVEPOINT report')
+                try:
+                    ids.append(self._write_report(cur, host, received_at, payload))
+                except Exception as e:
+                    cur.execute('ROLLBACK TO report')
+                    ids.append(e)
+                cur.execute('RELEASE report')
+            cur.execute('COMMIT')
+        except Exception:
+            cur.execute('ROLLBACK')
+            raise
+        return ids
+
+    def _write_report(self, cur, host, received_at, payload):
+        summary = payload.get('summary') or {}
+        sections = payload.get('sections') or {}
+        unchanged = payload.get('unchanged')
+        if unchanged:
+            stored = dict(cur.execute('SELECT section, hash FROM host_sections WHERE host = ?', (host,)).fetchall())
+            if any(stored.get(sec) != h for sec, h in unchanged.items()):
+                return None
+        disk_total = summary.get('disk_total_bytes')
+        disk_used = summary.get('disk_used_bytes')
+        mem_total = summary.get('mem_total_bytes')
+        mem_used = summary.get('mem_used_bytes')
+        ping = summary.get('ping_avg_ms')
+        cur.execute(
+            'INSERT INTO reports (host, received_at, disk_total_bytes, disk_used_bytes, mem_total_bytes, '
+            'mem_used_bytes, ping_avg_ms, payload) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (host, received_at, disk_total, disk_used, mem_total, mem_used, ping,
+             json.dumps(payload, ensure_ascii=False, separators=(',', ':'))))
+        report_id = cur.lastrowid
+        # UPDATE-then-INSERT rather than ON CONFLICT, which older bundled SQLite lacks
+        host_row = (received_at, report_id, disk_total, disk_used, _pct(disk_used, disk_total),
+                    mem_total, mem_used, _pct(mem_used, mem_total), ping, host)
+        cur.execute(
+            'UPDATE hosts SET last_seen = ?, last_report_id = ?, report_count = report_count + 1, '
+            'disk_total_bytes = ?, disk_used_bytes = ?, disk_used_pct = ?, mem_total_bytes = ?, '
+            'mem_used_bytes = ?, mem_used_pct = ?, ping_avg_ms = ? WHERE host = ?', host_row)
+        if cur.rowcount == 0:
+            cur.execute(
+                'INSERT INTO hosts (last_seen, last_report_id, report_count, disk_total_bytes, disk_used_bytes, '
+                'disk_used_pct, mem_total_bytes, mem_used_bytes, mem_used_pct, ping_avg_ms, host) '
+                'VALUES (?, ?, 1, ?, ?, ?, ?, ?, ?, ?, ?)', host_row)
+
+        # Latest state per section; sections missing from a (filtered) report keep their old state
+        for section, lines in sections.items():
+            cur.execute(
+                'INSERT OR REPLACE INTO host_sections (host, section, updated_at, lines, hash) VALUES (?, ?, ?, ?, ?)',
+                (host, section, received_at, json.dumps(lines, ensure_ascii=False), section_hash(lines)))
+            for prefix, table in INDEXED_SECTIONS:
+                if section.startswith(prefix):
+                    self._replace_records(cur, table, host, parse_records(section, lines))
+        return report_id
+
+    def _replace_records(self, cur, table, host, records):
+        cur.execute(f'DELETE FROM {table} WHERE host = ?', (host,))
+        if table == 'hotfixes':
+            rows = [(host, r.hotfix_id, r.installed_on, r.description) for r in records if isinstance(r, Hotfix)]
+            cur.executemany('INSERT OR REPLACE INTO hotfixes VALUES (?, ?, ?, ?)', rows)
+        elif table == 'services':
+            rows = [(host, r.name, r.display_name, r.state, r.start_mode) for r in records if isinstance(r, Service)]
+            cur.executemany('INSERT OR REPLACE INTO services VALUES (?, ?, ?, ?, ?)', rows)
+        elif table == 'programs':
+            rows = [(host, r.name, r.publisher, r.version) for r in records if isinstance(r, Program)]
+            cur.executemany('INSERT OR REPLACE INTO programs VALUES (?, ?, ?, ?)', rows)
+
+    def _query(self, sql, params=()):
+        return [dict(row) for row in self._reader().execute(sql, params)]
+
+    def hosts(self, disk_used_pct_gt=None, mem_used_pct_gt=None, ping_avg_ms_gt=None):
+        """Return hosts' latest metrics, optionally filtered by thresholds."""
+        clauses, params = [], []
+        for column, value in (('disk_used_pct', disk_used_pct_gt), ('mem_used_pct', mem_used_pct_gt),
+                              ('ping_avg_ms', ping_avg_ms_gt)):
+            if value is not None:
+                clauses.append(f'{column} > ?')
+                params.append(float(value))
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+        return self._query(
+            'SELECT host, last_seen, report_count, disk_total_bytes, disk_used_bytes, disk_used_pct, '
+            f'mem_total_bytes, mem_used_bytes, mem_used_pct, ping_avg_ms FROM hosts{where} ORDER BY host', params)
+
+    def hosts_missing_hotfix(self, hotfix_id):
+        """Return hosts that reported a hotfix section without hotfix_id."""
+        return self._query(
+            "SELECT DISTINCT hs.host FROM host_sections hs WHERE hs.section LIKE 'Installed Hotfixes%' "
+            'AND NOT EXISTS (SELECT 1 FROM hotfixes h WHERE h.host = hs.host AND h.hotfix_id = ?) ORDER BY hs.host',
+            (hotfix_id,))
+
+    def hosts_with_service(self, name, state=None):
+        """Return hosts having service `name`, optionally only in `state`."""
+        if state:
+            return self._query('SELECT host, name, state, start_mode FROM services WHERE name = ? AND state = ? '
+                               'ORDER BY host', (name, state))
+        return self._query('SELECT host, name, state, start_mode FROM services WHERE name = ? ORDER BY host', (name,))
+
+    def hosts_with_program(self, name):
+        """Return hosts with an installed program called `name`."""
+        return self._query('SELECT host, name, version, publisher FROM programs WHERE name = ? ORDER BY host', (name,))
+
+    def reports(self, host, limit=20):
+        """Return the newest summary rows for a host."""
+        return self._query(
+            'SELECT id, received_at, disk_total_bytes, disk_used_bytes, mem_total_bytes, mem_used_bytes, ping_avg_ms '
+            'FROM reports WHERE host = ? ORDER BY received_at DESC LIMIT ?', (host, int(limit)))
+
+    def close(self):
+        self.conn.close()
+
+
+class BatchWriter:
+    """Single writer thread that group-commits queued reports.
+
+    submit() returns a concurrent.futures.Future resolved with the report id
+    once its batch is committed, so a request is only acknowledged when durable.
+    """
+
+    def __init__(self, store, batch_size=DEFAULT_BATCH_SIZE, linger_ms=DEFAULT_LINGER_MS):
+        self.store = store
+        self.batch_size = batch_size
+        self.linger = linger_ms / 1000.0
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name='lpm-fleet-writer', daemon=True)
+        self.thread.start()
+
+    def submit(self, host, received_at, payload):
+        future = concurrent.futures.Future()
+        self.queue.put((host, received_at, payload, future))
+        return future
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.linger
+            while len(batch) < self.batch_size:
+                try:
+                    item = self.queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    self.queue.put(None)
+                    break
+                batch.append(item)
+            try:
+                ids = self.store.write_batch([(h, t, p) for h, t, p, _f in batch])
+                for (_h, _t, _p, future), report_id in zip(batch, ids):
+                    if isinstance(report_id, Exception):
+                        future.set_exception(report_id)
+                    else:
+                        future.set_result(report_id)
+            except Exception as e:
+                for *_rest, future in batch:
+                    future.set_exception(e)
+
+    def stop(self):
+        self.queue.put(None)
+        self.thread.join()
+
+
+class FleetServer:
+    """Minimal HTTP/1.1 server (keep-alive, optional gzip bodies) on asyncio streams."""
+
+    def __init__(self, store, writer, token=None, basic=None):
+        self.store = store
+        self.writer = writer
+        self.token = token
+        self.basic = basic
+
+    def _authorized(self, headers):
+        if not self.token and not self.basic:
+            return True
+        auth = headers.get('authorization', '')
+        if self.token and auth == f"Bearer {self.token}":
+            return True
+        if self.basic and auth == 'Basic ' + base64.b64encode(self.basic.encode('utf-8')).decode('ascii'):
+            return True
+        return False
+
+    async def handle(self, reader, writer):
+        peer = writer.get_extra_info('peername')
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+                length = int(headers.get('content-length') or 0)
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {'error': 'body too large'}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                try:
+                    status, result = await self.dispatch(method, target, headers, body, peer)
+                except Exception as e:
+                    status, result = 500, {'error': f"internal error: {e}"}
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection == 'keep-alive' or (version == 'HTTP/1.1' and connection != 'close')
+                await self._respond(writer, status, result, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, result, keep_alive):
+        body = json.dumps(result, default=str).encode('utf-8')
+        reason = {200: 'OK', 400: 'Bad Request', 401: 'Unauthorized', 404: 'Not Found',
+                  405: 'Method Not Allowed', 409: 'Conflict', 413: 'Payload Too Large', 500: 'Internal Server Error'}.get(status, 'OK')
+        head = (f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+    async def dispatch(self, method, target, headers, body, peer):
+        if not self._authorized(headers):
+            return 401, {'error': 'unauthorized'}
+        url = urllib.parse.urlsplit(target)
+        params = dict(urllib.parse.parse_qsl(url.query))
+        if method == 'POST':
+            return await self.ingest(url, params, headers, body, peer)
+        if method != 'GET':
+            return 405, {'error': 'method not allowed'}
+        loop = asyncio.get_running_loop()
+        try:
+            query = self._route(url.path, params)
+        except (KeyError, ValueError) as e:
+            return 400, {'error': f"bad query: {e}"}
+        if query is None:
+            return 404, {'error': 'not found'}
+        return 200, await loop.run_in_executor(None, query)
+
+    def _route(self, path, params):
+        store = self.store
+        if path == '/health':
+            return lambda: {'status': 'ok', 'queued': self.writer.queue.qsize()}
+        if path == '/hosts':
+            thresholds = {k: float(params[k]) for k in ('disk_used_pct_gt', 'mem_used_pct_gt', 'ping_avg_ms_gt')
+                          if k in params}
+            return lambda: store.hosts(**thresholds)
+        if path == '/hosts/missing-hotfix':
+            hotfix_id = params['id']
+            return lambda: store.hosts_missing_hotfix(hotfix_id)
+        if path == '/hosts/service':
+            name, state = params['name'], params.get('state')
+            return lambda: store.hosts_with_service(name, state)
+        if path == '/hosts/program':
+            name = params['name']
+            return lambda: store.hosts_with_program(name)
+        if path == '/reports':
+            host, limit = params['host'], int(params.get('limit', 20))
+            return lambda: store.reports(host, limit)
+        return None
+
+    async def ingest(self, url, params, headers, body, peer):
+        try:
+            if headers.get('content-encoding', '').lower() == 'gzip':
+                body = gunzip(body)
+                if body is None:
+                    return 413, {'error': 'body too large'}
+            payload = json.loads(body.decode('utf-8'))
+        except (OSError, ValueError, zlib.error) as e:
+            return 400, {'error': f"invalid body: {e}"}
+        host = headers.get('x-lpm-host') or params.get('host') or (peer[0] if peer else 'unknown')
+        if isinstance(payload, dict) and isinstance(payload.get('batch'), list):
+            return await self.ingest_batch(payload['batch'], host)
+        error = report_error(payload)
+        if error:
+            return 400, {'error': error}
+        try:
+            # Spooled reports carry their original collection time
+            received_at = float(headers.get('x-lpm-collected-at') or time.time())
+        except ValueError:
+            received_at = time.time()
+        future = self.writer.submit(host, received_at, payload)
+        try:
+            report_id = await asyncio.wrap_future(future)
+        except Exception as e:
+            return 500, {'error': f"store failed: {e}"}
+        if report_id is None:
+            return 409, {'status': 'resync', 'host': host}
+        return 200, {'status': 'ok', 'host': host, 'report_id': report_id}
+
+    async def ingest_batch(self, items, default_host):
+        """Store {'batch': [{'host', 'collected_at', 'report'}, ...]} sent when a client drains its spool.
+
+        Every item is checked before any is queued, so a 400 means nothing was
+        stored. Results are per item: a report id, {'status': 'resync'}, or
+        {'status': 'error'} for a report that failed to store.
+        """
+        usage = "expected {'batch': [{'host', 'collected_at', 'report'}, ...]}"
+        checked = []
+        for n, item in enumerate(items):
+            if not isinstance(item, dict):
+                return 400, {'error': usage}
+            error = report_error(item.get('report')) if isinstance(item.get('report'), dict) else usage
+            if error:
+                return 400, {'error': f"item {n}: {error}"}
+            try:
+                collected_at = float(item['collected_at']) if item.get('collected_at') is not None else time.time()
+            except (TypeError, ValueError):
+                return 400, {'error': f"item {n}: 'collected_at' must be a number"}
+            checked.append((item.get('host') or default_host, collected_at, item['report']))
+        futures = [self.writer.submit(host, collected_at, report) for host, collected_at, report in checked]
+        results = []
+        for future in futures:
+            try:
+                report_id = await asyncio.wrap_future(future)
+            except Exception as e:
+                results.append({'status': 'error', 'error': f"store failed: {e}"})
+                continue
+            results.append({'report_id': report_id} if report_id is not None else {'status': 'resync'})
+        return 200, {'status': 'ok', 'results': results}
+
+
+async def serve(host, port, store, batch_size=DEFAULT_BATCH_SIZE, linger_ms=DEFAULT_LINGER_MS, token=None, basic=None,
+                ready=None):
+    """Run the ingestion server until cancelled; `ready` (threading.Event) is set once listening."""
+    writer = BatchWriter(store, batch_size, linger_ms)
+    app = FleetServer(store, writer, token=token, basic=basic)
+    server = await asyncio.start_server(app.handle, host, port, backlog=1024)
+    if ready is not None:
+        ready.set()
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        writer.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='LPM fleet ingestion server')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on')
+    parser.add_argument('--db', default='lpm_fleet.db', help='SQLite database path')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Max reports per write transaction')
+    parser.add_argument('--linger-ms', type=float, default=DEFAULT_LINGER_MS, help='How long to wait to fill a batch')
+    parser.add_argument('--token', help='Require this bearer token on every request')
+    parser.add_argument('--basic', help='Require basic auth as user:password')
+    args = parser.parse_args(argv)
+
+    store = FleetStore(args.db)
+    print(f"LPM fleet server listening on http://{args.host}:{args.port} (db: {args.db})")
+    try:
+        asyncio.run(serve(args.host, args.port, store, args.batch_size, args.linger_ms, args.token, args.basic))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+"""netprobe and the native Ping Test against loopback stand-in listeners (no internet needed)."""
+import socket
+import time
+
+import pytest
+
+import collector
+import netprobe
+from collector import collect_ping, format_ping_stats
+from records import PingReply, PingStats, parser_for
+from report import summarize
+
+INTERVAL = 0.02
+TIMEOUT = 0.3
+
+
+def target_of(sock):
+    host, port = sock.getsockname()
+    return f"{host}:{port}"
+
+
+@pytest.fixture
+def fast_ping(monkeypatch):
+    """Shorten the Ping Test's pacing and timeout for loopback targets"""
+    monkeypatch.setattr(collector, 'PING_INTERVAL', INTERVAL)
+    monkeypatch.setattr(collector, 'PING_TIMEOUT', TIMEOUT)
+
+
+@pytest.fixture
+def listener():
+    """An accepting listener; the kernel completes handshakes without accept()"""
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    s.bind(('127.0.0.1', 0))
+    s.listen(128)
+    yield s
+    s.close()
+
+
+@pytest.fixture
+def refused_target():
+    """A loopback port with nothing listening on it"""
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    s.bind(('127.0.0.1', 0))
+    target = target_of(s)
+    s.close()
+    return target
+
+
+@pytest.fixture
+def blackhole():
+    """A listener that never accepts, with its backlog already full, so SYNs go unanswered"""
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    s.bind(('127.0.0.1', 0))
+    s.listen(0)
+    fillers = []
+    for _ in range(4):
+        c = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        c.setblocking(False)
+        c.connect_ex(s.getsockname())
+        fillers.append(c)
+    time.sleep(0.05)
+    yield s
+    for c in fillers:
+        c.close()
+    s.close()
+
+
+def test_parse_target():
+    assert netprobe.parse_target('8.8.8.8:53') == ('8.8.8.8', 53)
+    assert netprobe.parse_target(' example.com ') == ('example.com', 53)
+    assert netprobe.parse_target('[::1]:8080') == ('::1', 8080)
+    assert netprobe.parse_target('[::1]') == ('::1', 53)
+    assert netprobe.parse_target('::1', default_port=80) == ('::1', 80)
+
+
+def test_open_port(listener):
+    result, = netprobe.run_probes([target_of(listener)], 5, INTERVAL, TIMEOUT)
+    stats = result.stats()
+    assert result.error is None
+    assert result.address == '127.0.0.1'
+    assert (stats['sent'], stats['received'], stats['loss_pct']) == (5, 5, 0.0)
+    assert 0 < stats['min_ms'] <= stats['p50_ms'] <= stats['p95_ms'] <= stats['p99_ms'] <= stats['max_ms']
+    assert stats['min_ms'] <= stats['mean_ms'] <= stats['max_ms']
+    assert stats['max_ms'] < 100
+    assert stats['jitter_ms'] is not None and stats['jitter_ms'] >= 0
+    # Sub-millisecond precision, not whole milliseconds
+    assert any(rtt != int(rtt) for rtt in result.replies)
+
+
+def test_refused_port_counts_as_a_round_trip(refused_target):
+    result, = netprobe.run_probes([refused_target], 3, INTERVAL, TIMEOUT)
+    stats = result.stats()
+    assert (stats['sent'], stats['received']) == (3, 3)
+    assert stats['max_ms'] < 100
+
+
+def test_timeout_is_loss(blackhole):
+    count = 4
+    start = time.perf_counter()
+    result, = netprobe.run_probes([target_of(blackhole)], count, INTERVAL, TIMEOUT)
+    elapsed = time.perf_counter() - start
+    stats = result.stats()
+    assert stats['sent'] == count
+    assert stats['received'] == 0
+    assert stats['loss_pct'] == 100.0
+    assert stats['min_ms'] is None and stats['p50_ms'] is None and stats['jitter_ms'] is None
+    # Unanswered probes stop at the target's budget instead of waiting out every timeout
+    assert elapsed <= netprobe.worst_case_seconds(count, INTERVAL, TIMEOUT) + 0.5
+
+
+def test_unresolvable_target_reports_error():
+    result, = netprobe.run_probes(['name.invalid:53'], 3, INTERVAL, TIMEOUT)
+    assert result.error and result.error.startswith('cannot resolve name.invalid')
+    assert result.rtts == [None, None, None]
+    assert result.stats()['loss_pct'] == 100.0
+
+
+def test_targets_are_probed_concurrently(blackhole):
+    listeners = []
+    for _ in range(16):
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        s.bind(('127.0.0.1', 0))
+        s.listen(128)
+        listeners.append(s)
+    try:
+        count = 5
+        targets = [target_of(s) for s in listeners] + [target_of(blackhole)]
+        start = time.perf_counter()
+        results = netprobe.run_probes(targets, count, INTERVAL, TIMEOUT)
+        elapsed = time.perf_counter() - start
+    finally:
+        for s in listeners:
+            s.close()
+    assert [r.target for r in results] == targets
+    assert all(r.stats()['received'] == count for r in results[:-1])
+    assert results[-1].stats()['received'] == 0
+    # 17 targets take as long as one (its pacing plus the lost target's deadline);
+    # one after another the blackhole alone would need count * TIMEOUT
+    budget = netprobe.worst_case_seconds(count, INTERVAL, TIMEOUT)
+    assert elapsed <= budget + 0.5
+    assert elapsed < len(targets) * count * INTERVAL
+
+
+def test_on_reply_called_as_probes_complete(listener, blackhole):
+    seen = {}
+    open_result, lost_result = netprobe.run_probes(
+        [target_of(listener), target_of(blackhole)], 3, INTERVAL, TIMEOUT,
+        on_reply=lambda result, rtt: seen.setdefault(result.target, []).append(rtt))
+    assert seen[open_result.target] == open_result.rtts
+    # Probes cut off by the target's deadline are never sent, so they get no callback
+    assert seen[lost_result.target] and set(seen[lost_result.target]) == {None}
+    assert len(seen[lost_result.target]) <= len(lost_result.rtts)
+
+
+def test_stats_without_probes():
+    stats = netprobe.ProbeResult('10.0.0.1:53').stats()
+    assert (stats['sent'], stats['received'], stats['loss_pct']) == (0, 0, 100.0)
+    assert stats['mean_ms'] is None
+
+
+def test_format_ping_stats_round_trips_through_ping_parser(listener, blackhole):
+    for result in netprobe.run_probes([target_of(listener), target_of(blackhole)], 3, INTERVAL, TIMEOUT):
+        stats = result.stats()
+        record = parser_for('Ping Test').feed(format_ping_stats(stats))
+        assert isinstance(record, PingStats)
+        # Figures are written with microsecond resolution
+        assert record.as_dict() == {name: pytest.approx(stats[name], abs=5e-4) if isinstance(stats[name], float)
+                                    else stats[name] for name in record.__slots__}
+
+
+def test_format_ping_stats_unknown_values_are_dashes():
+    line = format_ping_stats(netprobe.ProbeResult('10.0.0.1:53').stats())
+    assert line == ('Target 10.0.0.1:53 | Sent 0 | Received 0 | Loss 100.0% | Min - | Mean - | Max - | '
+                    'p50 - | p95 - | p99 - | Jitter -')
+    record = parser_for('Ping Test').feed(line)
+    assert record.min_ms is None and record.jitter_ms is None and record.loss_pct == 100.0
+
+
+def test_ping_parser_reply_and_average_lines():
+    parser = parser_for('Ping Test')
+    assert parser.feed('Reply from 127.0.0.1:53: time=0.412ms') == PingReply('127.0.0.1:53', 0.412, False)
+    assert parser.feed('Average: 0.500ms') == PingReply(None, 0.5, True)
+    assert parser.feed('Ping failed or blocked.') is None
+
+
+def test_collect_ping_feeds_the_summary(fast_ping, listener, blackhole):
+    lines = list(collect_ping([target_of(listener), target_of(blackhole)], 4))
+    assert sum(line.startswith('Reply from ') for line in lines) == 4
+    assert any(line.startswith('Request to ') and line.endswith('timed out.') for line in lines)
+    assert sum(line.startswith('Target ') for line in lines) == 2
+    assert lines[-1].startswith('Average: ')
+    summary = summarize({'Ping Test': lines}, live_memory=False)
+    assert summary['ping_p50_ms'] is not None and summary['ping_p50_ms'] < 100
+    assert summary['ping_jitter_ms'] is not None
+    assert summary['ping_loss_pct'] == pytest.approx(50.0)
+
+
+def test_collect_ping_without_replies(fast_ping, blackhole):
+    lines = list(collect_ping([target_of(blackhole)], 2))
+    assert lines[-1] == 'Ping failed or blocked.'
+    assert summarize({'Ping Test': lines}, live_memory=False)['ping_loss_pct'] == 100.0
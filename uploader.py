@@ -0,0 +1,332 @@
+"""Report upload for LPM --upload.
+
+Reports are gzipped and sent over a keep-alive connection. Reports that cannot
+be delivered after a few retries are spooled to disk and drained later, in
+batches and ahead of any newer report, with exponential backoff between
+drain attempts.
+
+Delta mode keeps a small state file with a content hash per section from the
+last acknowledged upload to each URL. Later uploads send only the sections
+whose hash changed plus the summary, and list the rest under 'unchanged' as
+{section: hash}. A server that cannot vouch for those hashes answers 409 with
+{'status': 'resync'} and the full report is sent instead.
+"""
+import base64
+import gzip
+import hashlib
+import http.client
+import json
+import os
+import random
+import time
+import urllib.parse
+
+from report import section_hash
+
+DEFAULT_STATE_PATH = 'lpm_upload_state.json'
+DEFAULT_SPOOL_DIR = 'lpm_spool'
+DEFAULT_SPOOL_MAX = 500
+DEFAULT_BATCH_SIZE = 25
+DEFAULT_RETRIES = 2
+RETRY_DELAY_BASE = 1.0
+RETRY_DELAY_MAX = 8.0
+SPOOL_BACKOFF_BASE = 30.0
+SPOOL_BACKOFF_MAX = 3600.0
+
+
+def auth_headers(bearer=None, user=None, password=None):
+    """Return the Authorization header for bearer or basic auth, if any."""
+    if bearer:
+        return {'Authorization': f"Bearer {bearer}"}
+    if user and password:
+        creds = f"{user}:{password}".encode('utf-8')
+        return {'Authorization': 'Basic ' + base64.b64encode(creds).decode('ascii')}
+    return {}
+
+
+class UploadState:
+    """Per-URL section hashes from the last acknowledged upload, kept in a JSON file."""
+
+    def __init__(self, path=DEFAULT_STATE_PATH):
+        self.path = path
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+        except (OSError, ValueError):
+            self.data = {}
+
+    def hashes(self, url):
+        return self.data.get(url, {})
+
+    def update(self, url, hashes):
+        self.data[url] = hashes
+        # Write-then-rename so an interrupted run never leaves a truncated state file
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f)
+        os.replace(tmp, self.path)
+
+
+def build_payload(sections, summary, previous=None):
+    """Return (payload, hashes); with previous hashes, unchanged sections are left out."""
+    hashes = {sec: section_hash(lines) for sec, lines in sections.items()}
+    if not previous:
+        return {'sections': sections, 'summary': summary}, hashes
+    changed = {sec: lines for sec, lines in sections.items() if previous.get(sec) != hashes[sec]}
+    unchanged = {sec: h for sec, h in hashes.items() if sec not in changed}
+    return {'sections': changed, 'summary': summary, 'unchanged': unchanged}, hashes
+
+
+class HttpSession:
+    """Keep-alive HTTP(S) connection to one upload URL, reconnecting when it goes stale."""
+
+    def __init__(self, url, timeout=30, gzip_body=True):
+        self.url = url
+        parts = urllib.parse.urlsplit(url)
+        self.scheme = parts.scheme
+        self.netloc = parts.netloc
+        self.path = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+        self.timeout = timeout
+        self.gzip_body = gzip_body
+        self.conn = None
+
+    def _connect(self):
+        if self.scheme == 'https':
+            return http.client.HTTPSConnection(self.netloc, timeout=self.timeout)
+        return http.client.HTTPConnection(self.netloc, timeout=self.timeout)
+
+    def post_json(self, payload, headers=None):
+        """POST payload as JSON; returns (status, parsed response body or None)."""
+        body = json.dumps(payload).encode('utf-8')
+        all_headers = {'Content-Type': 'application/json'}
+        if self.gzip_body:
+            body = gzip.compress(body, compresslevel=6)
+            all_headers['Content-Encoding'] = 'gzip'
+        all_headers.update(headers or {})
+        for attempt in (1, 2):
+            reused = self.conn is not None
+            if self.conn is None:
+                self.conn = self._connect()
+            try:
+                self.conn.request('POST', self.path, body=body, headers=all_headers)
+                resp = self.conn.getresponse()
+                data = resp.read()
+            except (OSError, http.client.HTTPException):
+                self.close()
+                # A kept-alive connection may have been closed by the server; retry once on a fresh one
+                if reused and attempt == 1:
+                    continue
+                raise
+            if resp.getheader('Connection', '').lower() == 'close':
+                self.close()
+            return resp.status, _json_or_none(data)
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def _json_or_none(data):
+    try:
+        return json.loads(data.decode('utf-8'))
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def is_retryable(status):
+    """Whether a failed upload is worth retrying later rather than dropping."""
+    return status is None or status >= 500 or status in (401, 403, 408, 429)
+
+
+class Spool:
+    """On-disk queue of reports that could not be uploaded, oldest first.
+
+    Each report is one gzipped JSON file holding the full payload (never a
+    delta) and the host/collection time; credentials are never written. A
+    small backoff file spaces out drain attempts while the server stays down.
+    """
+
+    def __init__(self, url, base_dir=DEFAULT_SPOOL_DIR, max_reports=DEFAULT_SPOOL_MAX):
+        # One subdirectory per upload URL, so draining never has to open other URLs' reports
+        self.directory = os.path.join(base_dir, hashlib.sha1(url.encode('utf-8')).hexdigest()[:16])
+        self.max_reports = max_reports
+        self.backoff_path = os.path.join(self.directory, 'backoff.json')
+
+    def pending(self):
+        try:
+            names = sorted(n for n in os.listdir(self.directory) if n.endswith('.json.gz'))
+        except FileNotFoundError:
+            return []
+        return [os.path.join(self.directory, n) for n in names]
+
+    def put(self, host, payload, collected_at):
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"{collected_at:017.6f}-{os.getpid()}.json.gz"
+        record = {'host': host, 'collected_at': collected_at, 'payload': payload}
+        tmp = os.path.join(self.directory, f".{name}.tmp")
+        with gzip.open(tmp, 'wt', encoding='utf-8') as f:
+            json.dump(record, f)
+        os.replace(tmp, os.path.join(self.directory, name))
+        # Bounded: drop the oldest reports beyond max_reports
+        pending = self.pending()
+        for path in pending[:max(0, len(pending) - self.max_reports)]:
+            self.remove(path)
+
+    def load(self, path):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            return json.load(f)
+
+    def remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _backoff(self):
+        try:
+            with open(self.backoff_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'failures': 0, 'next_attempt': 0}
+
+    def ready(self):
+        """Whether the backoff window allows another drain attempt."""
+        return time.time() >= self._backoff().get('next_attempt', 0)
+
+    def record_failure(self):
+        failures = self._backoff().get('failures', 0) + 1
+        delay = min(SPOOL_BACKOFF_MAX, SPOOL_BACKOFF_BASE * 2 ** (failures - 1)) * random.uniform(0.9, 1.1)
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.backoff_path, 'w', encoding='utf-8') as f:
+            json.dump({'failures': failures, 'next_attempt': time.time() + delay}, f)
+
+    def record_success(self):
+        if os.path.exists(self.backoff_path):
+            os.remove(self.backoff_path)
+
+
+def drain_spool(session, spool, headers=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Send spooled reports over one session, batching where the server allows.
+
+    Returns (delivered, remaining); stops at the first retryable failure.
+    """
+    pending = spool.pending()
+    sent = 0
+    use_batch = batch_size > 1
+    while pending:
+        chunk = pending[:batch_size] if use_batch else pending[:1]
+        records = []
+        for path in chunk:
+            try:
+                records.append(spool.load(path))
+            except (OSError, ValueError, EOFError):
+                records.append(None)
+        valid = [r for r in records if r is not None]
+        try:
+            if not valid:
+                status, resp = 200, None
+            elif use_batch:
+                body = {'batch': [{'host': r['host'], 'collected_at': r['collected_at'], 'report': r['payload']}
+                                  for r in valid]}
+                status, resp = session.post_json(body, headers)
+                if status in (400, 404, 405, 415, 501):
+                    # Receiver does not understand batches; fall back to one report per request
+                    use_batch = False
+                    continue
+            else:
+                r = valid[0]
+                hdrs = dict(headers or {}, **{'X-LPM-Host': r['host'], 'X-LPM-Collected-At': str(r['collected_at'])})
+                status, resp = session.post_json(r['payload'], hdrs)
+        except (OSError, http.client.HTTPException):
+            return sent, len(pending)
+        if not 200 <= status < 300 and is_retryable(status):
+            return sent, len(pending)
+        # Delivered, or permanently rejected and dropped so it cannot block the queue
+        for path in chunk:
+            spool.remove(path)
+        if 200 <= status < 300:
+            results = resp.get('results') if use_batch and isinstance(resp, dict) else None
+            # Items the server could not store are dropped with the rest, but not counted as delivered
+            sent += sum(1 for r in results if 'report_id' in r) if isinstance(results, list) else len(valid)
+        pending = pending[len(chunk):]
+    return sent, 0
+
+
+def upload_report(url, sections, summary, headers=None, timeout=30, state_path=None, spool_dir=None,
+                  gzip_body=True, retries=DEFAULT_RETRIES, drain_only=False):
+    """Upload a report, retrying with backoff and spooling it to disk if it cannot be delivered.
+
+    With state_path, a delta against the last acknowledged upload is sent.
+    Reports still in the spool are older, so they are drained first over the
+    same keep-alive connection, and the current report is only sent once the
+    spool is empty; if the spool cannot be emptied, the current report is
+    spooled behind it, keeping reports in collection order. With drain_only,
+    only the spool is sent, and only once its backoff window has passed.
+
+    Returns a dict: {'status', 'mode' ('full'|'delta'|'resync'), 'sent', 'total',
+    'spooled', 'drained', 'pending', 'error'}.
+    """
+    headers = dict(headers or {})
+    spool = Spool(url, spool_dir) if spool_dir else None
+    session = HttpSession(url, timeout=timeout, gzip_body=gzip_body)
+    result = {'status': None, 'mode': None, 'sent': 0, 'total': len(sections or {}), 'spooled': False,
+              'drained': 0, 'pending': 0, 'error': None}
+    try:
+        remaining = 0
+        # A normal run connects anyway; the spool's backoff only holds back drain_only runs
+        drain = spool is not None and bool(spool.pending()) and (not drain_only or spool.ready())
+        if drain:
+            result['drained'], remaining = drain_spool(session, spool, headers)
+        if not drain_only:
+            if remaining:
+                # Sending now would overtake the older reports still queued
+                result['error'] = f"spool not drained, {remaining} older report(s) still queued"
+                queue_current = True
+            else:
+                delivered = _send_current(session, url, sections, summary, headers, state_path, retries, result)
+                queue_current = not delivered and is_retryable(result['status'])
+            if spool is not None and queue_current:
+                spool.put(headers.get('X-LPM-Host'), {'sections': sections, 'summary': summary}, time.time())
+                result['spooled'] = True
+        if spool is not None and (drain or not drain_only):
+            if remaining or result['spooled']:
+                spool.record_failure()
+            else:
+                spool.record_success()
+    finally:
+        session.close()
+    if spool is not None:
+        result['pending'] = len(spool.pending())
+    return result
+
+
+def _send_current(session, url, sections, summary, headers, state_path, retries, result):
+    """Send the current report with delta/resync handling; True once acknowledged."""
+    state = UploadState(state_path) if state_path else None
+    previous = state.hashes(url) if state else None
+    payload, hashes = build_payload(sections, summary, previous)
+    mode = 'delta' if 'unchanged' in payload else 'full'
+    status = None
+    for attempt in range(retries + 1):
+        if attempt:
+            time.sleep(min(RETRY_DELAY_MAX, RETRY_DELAY_BASE * 2 ** (attempt - 1)))
+        try:
+            status, body = session.post_json(payload, headers)
+            if status == 409 and isinstance(body, dict) and body.get('status') == 'resync':
+                payload, hashes = build_payload(sections, summary)
+                mode = 'resync'
+                status, body = session.post_json(payload, headers)
+        except (OSError, http.client.HTTPException) as e:
+            status = None
+            result['error'] = str(e)
+            continue
+        if not is_retryable(status):
+            break
+    result.update(status=status, mode=mode, sent=len(payload['sections']))
+    if status is not None and 200 <= status < 300:
+        result['error'] = None
+        if state:
+            state.update(url, hashes)
+        return True
+    return False